@@ -0,0 +1,288 @@
+"""Drive /tiktok/comment/ the way a busy live does, and measure the reply pipeline.
+
+Synthetic traffic (open loop, Poisson arrivals)::
+
+    python -m benchmarks.comment_firehose generate --url http://localhost:8000 \\
+        --rate 5 --duration 120 --profile burst --es-ratio 0.3 --dup-ratio 0.1 \\
+        --spam-ratio 0.1 --emoji-ratio 0.2 --wait-replies 90
+
+Replay a stream recorded by scripts/tiktok_listener.py (TIKTOK_RECORD_FILE)
+with its original timing (``--speed 2`` plays it twice as fast)::
+
+    python -m benchmarks.comment_firehose replay recorded.jsonl --url http://localhost:8000
+
+The report (stdout, or --out FILE as JSON) has ingest latency percentiles,
+counts per outcome (stored / filtered / rejected / error) and, with
+--wait-replies, the comment-to-reply-audio time. That time is matched
+through the trace ids that /tiktok/comment/ returns and /all-audio/ lists,
+with a resolution of --poll-interval.
+"""
+
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+
+import aiohttp
+
+TEMPLATES = {
+    'en': [
+        'what do you think about gold today',
+        'is the dollar going to move this week',
+        'great stream thanks for the update',
+        'where is the next support level',
+        'how long have you been trading gold',
+        'do you follow the fed meeting',
+    ],
+    'es': [
+        'hola que opinas del oro hoy',
+        'cuando sube el oro amigo',
+        'gracias por el directo de hoy',
+        'cual es el siguiente soporte',
+        'desde donde nos ves hermano',
+    ],
+}
+SPAM = [
+    'follow me http://spam.example.com',
+    'aaaaaaaaaaaa',
+    'hi',
+    'check https://free-gold.example.net now',
+]
+EMOJI = ['\U0001F525', '\U0001F680', '\U0001F4B0', '\U0001F44D', '\U0001F602']
+USERS = [f'viewer{i}' for i in range(500)]
+
+
+def _percentiles(samples):
+    if not samples:
+        return {'n': 0}
+    ordered = sorted(samples)
+
+    def pct(p):
+        return round(ordered[min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))] * 1000, 1)
+
+    return {'n': len(ordered), 'p50_ms': pct(50), 'p90_ms': pct(90), 'p95_ms': pct(95), 'p99_ms': pct(99),
+            'max_ms': round(ordered[-1] * 1000, 1)}
+
+
+class CommentFactory:
+    """Synthetic comments with a configurable mix of languages, duplicates, spam and emoji."""
+
+    def __init__(self, es_ratio, dup_ratio, spam_ratio, emoji_ratio, seed=None):
+        self.es_ratio = es_ratio
+        self.dup_ratio = dup_ratio
+        self.spam_ratio = spam_ratio
+        self.emoji_ratio = emoji_ratio
+        self.rng = random.Random(seed)
+        self.recent = []
+
+    def next(self):
+        rng = self.rng
+        if self.recent and rng.random() < self.dup_ratio:
+            return dict(rng.choice(self.recent), kind='duplicate')
+        if rng.random() < self.spam_ratio:
+            return {'comment': rng.choice(SPAM), 'user': rng.choice(USERS), 'language': 'en', 'kind': 'spam'}
+
+        language = 'es' if rng.random() < self.es_ratio else 'en'
+        comment = rng.choice(TEMPLATES[language])
+        kind = language
+        if rng.random() < self.emoji_ratio:
+            # emoji-only comments are dropped by the filter, emoji-decorated ones are not
+            comment = rng.choice(EMOJI) * 3 if rng.random() < 0.3 else f'{comment} {rng.choice(EMOJI)}'
+            kind = 'emoji'
+        item = {'comment': comment, 'user': rng.choice(USERS), 'language': language, 'kind': kind}
+        self.recent = (self.recent + [item])[-50:]
+        return item
+
+
+def rate_at(t, args):
+    """Offered comments/second at t seconds into the run."""
+    if args.profile == 'burst':
+        in_burst = (t % args.burst_every) < args.burst_length
+        return args.rate * (args.burst_factor if in_burst else 1)
+    if args.profile == 'ramp':
+        return args.rate * (1 + (args.burst_factor - 1) * min(1.0, t / max(args.duration, 1e-6)))
+    return args.rate
+
+
+class Firehose:
+    def __init__(self, url, secret, max_inflight):
+        self.url = url.rstrip('/')
+        self.secret = secret
+        self.sem = asyncio.Semaphore(max_inflight)
+        self.latencies = []
+        self.outcomes = {}
+        self.kinds = {}
+        self.sent_at = {}
+        self.tasks = []
+
+    def _count(self, outcome, kind):
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        per_kind = self.kinds.setdefault(kind, {})
+        per_kind[outcome] = per_kind.get(outcome, 0) + 1
+
+    async def send(self, session, item):
+        headers = {'Content-Type': 'application/json'}
+        if self.secret:
+            headers['X-TIKTOK-SECRET'] = self.secret
+        payload = {
+            'comment': item['comment'],
+            'user': item['user'],
+            'language': item.get('language', 'en'),
+            'trace_id': uuid.uuid4().hex[:16],
+            'received_at': time.time(),
+        }
+        kind = item.get('kind', 'replay')
+        async with self.sem:
+            started = time.perf_counter()
+            try:
+                async with session.post(f'{self.url}/tiktok/comment/', json=payload, headers=headers,
+                                        timeout=aiohttp.ClientTimeout(total=30)) as resp:
+                    body = await resp.json(content_type=None)
+                    self.latencies.append(time.perf_counter() - started)
+                    if resp.status != 200:
+                        self._count(f'rejected_{resp.status}', kind)
+                    elif body.get('stored'):
+                        self._count('stored', kind)
+                        self.sent_at[body.get('trace_id') or payload['trace_id']] = payload['received_at']
+                    else:
+                        self._count('filtered', kind)
+            except Exception as e:
+                self._count(f'error_{type(e).__name__}', kind)
+
+    def submit(self, session, item):
+        # open loop: a slow server must not lower the offered rate
+        self.tasks.append(asyncio.ensure_future(self.send(session, item)))
+
+    async def drain(self):
+        if self.tasks:
+            await asyncio.gather(*self.tasks)
+
+    async def cursor(self, session):
+        async with session.get(f'{self.url}/all-audio/?since=0') as resp:
+            return (await resp.json()).get('cursor', 0)
+
+    async def wait_replies(self, session, cursor, timeout, poll_interval):
+        """Poll /all-audio/ for reply clips carrying our trace ids; trace_id -> seconds to audio."""
+        done = {}
+        deadline = time.time() + timeout
+        while time.time() < deadline and len(done) < len(self.sent_at):
+            async with session.get(f'{self.url}/all-audio/?since={cursor}') as resp:
+                body = await resp.json()
+            now = time.time()
+            for f in body.get('files', []):
+                for trace_id in f.get('trace_ids') or []:
+                    if trace_id in self.sent_at and trace_id not in done:
+                        done[trace_id] = now - self.sent_at[trace_id]
+            if not body.get('reset'):
+                cursor = body.get('cursor', cursor)
+            await asyncio.sleep(poll_interval)
+        return done
+
+
+async def run_generate(args, hose, session):
+    factory = CommentFactory(args.es_ratio, args.dup_ratio, args.spam_ratio, args.emoji_ratio, args.seed)
+    rng = random.Random(args.seed)
+    started = time.time()
+    t = 0.0
+    while t < args.duration:
+        rate = rate_at(t, args)
+        t += rng.expovariate(rate) if rate > 0 else 0.1
+        delay = started + t - time.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        hose.submit(session, factory.next())
+
+
+async def run_replay(args, hose, session):
+    with open(args.file, 'r', encoding='utf-8') as fh:
+        records = [json.loads(line) for line in fh if line.strip()]
+    if not records:
+        return
+    first = records[0]['t']
+    started = time.time()
+    for rec in records:
+        delay = started + (rec['t'] - first) / args.speed - time.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        hose.submit(session, {'comment': rec['comment'], 'user': rec.get('user') or 'viewer',
+                              'language': rec.get('language', 'en'), 'kind': 'replay'})
+
+
+async def main_async(args):
+    hose = Firehose(args.url, args.secret, args.max_inflight)
+    async with aiohttp.ClientSession() as session:
+        cursor = await hose.cursor(session) if args.wait_replies else 0
+        started = time.time()
+        if args.mode == 'generate':
+            await run_generate(args, hose, session)
+        else:
+            await run_replay(args, hose, session)
+        await hose.drain()
+        elapsed = time.time() - started
+
+        replies = {}
+        if args.wait_replies:
+            replies = await hose.wait_replies(session, cursor, args.wait_replies, args.poll_interval)
+
+    sent = sum(hose.outcomes.values())
+    return {
+        'mode': args.mode,
+        'sent': sent,
+        'seconds': round(elapsed, 2),
+        'offered_rate': round(sent / elapsed, 2) if elapsed else None,
+        'outcomes': hose.outcomes,
+        'by_kind': hose.kinds,
+        'ingest_latency': _percentiles(hose.latencies),
+        'replies': {
+            'stored_comments': len(hose.sent_at),
+            'answered': len(replies),
+            'comment_to_audio': _percentiles(list(replies.values())),
+        } if args.wait_replies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Synthetic / replayed TikTok comment load for /tiktok/comment/.')
+    sub = parser.add_subparsers(dest='mode', required=True)
+
+    def common(p):
+        p.add_argument('--url', default='http://127.0.0.1:8000', help='Base URL of the web app')
+        p.add_argument('--secret', default='', help='X-TIKTOK-SECRET value')
+        p.add_argument('--max-inflight', type=int, default=200)
+        p.add_argument('--wait-replies', type=float, default=0,
+                       help='After sending, wait up to N seconds for reply audio and report comment-to-audio time')
+        p.add_argument('--poll-interval', type=float, default=0.5)
+        p.add_argument('--out', default=None, help='Write the report as JSON to this file')
+
+    gen = sub.add_parser('generate', help='Synthetic traffic')
+    common(gen)
+    gen.add_argument('--rate', type=float, default=2.0, help='Base comments per second')
+    gen.add_argument('--duration', type=float, default=60.0, help='Seconds of traffic')
+    gen.add_argument('--profile', choices=('steady', 'burst', 'ramp'), default='steady')
+    gen.add_argument('--burst-factor', type=float, default=10.0, help='Rate multiplier during bursts / at ramp end')
+    gen.add_argument('--burst-every', type=float, default=30.0, help='Seconds between burst starts')
+    gen.add_argument('--burst-length', type=float, default=5.0, help='Seconds per burst')
+    gen.add_argument('--es-ratio', type=float, default=0.3)
+    gen.add_argument('--dup-ratio', type=float, default=0.1)
+    gen.add_argument('--spam-ratio', type=float, default=0.1)
+    gen.add_argument('--emoji-ratio', type=float, default=0.2)
+    gen.add_argument('--seed', type=int, default=None)
+
+    rep = sub.add_parser('replay', help='Replay a file recorded by tiktok_listener.py (TIKTOK_RECORD_FILE)')
+    common(rep)
+    rep.add_argument('file')
+    rep.add_argument('--speed', type=float, default=1.0, help='Playback speed multiplier')
+
+    args = parser.parse_args()
+    report = asyncio.run(main_async(args))
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as fh:
+            fh.write(text)
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
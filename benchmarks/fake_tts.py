@@ -0,0 +1,43 @@
+"""Fake synthesizer with the ``tts`` / ``tts_to_file`` interface of Coqui's ``TTS`` object.
+
+It produces silent PCM audio as long as the text would take to speak
+(``words_per_second``) after sleeping ``rtf`` times that duration, so queue,
+publish and playlist code see realistic files and timings without a model.
+"""
+
+import time
+import wave
+
+
+class _Synthesizer:
+    def __init__(self, sample_rate):
+        self.output_sample_rate = sample_rate
+
+    def save_wav(self, wav, path, pipe_out=None):
+        with wave.open(path, 'wb') as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(self.output_sample_rate)
+            w.writeframes(b'\x00\x00' * len(wav))
+
+
+class FakeTTS:
+    def __init__(self, rtf=0.3, words_per_second=2.6, sample_rate=8000):
+        self.rtf = rtf
+        self.words_per_second = words_per_second
+        self.sample_rate = sample_rate
+        self.synthesizer = _Synthesizer(sample_rate)
+        self.calls = 0
+
+    def audio_seconds(self, text):
+        return max(0.2, len(text.split()) / self.words_per_second)
+
+    def tts(self, text, **kwargs):
+        self.calls += 1
+        seconds = self.audio_seconds(text)
+        time.sleep(seconds * self.rtf)
+        return [0.0] * int(seconds * self.sample_rate)
+
+    def tts_to_file(self, text, file_path, **kwargs):
+        self.synthesizer.save_wav(self.tts(text), file_path)
+        return file_path
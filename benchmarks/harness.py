@@ -0,0 +1,137 @@
+"""Shared setup for the benchmarks: an isolated MEDIA_ROOT, Django, timing and result files.
+
+``setup()`` must run before anything imports ``streamer`` because the
+streamer modules derive their file paths from settings at import time.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import subprocess
+import statistics
+import importlib.util
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+RESULTS_DIR = os.path.join(PROJECT_ROOT, 'benchmarks', 'results')
+
+
+def setup(media_root=None, openai_base_url=None, audio_codec='wav', tracing=True):
+    """Point the project at a scratch MEDIA_ROOT (and the stub OpenAI server) and set up Django."""
+    media_root = media_root or tempfile.mkdtemp(prefix='tts-bench-')
+    os.makedirs(media_root, exist_ok=True)
+    os.environ['MEDIA_ROOT'] = media_root
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'live_tts_project.settings')
+    os.environ['DEBUG'] = '0'
+    os.environ['AUDIO_CODEC'] = audio_codec
+    os.environ['TRACING_ENABLED'] = '1' if tracing else '0'
+    os.environ.setdefault('OPENAI_API_KEY', 'bench')
+    os.environ.setdefault('WORKER_ID', 'bench-worker')
+    if openai_base_url:
+        os.environ['OPENAI_BASE_URL'] = openai_base_url
+    if PROJECT_ROOT not in sys.path:
+        sys.path.insert(0, PROJECT_ROOT)
+
+    import django
+    django.setup()
+    return media_root
+
+
+def load_worker():
+    """Import scripts/worker_tts.py as a module (it is a script, not a package member)."""
+    path = os.path.join(PROJECT_ROOT, 'scripts', 'worker_tts.py')
+    spec = importlib.util.spec_from_file_location('worker_tts', path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['worker_tts'] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def clear_media(media_root):
+    for name in os.listdir(media_root):
+        path = os.path.join(media_root, name)
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            os.remove(path)
+
+
+def summarize(samples):
+    """Seconds samples -> dict of ms statistics."""
+    if not samples:
+        return {'n': 0}
+    ordered = sorted(samples)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))]
+
+    return {
+        'n': len(samples),
+        'mean_ms': round(statistics.fmean(samples) * 1000, 3),
+        'p50_ms': round(pct(50) * 1000, 3),
+        'p95_ms': round(pct(95) * 1000, 3),
+        'p99_ms': round(pct(99) * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+    }
+
+
+def timeit(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def _git_rev():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT, stderr=subprocess.DEVNULL,
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def write_results(results, args, out=None):
+    payload = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'git_rev': _git_rev(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'args': args,
+        },
+        'results': results,
+    }
+    if not out:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        out = os.path.join(RESULTS_DIR, f"bench_{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(out, 'w', encoding='utf-8') as fh:
+        json.dump(payload, fh, indent=2)
+    return out
+
+
+def _numeric_leaves(obj, prefix=''):
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            yield from _numeric_leaves(v, f'{prefix}.{k}' if prefix else str(k))
+    elif isinstance(obj, (int, float)) and not isinstance(obj, bool):
+        yield prefix, obj
+
+
+def compare(baseline_path, results):
+    """Lines comparing every numeric result with the same path in a previous run."""
+    with open(baseline_path, 'r', encoding='utf-8') as fh:
+        baseline = dict(_numeric_leaves(json.load(fh).get('results', {})))
+    lines = []
+    for path, value in _numeric_leaves(results):
+        old = baseline.get(path)
+        if old is None:
+            continue
+        change = f'{(value - old) / old * 100:+.1f}%' if old else 'n/a'
+        lines.append(f'{path}: {old} -> {value} ({change})')
+    return lines
@@ -0,0 +1,123 @@
+"""Cold and warm TTS model load times: original checkpoints vs memory-mapped weights.
+
+    python -m benchmarks.model_load                     # every language, 3 runs
+    python -m benchmarks.model_load --languages en --runs 5
+
+Needs torch, Coqui TTS and the installed models (scripts/download_models.py,
+which also writes the model.mmap.pth files). Every load runs in a fresh
+interpreter with TTS_MODEL_MMAP=0 (checkpoint) or 1 (mmap):
+
+- cold: the model's files are evicted from the page cache first
+  (posix_fadvise DONTNEED). Pages still mapped by a running worker stay
+  resident, so stop the workers for a true cold start.
+- warm: the same load again, with the files in the page cache.
+
+Load time excludes importing torch and TTS. The report also has the
+child's RSS and the private part of it: with mmap, the weights count as
+shared, clean pages (except those a model derives while loading, such as
+a vocoder's folded weight norm).
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+from benchmarks import harness
+
+CHILD = r'''
+import os, sys, json, time
+import TTS.api
+from streamer import model_registry
+started = time.perf_counter()
+model_registry.load_tts(sys.argv[1])
+load = time.perf_counter() - started
+usage = {}
+with open('/proc/self/smaps_rollup') as fh:
+    for line in fh:
+        key, _, value = line.partition(':')
+        if key in ('Rss', 'Private_Clean', 'Private_Dirty', 'Shared_Clean'):
+            usage[key] = int(value.split()[0]) / 1024
+print(json.dumps({
+    'load_seconds': load,
+    'rss_mb': usage.get('Rss'),
+    'private_mb': usage.get('Private_Clean', 0) + usage.get('Private_Dirty', 0),
+}))
+'''
+
+
+def _evict(name):
+    """Drop the files of a model (and its vocoder) from the page cache."""
+    from streamer import model_registry
+
+    models = model_registry.read_manifest().get('models', {})
+    for model in filter(None, (name, model_registry.VOCODERS.get(name))):
+        directory = model_registry.model_dir(model)
+        for rel in models.get(model, {}).get('files', {}):
+            try:
+                fd = os.open(os.path.join(directory, rel), os.O_RDONLY)
+            except OSError:
+                continue
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            finally:
+                os.close(fd)
+
+
+def _load(name, mmap):
+    env = dict(os.environ, TTS_MODEL_MMAP='1' if mmap else '0')
+    out = subprocess.run(
+        [sys.executable, '-c', CHILD, name],
+        cwd=harness.PROJECT_ROOT, env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def bench_model_load(languages, runs):
+    from streamer.tts_models import model_for
+
+    results = {}
+    for language in languages:
+        name = model_for(language)
+        per_mode = {}
+        for mode, mmap in (('checkpoint', False), ('mmap', True)):
+            samples = {'cold': [], 'warm': []}
+            for _ in range(runs):
+                _evict(name)
+                samples['cold'].append(_load(name, mmap))
+                samples['warm'].append(_load(name, mmap))
+            per_mode[mode] = {
+                kind: {
+                    'load': harness.summarize([s['load_seconds'] for s in runs_]),
+                    'rss_mb': round(max(s['rss_mb'] or 0 for s in runs_), 1),
+                    'private_mb': round(max(s['private_mb'] or 0 for s in runs_), 1),
+                }
+                for kind, runs_ in samples.items()
+            }
+            print(
+                f"{name} {mode}: cold p50 {per_mode[mode]['cold']['load']['p50_ms']} ms, "
+                f"warm p50 {per_mode[mode]['warm']['load']['p50_ms']} ms, "
+                f"private {per_mode[mode]['warm']['private_mb']} MB"
+            )
+        results[name] = per_mode
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold / warm TTS model load benchmark; results as JSON.')
+    parser.add_argument('--languages', default='en,es')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--out', default=None, help='Result file (default benchmarks/results/bench_<ts>.json)')
+    args = parser.parse_args()
+
+    if harness.PROJECT_ROOT not in sys.path:
+        sys.path.insert(0, harness.PROJECT_ROOT)
+    languages = [lang.strip() for lang in args.languages.split(',') if lang.strip()]
+    results = {'model_load': bench_model_load(languages, args.runs)}
+    out = harness.write_results(results, vars(args), args.out)
+    print(f'Results written to {out}')
+
+
+if __name__ == '__main__':
+    main()
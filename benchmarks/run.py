@@ -0,0 +1,302 @@
+"""Offline benchmark suite.
+
+Runs against a scratch MEDIA_ROOT with the stub OpenAI server and the fake
+synthesizer, and writes one JSON result file per run::
+
+    python -m benchmarks.run                       # everything, default sizes
+    python -m benchmarks.run --only queue,listing --sizes 1000,10000
+    python -m benchmarks.run --baseline benchmarks/results/bench_<old>.json
+
+Benchmarks:
+
+- queue:   read / atomic update / claim on a TTS queue of N jobs, per backend (--queue-backends)
+- ingest:  POST /tiktok/comment/ throughput and latency
+- window:  one reply window (OpenAI replies + synthesis + publish) per batch size
+- listing: /all-audio/ and /recordings/ over a media dir of N clips (full, ?since=, 304)
+- ttfc:    go_live -> first chunk published (worker loop with the fake synthesizer)
+"""
+
+import os
+import json
+import time
+import wave
+import asyncio
+import argparse
+import threading
+
+from benchmarks import harness
+from benchmarks.fake_tts import FakeTTS
+from benchmarks.stub_openai import StubOpenAI
+
+COMMENTS = [
+    'what do you think about gold today',
+    'is the dollar going to move this week',
+    'hola que opinas del oro hoy',
+    'great stream thanks for the update',
+    'where is the next support level',
+    'cuando sube el oro amigo',
+]
+
+
+def _job(session, index, status):
+    return {
+        'session': session,
+        'index': index,
+        'text': 'word ' * 480,
+        'language': 'en',
+        'status': status,
+        'created_at': time.time(),
+    }
+
+
+def bench_queue(sizes, repeats, worker, backends, queue_url, media_root):
+    from streamer import queue_store
+    from streamer.queue_backends import create_backend
+    from streamer.queue_store import _read_tts_queue, _write_tts_queue, atomic_update_tts_queue, tts_counts, tts_page
+
+    configured = queue_store.tts_backend()
+    results = {}
+    for name in backends:
+        backend = create_backend(name, queue_url if name == configured.name else None, media_root)
+        queue_store.use_tts_backend(backend)
+        for n in sizes:
+            # a long-running install: mostly finished jobs with the pending tail at the end
+            pending = repeats
+            q = [_job(1700000000 + i // 100, i % 100, 'done') for i in range(n - pending)]
+            q += [_job(1800000000, i, 'pending') for i in range(pending)]
+            _write_tts_queue(q)
+            extra = _job(1900000000, 0, 'pending')
+
+            result = {
+                'read': harness.timeit(_read_tts_queue, repeats),
+                'atomic_update_tts_queue': harness.timeit(lambda: atomic_update_tts_queue(lambda q: q + [extra]), repeats),
+                # the worker's claim replaced find_next_job + set_job_status
+                'claim_next_job': harness.timeit(worker.claim_next_job, repeats),
+                # what /tts-queue-status/ reads: the maintained counters and one filtered page
+                'counts': harness.timeit(tts_counts, repeats),
+                'page': harness.timeit(lambda: tts_page(limit=50, status='pending'), repeats),
+            }
+            if name == 'json':
+                result['file_bytes'] = sum(
+                    os.path.getsize(os.path.join(backend.sessions_dir, f)) for f in os.listdir(backend.sessions_dir)
+                )
+            # plain sizes for the JSON file, so older result files still compare
+            results[str(n) if name == 'json' else f'{name}_{n}'] = result
+            print(f'queue {name} n={n}: claim p50 {result["claim_next_job"]["p50_ms"]} ms, '
+                  f'counts p50 {result["counts"]["p50_ms"]} ms')
+        _write_tts_queue([])
+    queue_store.use_tts_backend(configured)
+    return results
+
+
+def bench_ingest(count, concurrency):
+    from django.test import AsyncClient
+    from streamer.queue_store import _write_queue
+
+    _write_queue({'comments': [], 'audio_queue': [], 'window_start': 0})
+    client = AsyncClient()
+    latencies = []
+    statuses = {}
+
+    async def post(i):
+        body = json.dumps({'comment': COMMENTS[i % len(COMMENTS)], 'user': f'viewer{i}', 'language': 'en'})
+        started = time.perf_counter()
+        resp = await client.post('/tiktok/comment/', data=body, content_type='application/json')
+        latencies.append(time.perf_counter() - started)
+        statuses[resp.status_code] = statuses.get(resp.status_code, 0) + 1
+
+    async def run():
+        sem = asyncio.Semaphore(concurrency)
+
+        async def limited(i):
+            async with sem:
+                await post(i)
+
+        started = time.perf_counter()
+        await asyncio.gather(*[limited(i) for i in range(count)])
+        return time.perf_counter() - started
+
+    wall = asyncio.run(run())
+    result = {
+        'comments': count,
+        'concurrency': concurrency,
+        'wall_seconds': round(wall, 3),
+        'comments_per_second': round(count / wall, 1),
+        'latency': harness.summarize(latencies),
+        'statuses': {str(k): v for k, v in statuses.items()},
+    }
+    print(f'ingest: {result["comments_per_second"]} comments/s')
+    return result
+
+
+def bench_window(batch_sizes, fake):
+    from streamer import views
+    from streamer.queue_store import _read_queue, _write_queue
+
+    views.get_tts = lambda model_name: fake
+    results = {}
+    for size in batch_sizes:
+        now = time.time()
+        comments = [
+            {'user': f'viewer{i}', 'comment': COMMENTS[i % len(COMMENTS)], 'time': now - 61, 'language': 'en'}
+            for i in range(size)
+        ]
+        _write_queue({'comments': comments, 'audio_queue': [], 'window_start': now - 61})
+        started = time.perf_counter()
+        asyncio.run(views.process_tiktok_comment_window())
+        elapsed = time.perf_counter() - started
+        produced = len(_read_queue().get('audio_queue', []))
+        results[str(size)] = {'seconds': round(elapsed, 3), 'reply_files': produced}
+        print(f'window batch={size}: {elapsed:.2f}s')
+    return results
+
+
+def _make_clips(media_root, count):
+    silence = b'\x00\x00' * 800
+    for i in range(count):
+        path = os.path.join(media_root, f'live_{1700000000 + i // 100}_{i % 100:03d}.wav')
+        with wave.open(path, 'wb') as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(8000)
+            w.writeframes(silence)
+
+
+def bench_listing(counts, repeats, media_root):
+    from django.test import Client
+    from streamer import manifest
+
+    client = Client()
+    results = {}
+    for count in counts:
+        harness.clear_media(media_root)
+        _make_clips(media_root, count)
+        manifest._CACHE.update({'key': None, 'manifest': None})
+
+        started = time.perf_counter()
+        m = manifest.rebuild_manifest()
+        rebuild = time.perf_counter() - started
+        cursor = m['seq']
+        etag = manifest.manifest_etag(m)
+
+        results[str(count)] = {
+            'manifest_rebuild_ms': round(rebuild * 1000, 3),
+            'all_audio_full': harness.timeit(lambda: client.get('/all-audio/'), repeats),
+            'all_audio_since': harness.timeit(lambda: client.get(f'/all-audio/?since={cursor}'), repeats),
+            'all_audio_304': harness.timeit(lambda: client.get('/all-audio/', HTTP_IF_NONE_MATCH=etag), repeats),
+            'recordings_full': harness.timeit(lambda: client.get('/recordings/'), repeats),
+        }
+        print(f'listing n={count}: full p50 {results[str(count)]["all_audio_full"]["p50_ms"]} ms')
+    return results
+
+
+def bench_ttfc(runs, parts, worker, fake, timeout):
+    from django.test import AsyncClient
+    from streamer.manifest import load_manifest
+    from streamer.queue_store import _write_tts_queue
+
+    _write_tts_queue([])
+    worker.load_models = lambda: {'en': fake, 'es': fake}
+    threading.Thread(target=worker.main_loop, name='bench-worker', daemon=True).start()
+
+    client = AsyncClient()
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        resp = asyncio.run(client.post(
+            '/go-live/', data=json.dumps({'language': 'en', 'parts': parts}), content_type='application/json',
+        ))
+        responded = time.perf_counter() - started
+        body = resp.json()
+        session = str(body.get('session'))
+
+        first = last = None
+        total = body.get('total_chunks') or 0
+        while time.perf_counter() - started < timeout:
+            published = {
+                e.get('index') for e in load_manifest()['entries'].values() if e.get('session') == session
+            }
+            if first is None and 0 in published:
+                first = time.perf_counter() - started
+            if total and len(published) >= total:
+                last = time.perf_counter() - started
+                break
+            time.sleep(0.005)
+
+        samples.append({
+            'go_live_seconds': round(responded, 3),
+            'first_chunk_seconds': round(first, 3) if first else None,
+            'all_chunks_seconds': round(last, 3) if last else None,
+            'total_chunks': total,
+        })
+        print(f'ttfc: go_live {responded:.2f}s, first chunk {first and round(first, 2)}s')
+        # session ids are unix seconds: never start two sessions in the same second
+        time.sleep(1.1)
+    firsts = [s['first_chunk_seconds'] for s in samples if s['first_chunk_seconds'] is not None]
+    return {
+        'parts': parts,
+        'runs': samples,
+        'first_chunk': harness.summarize(firsts),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmarks (stub OpenAI, fake TTS); results as JSON.')
+    parser.add_argument('--only', default='queue,ingest,window,listing,ttfc', help='Comma separated benchmark names')
+    parser.add_argument('--sizes', default='1000,10000,100000', help='Queue sizes for the queue benchmark')
+    parser.add_argument('--queue-backends', default=None,
+                        help='TTS queue backends for the queue benchmark (default: the configured one)')
+    parser.add_argument('--listing-sizes', default='1000,10000', help='Clip counts for the listing benchmark')
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--comments', type=int, default=500, help='Comments posted by the ingest benchmark')
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--batches', default='1,5,20', help='Window batch sizes')
+    parser.add_argument('--openai-latency', type=float, default=0.4, help='Stub latency per commentary part (s)')
+    parser.add_argument('--reply-latency', type=float, default=0.3, help='Stub latency per short reply (s)')
+    parser.add_argument('--tts-rtf', type=float, default=0.3, help='Fake synthesizer real-time factor')
+    parser.add_argument('--parts', type=int, default=2, help='Commentary parts per go_live in the ttfc benchmark')
+    parser.add_argument('--ttfc-runs', type=int, default=3)
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--media-root', default=None, help='Scratch MEDIA_ROOT (default: a new temp dir)')
+    parser.add_argument('--out', default=None, help='Result file (default benchmarks/results/bench_<ts>.json)')
+    parser.add_argument('--baseline', default=None, help='Previous result file to compare against')
+    args = parser.parse_args()
+
+    only = {name.strip() for name in args.only.split(',') if name.strip()}
+    stub = StubOpenAI(latency=args.openai_latency, reply_latency=args.reply_latency).start()
+    media_root = harness.setup(args.media_root, openai_base_url=stub.base_url)
+    print(f'MEDIA_ROOT={media_root} OPENAI_BASE_URL={stub.base_url}')
+
+    fake = FakeTTS(rtf=args.tts_rtf)
+    worker = harness.load_worker() if only & {'queue', 'ttfc'} else None
+
+    results = {}
+    try:
+        if 'queue' in only:
+            from django.conf import settings
+            backends = (args.queue_backends or settings.TTS_QUEUE_BACKEND).split(',')
+            results['queue'] = bench_queue(
+                [int(n) for n in args.sizes.split(',')], args.repeats, worker,
+                [b.strip() for b in backends if b.strip()], settings.TTS_QUEUE_URL or None, media_root,
+            )
+        if 'ingest' in only:
+            results['ingest'] = bench_ingest(args.comments, args.concurrency)
+        if 'window' in only:
+            results['window'] = bench_window([int(n) for n in args.batches.split(',')], fake)
+        if 'listing' in only:
+            results['listing'] = bench_listing([int(n) for n in args.listing_sizes.split(',')], args.repeats, media_root)
+        if 'ttfc' in only:
+            harness.clear_media(media_root)
+            results['ttfc'] = bench_ttfc(args.ttfc_runs, args.parts, worker, fake, args.timeout)
+    finally:
+        stub.stop()
+
+    out = harness.write_results(results, vars(args), args.out)
+    print(f'Results written to {out}')
+    if args.baseline:
+        for line in harness.compare(args.baseline, results):
+            print(line)
+
+
+if __name__ == '__main__':
+    main()
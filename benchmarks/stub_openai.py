@@ -0,0 +1,184 @@
+"""Local stand-in for the OpenAI Responses API (POST /v1/responses).
+
+Answers every request after a configurable latency with canned text (a
+JSON outline when the prompt asks for commentary sections), so the
+benchmarks exercise the real AsyncOpenAI client and views without network
+access. Point the SDK at it with OPENAI_BASE_URL=http://127.0.0.1:<port>/v1.
+``fail_next(status, headers)`` scripts error answers (e.g. a 429 with
+Retry-After) for the tests of streamer.openai_client.
+
+Run standalone::
+
+    python -m benchmarks.stub_openai --port 8999 --latency 0.4
+"""
+
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LOREM = (
+    'Gold is holding steady this session as traders weigh the dollar and yields '
+    'we keep an eye on the key levels and stay patient while the market decides '
+    'remember that risk management comes first and there is no rush to act '
+)
+
+
+def _response_body(text, model):
+    now = int(time.time())
+    return {
+        'id': f'resp_{now}{random.randint(0, 99999):05d}',
+        'object': 'response',
+        'created_at': now,
+        'status': 'completed',
+        'model': model,
+        'output': [{
+            'type': 'message',
+            'id': f'msg_{now}',
+            'status': 'completed',
+            'role': 'assistant',
+            'content': [{'type': 'output_text', 'text': text, 'annotations': []}],
+        }],
+        'parallel_tool_calls': False,
+        'tool_choice': 'auto',
+        'tools': [],
+        'usage': {
+            'input_tokens': 100,
+            'output_tokens': len(text.split()),
+            'total_tokens': 100 + len(text.split()),
+            'input_tokens_details': {'cached_tokens': 0},
+            'output_tokens_details': {'reasoning_tokens': 0},
+        },
+    }
+
+
+class StubOpenAI:
+    """Threaded HTTP server; ``latency`` and ``words`` apply to long requests, replies are short."""
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.3, reply_latency=None, words=300,
+                 error_rate=0.0, jitter=0.0):
+        self.latency = latency
+        self.reply_latency = latency if reply_latency is None else reply_latency
+        self.words = words
+        self.error_rate = error_rate
+        self.jitter = jitter
+        self.requests = 0
+        self._scripted = []
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                try:
+                    payload = json.loads(self.rfile.read(length) or b'{}')
+                except ValueError:
+                    payload = {}
+                stub.requests += 1
+                self._respond(stub.handle(self.path, payload))
+
+            def _respond(self, result):
+                status, body, headers = (result + ({},))[:3]
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                try:
+                    self.wfile.write(data)
+                except ConnectionError:
+                    pass  # the client gave up (deadline tests hang up mid-reply)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}/v1'
+
+    def fail_next(self, status, headers=None, times=1):
+        """Answer the next ``times`` requests with ``status`` (and ``headers``) instead of a response."""
+        with self._lock:
+            self._scripted += [(status, headers or {})] * times
+
+    def handle(self, path, payload):
+        if not path.rstrip('/').endswith('/responses'):
+            return 404, {'error': {'message': f'unknown path {path}', 'type': 'invalid_request_error'}}
+        with self._lock:
+            scripted = self._scripted.pop(0) if self._scripted else None
+        if scripted:
+            status, headers = scripted
+            kind = 'invalid_request_error' if status < 500 and status != 429 else 'server_error'
+            return status, {'error': {'message': f'stub answered {status}', 'type': kind}}, headers
+
+        short = (payload.get('max_output_tokens') or 0) <= 128
+        delay = self.reply_latency if short else self.latency
+        if self.jitter:
+            delay *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        time.sleep(max(0.0, delay))
+
+        if self.error_rate and random.random() < self.error_rate:
+            return 503, {'error': {'message': 'stub overloaded', 'type': 'server_error'}}
+
+        prompt = json.dumps(payload.get('input') or '')
+        if short:
+            text = 'Thanks for the comment we are watching the same levels right now'
+        elif '\\"sections\\"' in prompt:
+            text = json.dumps({
+                'summary': 'A calm look at gold, the dollar and risk',
+                'sections': [{'title': f'Section {i + 1}', 'points': ['levels', 'dollar', 'patience']} for i in range(12)],
+            })
+        else:
+            # shuffled so parallel commentary parts do not look like repeats of each other
+            vocabulary = LOREM.split()
+            words = [random.choice(vocabulary) for _ in range(self.words)]
+            # sentence breaks so chunkers have boundaries to work with
+            text = ' '.join(w + ('.' if i % 18 == 17 else '') for i, w in enumerate(words))
+        return 200, _response_body(text, payload.get('model', 'stub'))
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name='stub-openai', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8999)
+    parser.add_argument('--latency', type=float, default=0.3, help='Seconds per long (commentary) request')
+    parser.add_argument('--reply-latency', type=float, default=None, help='Seconds per short reply request')
+    parser.add_argument('--words', type=int, default=300, help='Words per commentary part')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with 503')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Relative latency jitter, e.g. 0.2')
+    args = parser.parse_args()
+
+    stub = StubOpenAI(args.host, args.port, args.latency, args.reply_latency, args.words, args.error_rate, args.jitter)
+    print(f'Stub OpenAI listening on {stub.base_url}')
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,18 @@
+"""pytest setup: Django settings with a scratch MEDIA_ROOT.
+
+The streamer modules derive their file paths from settings at import
+time, so this runs before any test module imports them. Tests do not
+import streamer.views, which loads torch and Coqui.
+"""
+
+import os
+import tempfile
+
+
+def pytest_configure(config):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'live_tts_project.settings')
+    os.environ['MEDIA_ROOT'] = tempfile.mkdtemp(prefix='tts-test-')
+    os.environ.setdefault('OPENAI_API_KEY', 'test')
+
+    import django
+    django.setup()
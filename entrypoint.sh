@@ -3,11 +3,12 @@ set -eu
 
 TTS_DIR="${TTS_MODEL_PATH:-/app/tts_models}"
 
-# Run the downloader if the script exists. The downloader is idempotent and will skip models
-# that already have a completion marker file ('.download_complete'). Running it on every start
-# allows us to recover from partial/incomplete model directories (it will attempt missing ones).
-if [ -f /app/scripts/download_models.py ]; then
-  echo "Running /app/scripts/download_models.py to ensure TTS models are present in ${TTS_DIR}..."
+# Fast path: the model manifest (streamer.model_registry) already lists every model and the
+# files are in place, so start without importing Coqui's ModelManager or touching the network.
+if (cd /app && python -m streamer.model_registry check); then
+  echo "TTS models present in ${TTS_DIR}"
+elif [ -f /app/scripts/download_models.py ]; then
+  echo "Installing missing TTS models into ${TTS_DIR}..."
   # Try to download models but don't fail the container if download fails
   python /app/scripts/download_models.py || echo "Model download failed; continuing startup"
 else
@@ -46,6 +46,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "live_tts_project.wsgi.application"
+ASGI_APPLICATION = "live_tts_project.asgi.application"
 
 DATABASES = {
     "default": {
@@ -62,7 +63,13 @@ USE_I18N = True
 USE_TZ = True
 
 STATIC_URL = "/static/"
+STATIC_ROOT = Path(os.environ.get("STATIC_ROOT", BASE_DIR / "staticfiles"))
 MEDIA_URL = "/media/"
-MEDIA_ROOT = BASE_DIR / "media"
+MEDIA_ROOT = Path(os.environ.get("MEDIA_ROOT", BASE_DIR / "media"))
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# TTS job queue (streamer.queue_backends): "json" (session files under MEDIA_ROOT),
+# "sqlite" (TTS_QUEUE_URL = database path) or "redis" (TTS_QUEUE_URL = redis://host:6379/0)
+TTS_QUEUE_BACKEND = os.environ.get("TTS_QUEUE_BACKEND", "json")
+TTS_QUEUE_URL = os.environ.get("TTS_QUEUE_URL", "")
@@ -1,12 +1,17 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
-from django.conf.urls.static import static
+from django.contrib.staticfiles.urls import staticfiles_urlpatterns
+
+from streamer.media import serve_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('streamer.urls')),
+    # Published audio + playlists. In production the view only authorizes the
+    # request and the front proxy sends the bytes (X-Accel-Redirect / X-Sendfile).
+    re_path(r'^%s(?P<path>.*)$' % settings.MEDIA_URL.lstrip('/'), serve_media, name='media'),
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# Dashboard JS/CSS when running without a front proxy (no-op unless DEBUG)
+urlpatterns += staticfiles_urlpatterns()
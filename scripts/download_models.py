@@ -1,75 +1,20 @@
-import os
-import shutil
-from pathlib import Path
-from TTS.utils.manage import ModelManager
-
-# ------------------------
-# List of models to download
-# ------------------------
-models = [
-    'tts_models/en/ljspeech/tacotron2-DDC',   # English (female)
-    'tts_models/es/css10/vits',              # Spanish male (available)
-    'vocoder_models/universal/libri-tts/fullband-melgan',  # valid vocoder
-]
-
-# ------------------------
-# Target directory inside the Docker image
-# ------------------------
-TARGET_DIR = Path(os.environ.get('TTS_MODEL_PATH', '/app/tts_models'))
-TARGET_DIR.mkdir(parents=True, exist_ok=True)
-
-# Initialize the Coqui TTS model manager
-manager = ModelManager()
-
-for m in models:
-    try:
-        # Preserve hierarchy under TARGET_DIR
-        if m.startswith("tts_models/"):
-            rel_path = m.replace("tts_models/", "")
-            dest = TARGET_DIR / "tts_models" / rel_path
-        else:
-            # vocoder_models
-            rel_path = m.replace("vocoder_models/", "")
-            dest = TARGET_DIR / "vocoder_models" / rel_path
-
-        dest.mkdir(parents=True, exist_ok=True)
-        marker = dest / ".download_complete"
+"""Install the Coqui models the app uses into TTS_MODEL_PATH (see streamer.model_registry).
 
-        if marker.exists():
-            print(f"✅ {m} already marked complete at {dest}, skipping")
-            continue
+Models already recorded in the manifest are skipped, models left by the old
+downloader (with a .download_complete marker) are adopted without a
+download, and the rest are fetched in parallel (MODEL_DOWNLOAD_WORKERS).
+Exits non-zero if any model could not be installed.
+"""
 
-        if any(dest.iterdir()):
-            print(f"⚠️ {m} found at {dest} but no completion marker; verifying download")
-
-        print(f"Downloading model {m} ...")
-        model_path, config_path, _ = manager.download_model(m)
-
-        src = Path(model_path)
-
-        # Copy model files
-        if src.is_dir():
-            shutil.copytree(src, dest, dirs_exist_ok=True)
-        else:
-            shutil.copy2(src, dest / src.name)
-
-        # Copy config if exists
-        if config_path:
-            cfg = Path(config_path)
-            if cfg.exists():
-                shutil.copy2(cfg, dest / cfg.name)
-
-        # Basic verification: check if config.json exists
-        expected_files = ['config.json']
-        if not any((dest / f).exists() for f in expected_files):
-            print(f"⚠️ Warning: {m} copied to {dest} but expected files not found; may be incomplete")
+import os
+import sys
 
-        # Write completion marker
-        marker.write_text(f"{m}\n")
-        print(f"✅ {m} ready")
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
 
-    except Exception as e:
-        print(f"⚠️ Failed to download {m}: {e}")
-        print("⚠️ Skipping and continuing build...")
+from streamer.model_registry import download_all  # noqa: E402
 
-print("Build completed (with available models)")
+if __name__ == '__main__':
+    failed = download_all()
+    sys.exit(1 if failed else 0)
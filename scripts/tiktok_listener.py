@@ -1,4 +1,7 @@
 import os
+import json
+import time
+import uuid
 import asyncio
 import logging
 import signal
@@ -22,6 +25,9 @@ logger = logging.getLogger("tiktok_listener")
 TIKTOK_USERNAME = os.environ.get("TIKTOK_USERNAME", "historiasdelfol")
 POST_URL = os.environ.get("TIKTOK_POST_URL", "http://127.0.0.1:8000/tiktok/comment/")
 SECRET = os.environ.get("TIKTOK_SECRET", "")
+# Append every received comment (with its arrival time) to this JSONL file so
+# the stream can be replayed with benchmarks/comment_firehose.py
+RECORD_FILE = os.environ.get("TIKTOK_RECORD_FILE", "")
 
 # ------------------------
 # TikTok client
@@ -34,6 +40,22 @@ client = TikTokLiveClient(unique_id=TIKTOK_USERNAME)
 http_session: aiohttp.ClientSession | None = None
 
 
+def record_comment(payload: dict):
+    """Append a received comment to RECORD_FILE (one JSON object per line)."""
+    if not RECORD_FILE:
+        return
+    try:
+        with open(RECORD_FILE, "a", encoding="utf-8") as fh:
+            fh.write(json.dumps({
+                "t": payload["received_at"],
+                "comment": payload["comment"],
+                "user": payload["user"],
+                "comment_id": payload.get("comment_id"),
+            }) + "\n")
+    except OSError:
+        logger.exception("Failed to record comment")
+
+
 async def send_comment_to_server(payload: dict):
     """Send comment payload to Django backend"""
     global http_session
@@ -55,7 +77,7 @@ async def send_comment_to_server(payload: dict):
                 timeout=aiohttp.ClientTimeout(total=10),
             ) as resp:
                 if resp.status == 200:
-                    logger.info("Comment sent: %s", payload["comment"])
+                    logger.info("Comment sent (trace %s): %s", payload["trace_id"], payload["comment"])
                     return
                 text = await resp.text()
                 logger.warning("Server error %s: %s", resp.status, text)
@@ -82,8 +104,12 @@ async def on_comment(event: CommentEvent):
             "comment": event.comment.comment,
             "user": event.user.uniqueId,
             "comment_id": getattr(event.comment, "cid", None),
+            # the server continues this trace (see streamer.tracing)
+            "trace_id": uuid.uuid4().hex[:16],
+            "received_at": time.time(),
         }
 
+        record_comment(payload)
         await send_comment_to_server(payload)
 
     except Exception:
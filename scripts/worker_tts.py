@@ -1,14 +1,25 @@
 #!/usr/bin/env python3
-"""Background TTS worker that reads tts_queue.json from MEDIA_ROOT and generates
-one audio file at a time using Coqui TTS.
+"""Background TTS worker that reads the TTS queue (streamer.queue_store; the
+JSON file, SQLite or Redis backend) and generates one audio file at a time
+using Coqui TTS.
 
 Behavior rules (as required):
 - Run forever in a while True loop
 - Load Coqui TTS model(s) ONCE at startup
 - Process exactly one chunk per loop
-- Sleep 1 second after a generated audio
-- Sleep 2 seconds when no pending jobs
+- When no job is pending, block on the wakeup socket (streamer.wakeup) that
+  go_live notifies after enqueueing; WORKER_IDLE_POLL seconds is only the
+  fallback poll interval
+- Run a full gc.collect() adaptively (on going idle, RSS growth or every
+  GC_MAX_JOBS jobs) instead of after every job
 - Use atomic writes (tmp + os.replace)
+- Claim jobs with a lease (worker_id + lease_until) renewed by a heartbeat;
+  only expired leases are reclaimed, and a job that fails TTS_MAX_ATTEMPTS
+  times is quarantined with status 'failed'
+- Publish a compressed rendition (AUDIO_CODEC) next to / instead of the WAV
+- Maintain a per-session playlist (playlists/session_<id>.json/.m3u8)
+- Trade voice quality for real time when chunks miss their playback
+  deadlines (streamer.quality), and switch back once caught up
 - Be tolerant to restarts and idempotent
 - Log with print
 
@@ -18,8 +29,9 @@ Run with: python /app/scripts/worker_tts.py
 import os
 import sys
 import time
-import json
 import gc
+import socket
+import threading
 import traceback
 
 # Ensure Django settings are available
@@ -45,77 +57,34 @@ except Exception as e:
     raise
 
 from django.conf import settings
-from TTS.api import TTS
-from openai import OpenAI
-
-# Try to reuse helpers and model mapping from streamer.views if available
-try:
-    from streamer.views import (
-        TTS_MODELS,
-        generate_long_commentary,
-        add_spanish_pauses,
-        split_text_into_chunks,
-        WORDS_PER_AUDIO,
-    )
-except Exception:
-    TTS_MODELS = {
-        'en': 'tts_models/en/ljspeech/tacotron2-DDC',
-        'es': 'tts_models/es/css10/vits',
-    }
-    # Fallback helpers (small standins)
-    def split_text_into_chunks(text, words_per_chunk=250):
-        words = text.split()
-        return [" ".join(words[i:i + words_per_chunk]) for i in range(0, len(words), words_per_chunk)]
-    def add_spanish_pauses(text):
-        return text
-    def generate_long_commentary(client, model_name, base_prompt, max_tokens, parts=3):
-        # Very small fallback -- in practice the worker will import the real function.
-        return base_prompt
-    WORDS_PER_AUDIO = 250
-
-TTS_MODEL_ROOT = os.environ.get('TTS_MODEL_PATH', '/app/tts_models')
-TTS_QUEUE_FILE = os.path.join(settings.MEDIA_ROOT, 'tts_queue.json')
-
-
-def _ensure_tts_queue():
-    if not os.path.isdir(settings.MEDIA_ROOT):
-        os.makedirs(settings.MEDIA_ROOT, exist_ok=True)
-    if not os.path.exists(TTS_QUEUE_FILE):
-        with open(TTS_QUEUE_FILE, 'w', encoding='utf-8') as fh:
-            json.dump([], fh)
-
-
-def _read_tts_queue():
-    _ensure_tts_queue()
-    with open(TTS_QUEUE_FILE, 'r', encoding='utf-8') as fh:
-        try:
-            return json.load(fh)
-        except Exception:
-            return []
 
-
-def _write_tts_queue(q):
-    tmp = TTS_QUEUE_FILE + '.tmp'
-    with open(tmp, 'w', encoding='utf-8') as fh:
-        json.dump(q, fh)
-    os.replace(tmp, TTS_QUEUE_FILE)
-
-
-def atomic_update_tts_queue(update_fn, retries=5, backoff=0.05):
-    for _ in range(retries):
-        try:
-            _ensure_tts_queue()
-            with open(TTS_QUEUE_FILE, 'r', encoding='utf-8') as fh:
-                q = json.load(fh)
-            new_q = update_fn(q) or q
-            tmp = TTS_QUEUE_FILE + '.tmp'
-            with open(tmp, 'w', encoding='utf-8') as fh:
-                json.dump(new_q, fh)
-            os.replace(tmp, TTS_QUEUE_FILE)
-            return new_q
-        except Exception:
-            time.sleep(backoff)
-    raise RuntimeError('Failed to update tts queue after retries')
+from streamer import metrics
+from streamer.audio import find_rendition, publish_audio
+from streamer.manifest import record_published
+from streamer.model_registry import load_tts
+from streamer.playlist import add_segment, end_session, wav_duration
+from streamer.queue_store import atomic_update_tts_queue
+from streamer.preprocess import prep_for, synthesize
+from streamer.quality import QualityController, degrade, playback_slack
+from streamer.tracing import record_span
+from streamer.retention import FINISHED_STATUSES, RETENTION_INTERVAL, run_retention
+from streamer.schedule import discard_staged, stage_segment, staged_path, unstage
+from streamer.tts_models import FAST_TTS_MODELS, TTS_MODELS
+from streamer.wakeup import Listener, notify_workers
+from streamer.workers import beat
+
+# Job leases: a claimed job belongs to WORKER_ID until lease_until; the
+# heartbeat renews it while synthesis runs. Only expired leases are reclaimed.
+WORKER_ID = os.environ.get('WORKER_ID') or f'{socket.gethostname()}-{os.getpid()}'
+LEASE_SECONDS = int(os.environ.get('TTS_LEASE_SECONDS', '90'))
+HEARTBEAT_INTERVAL = max(1, LEASE_SECONDS // 3)
+MAX_ATTEMPTS = int(os.environ.get('TTS_MAX_ATTEMPTS', '3'))
+
+# Idle behaviour: block on the wakeup socket, poll the queue at most this often
+WORKER_IDLE_POLL = float(os.environ.get('WORKER_IDLE_POLL', '30'))
+# Full collections: after GC_MAX_JOBS jobs or GC_RSS_GROWTH_MB of RSS growth
+GC_MAX_JOBS = int(os.environ.get('GC_MAX_JOBS', '50'))
+GC_RSS_GROWTH_MB = int(os.environ.get('GC_RSS_GROWTH_MB', '256'))
 
 
 def load_models():
@@ -123,143 +92,447 @@ def load_models():
     tts_instances = {}
 
     for lang, model_name in TTS_MODELS.items():
-        safe_name = model_name.replace('/', '_')
-        local_model_path = os.path.join(TTS_MODEL_ROOT, safe_name)
         try:
-            if os.path.isdir(local_model_path):
-                print(f'Loading local TTS model for {lang} from {local_model_path}...')
-                tts = TTS(model_name=local_model_path, progress_bar=False, gpu=False)
-            else:
-                print(f'Loading remote TTS model for {lang} {model_name}...')
-                tts = TTS(model_name=model_name, progress_bar=False, gpu=False)
-            tts_instances[lang] = tts
+            print(f'Loading TTS model for {lang} {model_name}...')
+            tts_instances[lang] = load_tts(model_name)
             print(f'Loaded model for lang={lang}')
         except Exception:
             print(f'Failed to load TTS model for lang={lang}', traceback.format_exc())
     return tts_instances
 
 
-def find_next_job(queue):
-    """Return the first TTS chunk job to process or None.
+def load_fast_models(fast_models):
+    """Load the fast fallback models into fast_models (language -> TTS) in a background thread.
 
-    Criteria: status == 'pending' OR status == 'processing' but the expected
-    file is missing (allows recovery after crashes).
-    Queue items are expected to have: session, index, text, status.
+    Called when quality first drops, so the models are ready by the time it drops to fast_model.
     """
-    for job in queue:
-        status = job.get('status')
-        # support legacy keys (session_ts/idx) for backward compatibility
-        session = job.get('session') if job.get('session') is not None else job.get('session_ts')
-        index = job.get('index') if job.get('index') is not None else job.get('idx')
-        if status == 'pending':
-            return job
-        if status == 'processing':
-            # if file is missing, re-process it
+    def run():
+        for lang, model_name in FAST_TTS_MODELS.items():
+            if lang in fast_models:
+                continue
             try:
-                fn = f"live_{session}_{int(index):03d}.wav" if session is not None and index is not None else None
+                print(f'Loading fast TTS model for {lang} {model_name}...')
+                fast_models[lang] = load_tts(model_name)
+                print(f'Loaded fast model for lang={lang}')
             except Exception:
-                fn = None
-            if fn:
-                path = os.path.join(settings.MEDIA_ROOT, fn)
-                if not os.path.exists(path):
-                    return job
-    return None
+                print(f'Failed to load fast TTS model for lang={lang}', traceback.format_exc())
+
+    thread = threading.Thread(target=run, name='fast-models', daemon=True)
+    thread.start()
+    return thread
+
+
+def _rss_bytes():
+    try:
+        with open('/proc/self/statm', 'r') as fh:
+            return int(fh.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class AdaptiveGC:
+    """Run full collections only when they are likely to pay off.
+
+    Automatic generational GC keeps running as usual; the expensive full pass
+    runs when the worker goes idle, when RSS grew by GC_RSS_GROWTH_MB since the
+    last pass, or after GC_MAX_JOBS jobs, whichever comes first.
+    """
+
+    def __init__(self):
+        self.jobs = 0
+        self.rss = _rss_bytes()
+
+    def freeze_models(self):
+        # the loaded models live for the whole process: keep them out of every future GC scan
+        gc.collect()
+        gc.freeze()
+        self.rss = _rss_bytes()
+
+    def collect(self):
+        gc.collect()
+        self.jobs = 0
+        self.rss = _rss_bytes()
+
+    def after_job(self):
+        self.jobs += 1
+        rss = _rss_bytes()
+        grown = rss is not None and self.rss is not None and rss - self.rss >= GC_RSS_GROWTH_MB * 1024 * 1024
+        if grown or self.jobs >= GC_MAX_JOBS:
+            self.collect()
+
+    def on_idle(self):
+        if self.jobs:
+            self.collect()
+
+
+def _is_job(j, session, index):
+    # support legacy keys (session_ts/idx)
+    return (j.get('session') == session and j.get('index') == index) or (j.get('session_ts') == session and j.get('idx') == index)
+
+
+def _lease_expired(job, now):
+    lease_until = job.get('lease_until')
+    if lease_until is None:
+        # claimed before leases existed: fall back to the last update time
+        return (job.get('updated_at') or 0) + LEASE_SECONDS < now
+    return lease_until < now
+
+
+def claim_next_job(worker_id=WORKER_ID, languages=None):
+    """Atomically claim the first runnable job and return a copy of it, or None.
+
+    Runnable means status == 'pending', or 'processing' with an expired lease
+    (its worker died or hung). Each claim counts as an attempt; a job that has
+    used up MAX_ATTEMPTS is quarantined as 'failed' instead of being claimed
+    again, so one poison chunk cannot crash-loop every worker. With
+    ``languages``, jobs in other languages are left to the workers that
+    loaded a model for them.
+
+    Pre-synthesis of scheduled sessions (jobs flagged 'stage') only uses idle
+    capacity: it is claimed when no other job is runnable.
+    """
+    claimed = []
+    quarantined = []
+
+    def updater(q):
+        # the update may be retried: start from scratch each time
+        del claimed[:], quarantined[:]
+        now = time.time()
+        chosen = staged = None
+        for j in q:
+            status = j.get('status')
+            if status not in ('pending', 'processing'):
+                continue
+            if status == 'processing' and not _lease_expired(j, now):
+                continue
+            if languages is not None and j.get('language', 'en') not in languages:
+                continue
+            if (j.get('attempts') or 0) >= MAX_ATTEMPTS:
+                j['status'] = 'failed'
+                j['error'] = j.get('error') or 'lease expired too many times'
+                j.pop('lease_until', None)
+                j['updated_at'] = int(now)
+                quarantined.append(j)
+                continue
+            if j.get('stage'):
+                staged = staged or j
+                continue
+            chosen = j
+            break
+        j = chosen or staged
+        if j is not None:
+            j['status'] = 'processing'
+            j['worker_id'] = worker_id
+            j['lease_until'] = now + LEASE_SECONDS
+            j['attempts'] = (j.get('attempts') or 0) + 1
+            j['claimed_at'] = now
+            j['updated_at'] = int(now)
+            claimed.append(dict(j))
+        return q
+
+    atomic_update_tts_queue(updater)
+    for j in quarantined:
+        metrics.inc('tts_jobs_finished_total', outcome='quarantined')
+        print(f"Quarantined job session={j.get('session', j.get('session_ts'))} "
+              f"index={j.get('index', j.get('idx'))} after {j.get('attempts')} attempts: {j['error']}")
+    return claimed[0] if claimed else None
+
+
+def renew_lease(session, index, worker_id=WORKER_ID):
+    """Extend the lease on a job this worker still owns; False if it was lost."""
+    renewed = []
+
+    def updater(q):
+        del renewed[:]
+        for j in q:
+            if _is_job(j, session, index):
+                if j.get('status') == 'processing' and j.get('worker_id') == worker_id:
+                    j['lease_until'] = time.time() + LEASE_SECONDS
+                    renewed.append(True)
+                break
+        return q
+
+    atomic_update_tts_queue(updater)
+    return bool(renewed)
+
+
+def _leased_to(j, worker_id, claimed_at):
+    # the claim (not just the worker) must match: this worker may have lost the job and claimed it again
+    return j.get('status') == 'processing' and j.get('worker_id') == worker_id and j.get('claimed_at') == claimed_at
 
 
-def set_job_status(session, index, status_val):
+def set_job_status(session, index, status_val, claimed_at, worker_id=WORKER_ID):
+    """Set the status of a job this worker still holds from the claim at ``claimed_at``; else a no-op."""
+    lost = []
+
     def updater(q):
+        del lost[:]
         for j in q:
-            # support legacy keys
-            if (j.get('session') == session and j.get('index') == index) or (j.get('session_ts') == session and j.get('idx') == index):
+            if _is_job(j, session, index):
+                if not _leased_to(j, worker_id, claimed_at):
+                    lost.append(j.get('status'))
+                    break
                 j['status'] = status_val
+                if status_val != 'processing':
+                    j.pop('lease_until', None)
                 # update a timestamp to help debugging
                 j['updated_at'] = int(time.time())
                 break
         return q
-    atomic_update_tts_queue(updater)
+
+    q = atomic_update_tts_queue(updater)
+    if lost:
+        print(f'Job session={session} index={index} is no longer leased to {worker_id}; left {lost[0]}')
+    return q
+
+
+def release_job(session, index, error, claimed_at, worker_id=WORKER_ID, attempt=True):
+    """Give a job back after a failed attempt: 'pending' again, or 'failed' once attempts are used up.
+
+    With attempt=False the claim is undone instead (the attempt is not counted).
+    A no-op unless the job is still leased to this worker from the claim at ``claimed_at``.
+    """
+    released = {}
+
+    def updater(q):
+        released.clear()
+        for j in q:
+            if _is_job(j, session, index):
+                if not _leased_to(j, worker_id, claimed_at):
+                    break
+                if not attempt:
+                    j['attempts'] = max(0, (j.get('attempts') or 0) - 1)
+                j['status'] = 'failed' if (j.get('attempts') or 0) >= MAX_ATTEMPTS else 'pending'
+                j['error'] = error
+                j.pop('lease_until', None)
+                j['updated_at'] = int(time.time())
+                released.update(status=j['status'], attempts=j.get('attempts'))
+                break
+        return q
+
+    q = atomic_update_tts_queue(updater)
+    if not released or not attempt:
+        return q
+    if released.get('status') == 'failed':
+        metrics.inc('tts_jobs_finished_total', outcome='failed')
+        print(f"Quarantined job session={session} index={index} after {released['attempts']} attempts")
+    else:
+        metrics.inc('tts_jobs_finished_total', outcome='retried')
+    return q
+
+
+class Heartbeat(threading.Thread):
+    """Renews the lease of the job being synthesized and records worker liveness.
+
+    Synthesis of a long chunk can take longer than LEASE_SECONDS, so the lease
+    is extended every HEARTBEAT_INTERVAL while the main loop is busy.
+    """
+
+    def __init__(self):
+        super().__init__(name='lease-heartbeat', daemon=True)
+        self.job = None
+        self.lost = False
+        self.quality = 0
+        self._stop_event = threading.Event()
+
+    def start_job(self, session, index):
+        self.lost = False
+        self.job = (session, index)
+
+    def end_job(self):
+        self.job = None
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        while True:
+            job = self.job
+            try:
+                if job and not renew_lease(*job):
+                    self.lost = True
+                    print(f'Lost lease on session={job[0]} index={job[1]}')
+                beat(WORKER_ID, job=list(job) if job else None, pid=os.getpid(), quality=self.quality)
+            except Exception:
+                print('Heartbeat failed', traceback.format_exc())
+            if self._stop_event.wait(HEARTBEAT_INTERVAL):
+                return
+
+
+def publish_segment(session, index, filename, claimed_at, duration=None, trace_id=None):
+    """Append a finished chunk to the session playlist and media manifest, then mark it done.
+
+    The playlist is closed once no job of the session is left unfinished.
+    Returns the playlist.
+    """
+    playlist = add_segment(session, index, filename, duration)
+    record_published(filename, **({'trace_ids': [trace_id]} if trace_id else {}))
+    q = set_job_status(session, index, 'done', claimed_at)
+    remaining = [
+        j for j in q
+        if (j.get('session') if j.get('session') is not None else j.get('session_ts')) == session
+        and j.get('status') not in FINISHED_STATUSES
+    ]
+    if not remaining:
+        end_session(session)
+        print(f'Session {session} complete; playlist closed')
+    return playlist
+
+
+def stage_job(job, session, index, temp_path, duration):
+    """Hold a pre-synthesized chunk of a scheduled session in STAGED_DIR until its go live.
+
+    Returns the published filename when the session went live in the meantime
+    (publish it like any other chunk), else None.
+    """
+    rev = job.get('rev', 0)
+    staged_file = publish_audio(temp_path, staged_path(session, index, rev))
+    outcome = stage_segment(session, index, rev, staged_file, duration)
+    if outcome == 'publish':
+        return unstage(session, index, rev, staged_file)
+    if outcome == 'discard':
+        # the opening was rewritten while this chunk was being synthesized
+        discard_staged(session, index, rev)
+        print(f'Discarded superseded staged chunk session={session} index={index} rev={rev}')
+    else:
+        metrics.inc('tts_jobs_finished_total', outcome='staged')
+        print(f'Staged session={session} index={index} for its scheduled go live')
+    return None
 
 
 def main_loop():
     tts_models = load_models()
-    print('Worker started; entering main loop')
+    collector = AdaptiveGC()
+    collector.freeze_models()
+    wakeup = Listener(WORKER_ID)
+    heartbeat = Heartbeat()
+    heartbeat.start()
+    quality = QualityController()
+    fast_models = {}
+    fast_loader = None
+    print(f'Worker {WORKER_ID} started; entering main loop')
+    last_retention = 0
 
     while True:
         try:
-            q = _read_tts_queue()
-            job = find_next_job(q)
+            claim_started = time.time()
+            job = claim_next_job(languages=set(tts_models))
 
             if not job:
-                # nothing to do
-                time.sleep(2)
+                # nothing to do: use idle time for retention (archive / compact / evict)
+                if RETENTION_INTERVAL and time.time() - last_retention >= RETENTION_INTERVAL:
+                    last_retention = time.time()
+                    try:
+                        report = run_retention()
+                        print(f"Retention: archived {report['archive']['jobs']} jobs, "
+                              f"evicted {report['media']['clips']} clips, "
+                              f"reclaimed {report['bytes_reclaimed']} bytes")
+                    except Exception:
+                        print('Retention pass failed', traceback.format_exc())
+                collector.on_idle()
+                metrics.flush(force=True)
+                # sleep until go_live (or another producer) signals new work
+                wait = WORKER_IDLE_POLL
+                if RETENTION_INTERVAL:
+                    wait = min(wait, max(0.0, last_retention + RETENTION_INTERVAL - time.time()))
+                wakeup.wait(wait)
                 continue
 
-
-            # get data from the job using the new schema
-            session = job.get('session')
-            index = int(job.get('index')) if job.get('index') is not None else 0
-            text = job.get('text', '')
+            # support legacy keys (session_ts/idx)
+            session = job.get('session') if job.get('session') is not None else job.get('session_ts')
+            raw_index = job.get('index') if job.get('index') is not None else job.get('idx')
+            index = int(raw_index) if raw_index is not None else 0
             language = job.get('language', 'en')
-
-            # mark processing (atomic)
-            set_job_status(session, index, 'processing')
-
-            # reload job (in case something changed)
-            q2 = _read_tts_queue()
-            myjob = None
-            for j in q2:
-                if j.get('session') == session and int(j.get('index', -1)) == index:
-                    myjob = j
-                    break
-
-            if not myjob:
-                print('Job disappeared from queue, skipping')
-                continue
-
-            filename = f"live_{session}_{index:03d}.wav"
-            final_path = os.path.join(settings.MEDIA_ROOT, filename)
-
-            # If file already exists, mark done and continue
-            if os.path.exists(final_path):
-                print(f'File already exists {final_path}; marking done')
-                set_job_status(session, index, 'done')
+            trace_id = job.get('trace_id')
+            print(f"Claimed session={session} index={index} (attempt {job['attempts']}/{MAX_ATTEMPTS}) trace={trace_id}")
+            if job.get('created_at') and job['attempts'] == 1:
+                record_span(trace_id, 'queue_wait', job['created_at'], job['claimed_at'], index=index)
+            record_span(trace_id, 'claim', claim_started, job['claimed_at'], index=index, worker=WORKER_ID)
+
+            stem = f"live_{session}_{index:03d}"
+            final_path = os.path.join(settings.MEDIA_ROOT, stem + '.wav')
+
+            # If any rendition already exists, mark done and continue
+            existing = find_rendition(settings.MEDIA_ROOT, stem)
+            if existing:
+                print(f'File already exists {existing}; marking done')
+                publish_segment(session, raw_index, existing, job['claimed_at'], wav_duration(final_path), trace_id)
                 continue
 
-            tts = tts_models.get(language)
+            # while behind real time: faster voice settings, then the fast model once it is loaded
+            level = quality.level
+            if level >= 2 and language not in fast_models:
+                level = 1
+            tts = fast_models.get(language) if level >= 2 else tts_models.get(language)
             if not tts:
-                print(f'No TTS model loaded for language {language}; setting job back to pending')
-                set_job_status(session, index, 'pending')
+                print(f'No TTS model loaded for language {language}; releasing job')
+                # not the job's fault: give the claim back without spending an attempt
+                release_job(session, raw_index, f'no TTS model loaded for {language}', job['claimed_at'], attempt=False)
+                # let a worker that has the model pick it up
+                notify_workers()
                 time.sleep(1)
                 continue
 
-            temp_path = final_path + '.tmp'
+            # per-worker temp file: a reclaimed job may briefly have two writers
+            temp_path = f'{final_path}.{WORKER_ID}.tmp'
+            heartbeat.start_job(session, raw_index)
+            synth_started = time.time()
             try:
                 # generate audio to temp path
                 print(f'Generating audio for session={session} index={index} to {temp_path} ...')
 
-                if language == 'es':
-                    tts.tts_to_file(
-                        text=text,
-                        file_path=temp_path,
-                        length_scale=1.45,
-                        noise_scale=0.6,
-                        noise_scale_w=0.75
-                    )
-                else:
-                    tts.tts_to_file(text=text, file_path=temp_path)
-
-                # atomic move into place
-                os.replace(temp_path, final_path)
-                set_job_status(session, index, 'done')
-                print(f'Job complete: {final_path}')
+                # text was preprocessed at enqueue time; only inference runs here
+                prep = degrade(prep_for(job), language, level)
+                synthesize(tts, prep, temp_path)
 
-            except Exception:
+                heartbeat.end_job()
+                if heartbeat.lost and find_rendition(settings.MEDIA_ROOT, stem):
+                    # another worker reclaimed the job and already published it
+                    print(f'Lease lost and {stem} already published; discarding')
+                    os.remove(temp_path)
+                else:
+                    # encode the compressed rendition and atomically move into place
+                    synth_ended = time.time()
+                    duration = wav_duration(temp_path)
+                    model_name = prep['model']
+                    metrics.observe_synthesis(model_name, synth_ended - synth_started, duration)
+                    record_span(trace_id, 'synthesis', synth_started, synth_ended,
+                                index=index, model=model_name, audio_seconds=duration, quality=level)
+                    if job.get('stage'):
+                        published = stage_job(job, session, raw_index, temp_path, duration)
+                    else:
+                        published = publish_audio(temp_path, final_path)
+                    if published:
+                        playlist = publish_segment(session, raw_index, published, job['claimed_at'], duration, trace_id)
+                        record_span(trace_id, 'publish', synth_ended, index=index, filename=published)
+                        metrics.inc('tts_jobs_finished_total', outcome='done')
+                        print(f'Job complete: {published}')
+                        slack = playback_slack(playlist, raw_index)
+                        previous = quality.level
+                        switched = quality.observe(slack)
+                        if switched:
+                            direction = 'down' if quality.level > previous else 'up'
+                            metrics.inc('tts_quality_switches_total', level=switched, direction=direction)
+                            print(f'Quality {direction} to {switched}: chunk {index} of session {session} '
+                                  f'had {slack:.1f}s of playback slack')
+                            heartbeat.quality = quality.level
+                            beat(WORKER_ID, quality=quality.level)
+                            if fast_loader is None and quality.max_level >= 2:
+                                # warm the fast model up at the first sign of trouble
+                                fast_loader = load_fast_models(fast_models)
+
+            except Exception as e:
+                heartbeat.end_job()
                 print('TTS generation failed', traceback.format_exc())
-                # reset to pending so it can be retried later
-                set_job_status(session, index, 'pending')
+                record_span(trace_id, 'synthesis', synth_started, index=index, error=f'{type(e).__name__}: {e}')
+                # back to pending for another attempt (or quarantined once attempts are used up)
+                release_job(session, raw_index, f'{type(e).__name__}: {e}', job['claimed_at'])
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                # short backoff before the retry
+                time.sleep(1)
 
-            # housekeeping
-            gc.collect()
-            time.sleep(0.3)
+            collector.after_job()
         except Exception:
             print('Worker main loop exception', traceback.format_exc())
             time.sleep(2)
@@ -0,0 +1,152 @@
+"""Compressed audio renditions for the WAV files written by Coqui TTS.
+
+The worker and the reply pipeline synthesize to a temporary WAV. Before the
+file is published, it is piped through ffmpeg (stdin -> stdout, no extra
+intermediate files) to produce a compressed rendition next to it. The WAV is
+kept or dropped depending on AUDIO_KEEP_WAV.
+
+Settings (environment):
+- AUDIO_CODEC: 'mp3' (default), 'opus', or 'wav' to disable encoding
+- AUDIO_BITRATE: encoder bitrate, e.g. '64k' (default) or '32k' for opus
+- AUDIO_KEEP_WAV: '0' (default) replaces the WAV, '1' keeps it alongside
+"""
+
+import os
+import re
+import logging
+import subprocess
+
+logger = logging.getLogger(__name__)
+
+AUDIO_CODEC = os.environ.get('AUDIO_CODEC', 'mp3').strip().lower()
+AUDIO_BITRATE = os.environ.get('AUDIO_BITRATE', '64k').strip()
+AUDIO_KEEP_WAV = os.environ.get('AUDIO_KEEP_WAV', '0') == '1'
+FFMPEG_BIN = os.environ.get('FFMPEG_BIN', 'ffmpeg')
+FFMPEG_TIMEOUT = int(os.environ.get('FFMPEG_TIMEOUT', '300'))
+
+# codec -> output extension and ffmpeg encoder arguments
+CODECS = {
+    'mp3': {
+        'ext': '.mp3',
+        'args': ['-c:a', 'libmp3lame', '-f', 'mp3'],
+    },
+    'opus': {
+        'ext': '.opus',
+        'args': ['-c:a', 'libopus', '-application', 'voip', '-f', 'ogg'],
+    },
+}
+
+# Every extension a published audio file may have, most preferred first.
+# Listings show one file per stem, picking the first rendition that exists.
+AUDIO_EXTENSIONS = tuple(
+    [CODECS[AUDIO_CODEC]['ext']] if AUDIO_CODEC in CODECS else []
+) + tuple(
+    spec['ext'] for name, spec in CODECS.items() if name != AUDIO_CODEC
+) + ('.wav',)
+
+AUDIO_EXT_RE = '|'.join(re.escape(ext.lstrip('.')) for ext in AUDIO_EXTENSIONS)
+
+
+def split_audio_name(filename):
+    """Return (stem, ext) when filename is a published audio file, else (None, None)."""
+    stem, ext = os.path.splitext(filename)
+    if ext.lower() not in AUDIO_EXTENSIONS:
+        return None, None
+    return stem, ext.lower()
+
+
+def preferred_rendition(filenames):
+    """Pick the most preferred filename out of several renditions of one stem."""
+    def rank(fn):
+        ext = os.path.splitext(fn)[1].lower()
+        return AUDIO_EXTENSIONS.index(ext) if ext in AUDIO_EXTENSIONS else len(AUDIO_EXTENSIONS)
+    return min(filenames, key=rank) if filenames else None
+
+
+def find_rendition(media_root, stem):
+    """Return the preferred existing filename for stem in media_root, or None."""
+    for ext in AUDIO_EXTENSIONS:
+        fn = stem + ext
+        if os.path.exists(os.path.join(media_root, fn)):
+            return fn
+    return None
+
+
+def rendition_paths(media_root, stem):
+    """All existing file paths (every rendition) for stem."""
+    paths = []
+    for ext in AUDIO_EXTENSIONS:
+        path = os.path.join(media_root, stem + ext)
+        if os.path.exists(path):
+            paths.append(path)
+    return paths
+
+
+def encode_wav(wav_path, out_path, codec=None, bitrate=None):
+    """Encode wav_path into out_path by piping it through ffmpeg.
+
+    The WAV is streamed to ffmpeg's stdin and the encoded bytes are streamed
+    from stdout into a per-process temp file, which is then atomically moved
+    into place. Raises on encoder failure.
+    """
+    codec = codec or AUDIO_CODEC
+    bitrate = bitrate or AUDIO_BITRATE
+    spec = CODECS[codec]
+
+    cmd = [
+        FFMPEG_BIN, '-hide_banner', '-loglevel', 'error', '-nostdin',
+        '-f', 'wav', '-i', 'pipe:0',
+        '-ac', '1',
+        *spec['args'],
+        '-b:a', bitrate,
+        'pipe:1',
+    ]
+
+    tmp = f'{out_path}.{os.getpid()}.tmp'
+    try:
+        with open(wav_path, 'rb') as src, open(tmp, 'wb') as dst:
+            proc = subprocess.run(
+                cmd,
+                stdin=src,
+                stdout=dst,
+                stderr=subprocess.PIPE,
+                timeout=FFMPEG_TIMEOUT,
+            )
+        if proc.returncode != 0:
+            raise RuntimeError(
+                f'ffmpeg exited with {proc.returncode}: {proc.stderr.decode("utf-8", "replace").strip()}'
+            )
+        os.replace(tmp, out_path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return out_path
+
+
+def publish_audio(temp_wav_path, final_wav_path):
+    """Publish a freshly synthesized WAV, encoding a compressed rendition first.
+
+    The compressed file is written before the WAV is moved into place so that
+    listings never briefly advertise the WAV of a chunk that will also get a
+    compressed rendition. If encoding fails the WAV is always kept.
+
+    Returns the basename of the preferred published file.
+    """
+    spec = CODECS.get(AUDIO_CODEC)
+    if not spec:
+        os.replace(temp_wav_path, final_wav_path)
+        return os.path.basename(final_wav_path)
+
+    out_path = os.path.splitext(final_wav_path)[0] + spec['ext']
+    try:
+        encode_wav(temp_wav_path, out_path)
+    except Exception:
+        logger.exception('Audio encoding failed for %s; publishing WAV only', final_wav_path)
+        os.replace(temp_wav_path, final_wav_path)
+        return os.path.basename(final_wav_path)
+
+    if AUDIO_KEEP_WAV:
+        os.replace(temp_wav_path, final_wav_path)
+    else:
+        os.remove(temp_wav_path)
+    return os.path.basename(out_path)
@@ -0,0 +1,251 @@
+"""Synthesis capacity: when queued chunks will be ready, and whether a new live fits.
+
+``forecast`` replays the queue the way workers claim it. Live jobs come in
+queue order, then pre-synthesis of scheduled sessions. Each job goes to
+the first worker that is free, with the duration predicted by
+streamer.chunking.SynthesisCost (the measured per-model RTF once it is
+calibrated). The worker count is the number of live heartbeats. The
+result is a ready-by time per job.
+
+A session is played back from the moment its first chunk is ready, each
+chunk right after the previous one. A chunk whose ETA falls after its
+playback deadline means silence; ``stall`` is the total silence a
+listener would hear.
+
+``admit`` runs the forecast for a live that is not generated yet, from
+the expected length of its commentary (ADMISSION_MODE):
+
+- ``reduce`` (default): the first of the shorter lengths
+  (commentary.length_options) that starts within ADMISSION_MAX_START_DELAY
+  and stalls less than ADMISSION_MAX_STALL;
+- ``defer``: the requested length only.
+
+When no length fits, the live is deferred. ``retry_after`` is how long
+until it would start in time, and when it would stall, how long until the
+jobs claimed before it (in flight and live) are done. It is rejected when
+even the shortest length would stall on an empty queue, i.e. the workers
+are too slow for real time. With ``off`` every live is admitted; the
+estimate is still returned.
+
+New lives are planned from unpunctuated stand-in text, because the prompts
+ask for run-on speech: chunk_text then cuts it into the same
+CHUNK_MAX_SENTENCE_WORDS units as the real commentary.
+"""
+
+import os
+import math
+import time
+import heapq
+
+from .chunking import SynthesisCost, chunk_text
+from .queue_backends import job_key
+from .queue_store import job_index, job_session
+from .tts_models import model_for
+from .workers import live_workers
+
+ADMISSION_MODE = os.environ.get('ADMISSION_MODE', 'reduce')
+ADMISSION_MAX_START_DELAY = float(os.environ.get('ADMISSION_MAX_START_DELAY', '300'))
+ADMISSION_MAX_STALL = float(os.environ.get('ADMISSION_MAX_STALL', '30'))
+ADMISSION_MIN_WORDS = int(os.environ.get('ADMISSION_MIN_WORDS', '1500'))
+
+
+class Costs:
+    """SynthesisCost per model, built once per forecast (each reads the metrics files)."""
+
+    def __init__(self):
+        self._costs = {}
+
+    def model(self, model):
+        if model not in self._costs:
+            self._costs[model] = SynthesisCost(model)
+        return self._costs[model]
+
+    def job(self, job):
+        """(predicted synthesis seconds, predicted audio seconds) of a queued job."""
+        model = (job.get('prep') or {}).get('model') or model_for(job.get('language', 'en'))
+        cost = self.model(model)
+        words = len((job.get('text') or '').split())
+        return cost.synthesis_seconds(words), cost.audio_seconds(words)
+
+
+def worker_count():
+    """Live workers; at least one, so a live started before its worker still gets an estimate."""
+    return max(1, len(live_workers()))
+
+
+def _runnable(q):
+    """Jobs a worker may still claim, in claim order: (in flight, live jobs, pre-synthesis)."""
+    running, live, staged = [], [], []
+    for j in q:
+        status = j.get('status')
+        if status == 'processing':
+            running.append(j)
+        elif status == 'pending':
+            (staged if j.get('stage') else live).append(j)
+    return running, live, staged
+
+
+def forecast(q, workers, costs, now=None, extra=()):
+    """{job key: ready-by time} of every unfinished job, plus ``extra``.
+
+    extra is a list of (key, synthesis seconds) for jobs not queued yet; they
+    are claimed after the live jobs already queued, before pre-synthesis.
+    """
+    now = time.time() if now is None else now
+    running, live, staged = _runnable(q)
+    free = []
+    etas = {}
+    # jobs in flight keep a worker busy until their predicted end (their lease may have expired: treat as queued)
+    for j in sorted(running, key=lambda j: j.get('claimed_at') or now):
+        if len(free) < workers and (j.get('lease_until') or 0) > now:
+            end = max(now, (j.get('claimed_at') or now) + costs.job(j)[0])
+            etas[job_key(j)] = end
+            free.append(end)
+        else:
+            live.insert(0, j)
+    free += [now] * (workers - len(free))
+    heapq.heapify(free)
+
+    def run(key, seconds):
+        start = heapq.heappop(free)
+        etas[key] = start + seconds
+        heapq.heappush(free, etas[key])
+
+    for j in live:
+        run(job_key(j), costs.job(j)[0])
+    for key, seconds in extra:
+        run(key, seconds)
+    for j in staged:
+        run(job_key(j), costs.job(j)[0])
+    return etas
+
+
+def stall(chunks):
+    """Silence heard over a session: chunks is [(ready-by, audio seconds), ...] in playback order.
+
+    The first entry's ready-by is when playback starts (or started).
+    """
+    if not chunks:
+        return 0.0
+    deadline = chunks[0][0]
+    worst = 0.0
+    for ready, audio in chunks:
+        worst = max(worst, ready - deadline)
+        deadline += audio
+    return worst
+
+
+def session_eta(q, session, etas, costs, now=None):
+    """ETA summary of one session: first chunk, ready-by, expected stall and per-chunk ready-by times."""
+    now = time.time() if now is None else now
+    jobs = sorted((j for j in q if job_session(j) == session), key=lambda j: job_index(j) or 0)
+    chunks, timeline = [], []
+    for j in jobs:
+        eta = etas.get(job_key(j))
+        audio = costs.job(j)[1]
+        if j.get('status') == 'done':
+            ready = j.get('updated_at') or now
+        elif eta is None:
+            # failed, or scheduled and not claimable yet
+            ready = None
+        else:
+            ready = eta
+        if ready is not None:
+            timeline.append((ready, audio))
+        chunks.append({'index': job_index(j), 'status': j.get('status'), 'eta': _ts(eta), 'audio_seconds': round(audio, 1)})
+    pending = [c['eta'] for c in chunks if c['eta'] is not None]
+    first = chunks[0]['eta'] if chunks else None
+    return {
+        'session': session,
+        'first_chunk_at': first,
+        'ready_by': max(pending) if pending else None,
+        'stall_seconds': round(stall(timeline), 1),
+        'chunks': chunks,
+    }
+
+
+def sessions_eta(q, now=None):
+    """session_eta of every session with unfinished work, plus the workers and backlog used."""
+    now = time.time() if now is None else now
+    costs = Costs()
+    workers = worker_count()
+    etas = forecast(q, workers, costs, now)
+    sessions = {job_session(j) for j in q if job_key(j) in etas}
+    return {
+        'workers': workers,
+        'backlog_seconds': round(max(etas.values(), default=now) - now, 1),
+        'sessions': {s: session_eta(q, s, etas, costs, now) for s in sessions},
+    }
+
+
+def _ts(t):
+    return round(t, 1) if t is not None else None
+
+
+def planned_chunks(words, model, costs):
+    """(synthesis, audio) seconds of the chunks chunk_text would make of ``words`` words."""
+    cost = costs.model(model)
+    # commentary is unpunctuated by prompt design: plan from run-on text, cut into the same units
+    text = ' '.join(['word'] * max(1, round(words)))
+    sizes = [len(c.split()) for c in chunk_text(text, model)]
+    return [(cost.synthesis_seconds(n), cost.audio_seconds(n)) for n in sizes]
+
+
+def _estimate(q, workers, costs, model, words, now):
+    planned = planned_chunks(words, model, costs)
+    extra = [(f'new:{i}', synth) for i, (synth, _) in enumerate(planned)]
+    etas = forecast(q, workers, costs, now, extra)
+    timeline = [(etas[key], audio) for (key, _), (_, audio) in zip(extra, planned)]
+    return {
+        'words': words,
+        'chunks': len(planned),
+        'first_chunk_at': _ts(timeline[0][0]) if timeline else None,
+        'ready_by': _ts(max(t for t, _ in timeline)) if timeline else None,
+        'stall_seconds': round(stall(timeline), 1),
+    }
+
+
+def drain_seconds(q, workers, costs, now):
+    """Seconds until the jobs a worker claims before a new live (in flight and live jobs) are done."""
+    running, live, _ = _runnable(q)
+    etas = forecast(running + live, workers, costs, now)
+    return max(etas.values(), default=now) - now
+
+
+def _fits(estimate, now):
+    start = (estimate['first_chunk_at'] or now) - now
+    return start <= ADMISSION_MAX_START_DELAY and estimate['stall_seconds'] <= ADMISSION_MAX_STALL
+
+
+def admit(q, language, options, now=None, mode=None):
+    """Decide whether a new live of ``language`` fits; options come from commentary.length_options.
+
+    Returns {'decision': 'admit' | 'reduce' | 'defer' | 'reject', 'kwargs': commentary
+    arguments to use, 'eta': estimate, 'retry_after': seconds (defer)}.
+    """
+    now = time.time() if now is None else now
+    mode = mode or ADMISSION_MODE
+    costs = Costs()
+    workers = worker_count()
+    model = model_for(language)
+    if mode != 'reduce':
+        options = options[:1]
+
+    estimate = None
+    for i, (kwargs, words) in enumerate(options):
+        if i and words < ADMISSION_MIN_WORDS:
+            break
+        estimate = _estimate(q, workers, costs, model, words, now)
+        if mode == 'off' or _fits(estimate, now):
+            return {'decision': 'reduce' if i else 'admit', 'kwargs': kwargs, 'eta': estimate, 'workers': workers}
+
+    decision = {'kwargs': options[0][0], 'eta': estimate, 'workers': workers}
+    # the shortest length did not fit either: is it the backlog, or are the workers too slow?
+    if not _fits(_estimate([], workers, costs, model, estimate['words'], now), now):
+        return dict(decision, decision='reject')
+    # queued work drains in real time; the live fits once enough of it is done
+    late = estimate['first_chunk_at'] - now - ADMISSION_MAX_START_DELAY
+    if estimate['stall_seconds'] > ADMISSION_MAX_STALL:
+        # the live jobs ahead compete for the workers; with them done it fits (the empty-queue check passed)
+        late = max(late, drain_seconds(q, workers, costs, now))
+    return dict(decision, decision='defer', retry_after=max(1, math.ceil(late)))
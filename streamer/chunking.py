@@ -0,0 +1,187 @@
+"""Splitting commentary text into TTS chunks (one queue job and one audio file each).
+
+``chunk_text`` replaces cutting every WORDS_PER_AUDIO words:
+
+- It cuts only at sentence ends and line breaks. Over-long sentences are cut
+  at commas / colons, and only as a last resort mid-sentence. Every unit gets
+  terminal punctuation, because Coqui synthesizes sentence by sentence and
+  Tacotron2 attention gets slow and unstable on one endless sentence.
+- It sizes chunks with a per-model cost model. Speech rate gives the audio
+  length. Real-time factor, with a superlinear length term for attention
+  models, gives the synthesis time. The RTF is calibrated from the
+  ``tts_synthesis_rtf`` metric once enough chunks were synthesized. No chunk
+  may exceed CHUNK_MAX_AUDIO_SECONDS of audio or CHUNK_MAX_SYNTH_SECONDS of
+  predicted synthesis.
+- The first chunk targets CHUNK_FIRST_AUDIO_SECONDS so playback starts
+  early. The following chunks grow only as fast as one worker can keep up:
+  each is synthesized while all the audio ready before it plays, so the
+  slack the small chunks build up lets the sizes climb to the cap. The rest
+  of the text is split into equal chunks.
+"""
+
+import os
+import re
+import math
+
+from . import metrics
+
+# ~3 minutes per audio (fixed-size splitting, see split_text_into_chunks)
+WORDS_PER_AUDIO = 480
+
+CHUNK_MAX_AUDIO_SECONDS = float(os.environ.get('CHUNK_MAX_AUDIO_SECONDS', '120'))
+CHUNK_MAX_SYNTH_SECONDS = float(os.environ.get('CHUNK_MAX_SYNTH_SECONDS', '60'))
+CHUNK_FIRST_AUDIO_SECONDS = float(os.environ.get('CHUNK_FIRST_AUDIO_SECONDS', '15'))
+# longer sentences are cut at pauses (or, failing that, mid-sentence)
+CHUNK_MAX_SENTENCE_WORDS = int(os.environ.get('CHUNK_MAX_SENTENCE_WORDS', '40'))
+# synthesized chunks of a model needed before its measured RTF replaces the default
+CHUNK_CALIBRATION_MIN = int(os.environ.get('CHUNK_CALIBRATION_MIN', '5'))
+
+# words_per_second: speech rate of the voice; rtf: synthesis seconds per audio
+# second on CPU for a short input; attention_words: input length at which
+# attention doubles the per-word cost (None: cost is linear in length)
+MODEL_COSTS = {
+    'tts_models/en/ljspeech/tacotron2-DDC': {'words_per_second': 2.6, 'rtf': 0.6, 'attention_words': 400},
+    # the worker slows this voice down (length_scale 1.45)
+    'tts_models/es/css10/vits': {'words_per_second': 1.9, 'rtf': 0.3, 'attention_words': None},
+    # fast fallback of the English voice (streamer.quality)
+    'tts_models/en/ljspeech/vits': {'words_per_second': 2.6, 'rtf': 0.25, 'attention_words': None},
+}
+DEFAULT_COST = {'words_per_second': 2.5, 'rtf': 0.5, 'attention_words': None}
+
+_SENTENCE_RE = re.compile(r'(?<=[.!?])\s+|\s*\n+\s*')
+_PAUSE_RE = re.compile(r'(?<=[,;:])\s+')
+
+
+class SynthesisCost:
+    """Predicted audio length and synthesis time of a chunk of ``words`` words for one model."""
+
+    def __init__(self, model):
+        cost = dict(DEFAULT_COST, **MODEL_COSTS.get(model, {}))
+        measured = metrics.mean('tts_synthesis_rtf', min_count=CHUNK_CALIBRATION_MIN, model=model)
+        self.words_per_second = cost['words_per_second']
+        self.rtf = measured or cost['rtf']
+        self.attention_words = cost['attention_words']
+
+    def audio_seconds(self, words):
+        return words / self.words_per_second
+
+    def synthesis_seconds(self, words):
+        growth = 1 + words / self.attention_words if self.attention_words else 1
+        return self.audio_seconds(words) * self.rtf * growth
+
+    def max_words(self, audio_budget, synth_budget=CHUNK_MAX_SYNTH_SECONDS):
+        """Largest chunk (at least one word) within both budgets."""
+        words = max(1, int(audio_budget * self.words_per_second))
+        if self.synthesis_seconds(words) <= synth_budget:
+            return words
+        lo, hi = 1, words
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if self.synthesis_seconds(mid) <= synth_budget:
+                lo = mid
+            else:
+                hi = mid - 1
+        return lo
+
+
+def _terminate(unit):
+    return unit if unit[-1] in '.!?' else unit + '.'
+
+
+def split_units(text, max_words):
+    """Sentences (or pause-delimited pieces of long ones) of at most max_words words."""
+    units = []
+    for sentence in _SENTENCE_RE.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        pieces = [sentence]
+        if len(sentence.split()) > max_words:
+            pieces = [p for p in _PAUSE_RE.split(sentence) if p.strip()]
+        for piece in pieces:
+            words = piece.split()
+            for i in range(0, len(words), max_words):
+                units.append(_terminate(' '.join(words[i:i + max_words]).rstrip(',;:')))
+    return units
+
+
+def _take(units, limit):
+    """Pop units from the front up to ``limit`` words (always at least one)."""
+    taken, count = [], 0
+    while units and (not taken or count + len(units[0].split()) <= limit):
+        count += len(units[0].split())
+        taken.append(units.pop(0))
+    return taken, count
+
+
+def chunk_text(text, model, ramp=True):
+    """Split text into chunks sized for ``model`` (see module docstring)."""
+    cost = SynthesisCost(model)
+    cap = cost.max_words(CHUNK_MAX_AUDIO_SECONDS)
+    units = split_units(text, min(cap, CHUNK_MAX_SENTENCE_WORDS))
+    chunks = []
+
+    limit = cost.max_words(CHUNK_FIRST_AUDIO_SECONDS) if ramp else cap
+    # audio ready ahead of playback when the worker starts on the next chunk
+    ahead = 0.0
+    while units and limit < cap:
+        taken, count = _take(units, limit)
+        if chunks:
+            ahead = max(0.0, ahead - cost.synthesis_seconds(count))
+        ahead += cost.audio_seconds(count)
+        chunks.append(' '.join(taken))
+        # the next chunk is synthesized while the audio ahead plays; when even
+        # that cannot keep up (RTF >= 1) ramping is pointless
+        grown = cost.max_words(CHUNK_MAX_AUDIO_SECONDS, min(CHUNK_MAX_SYNTH_SECONDS, ahead))
+        limit = grown if grown > count else cap
+
+    total = sum(len(u.split()) for u in units)
+    if not total:
+        return chunks
+    # equal shares of the rest: cut at the unit boundary nearest to each share, never above the cap
+    target = total / math.ceil(total / cap)
+    current, count, position, shares = [], 0, 0, 1
+    for unit in units:
+        n = len(unit.split())
+        if current and (count + n > cap or position + n / 2 > target * shares):
+            chunks.append(' '.join(current))
+            current, count = [], 0
+            shares += 1
+        current.append(unit)
+        count += n
+        position += n
+    if current:
+        # a small remainder rides along with the previous chunk when it fits
+        if chunks and count < target / 4 and len(chunks[-1].split()) + count <= cap:
+            chunks[-1] += ' ' + ' '.join(current)
+        else:
+            chunks.append(' '.join(current))
+    return chunks
+
+
+def split_like(text, sizes):
+    """Split text at sentence boundaries into len(sizes) chunks proportional to ``sizes`` (word counts).
+
+    Used when a chunk range is rewritten in place: chunk indexes must not change.
+    """
+    units = split_units(text, CHUNK_MAX_SENTENCE_WORDS)
+    total = sum(len(u.split()) for u in units)
+    scale = total / (sum(sizes) or 1)
+    chunks = [[] for _ in sizes]
+    bounds = [scale * sum(sizes[:i + 1]) for i in range(len(sizes))]
+    position, slot = 0, 0
+    for unit in units:
+        n = len(unit.split())
+        while slot < len(sizes) - 1 and chunks[slot] and position + n / 2 > bounds[slot]:
+            slot += 1
+        chunks[slot].append(unit)
+        position += n
+    return [' '.join(c) for c in chunks]
+
+
+def split_text_into_chunks(text, words_per_chunk=WORDS_PER_AUDIO):
+    words = text.split()
+    return [
+        " ".join(words[i:i + words_per_chunk])
+        for i in range(0, len(words), words_per_chunk)
+    ]
@@ -0,0 +1,733 @@
+"""Live commentary prompts and long commentary generation, sequential or outline-then-parallel.
+
+Sequential mode asks for one part after another. Each part gets the tail
+of the text so far as context, so the wall time is parts x part latency.
+
+Outline mode (COMMENTARY_MODE=outline) first asks for a compact outline:
+a shared summary plus one section per part. It then requests every part
+at the same time. Each part gets its own section, the summary and the
+titles of its neighbours, so the wall time is close to one outline call
+plus one part. Parts written in parallel can restate each other where
+they meet. ``dedupe_seam`` drops the opening sentences of a part that
+repeat the end of the previous one.
+"""
+
+import os
+import re
+import json
+import asyncio
+import logging
+
+from .openai_client import acreate_response, create_response
+from .tracing import span
+
+logger = logging.getLogger(__name__)
+
+COMMENTARY_MODE = os.environ.get('COMMENTARY_MODE', 'outline')
+COMMENTARY_TARGET_WORDS = int(os.environ.get('COMMENTARY_TARGET_WORDS', '8000'))
+OUTLINE_MAX_TOKENS = int(os.environ.get('OUTLINE_MAX_TOKENS', '4000'))
+# words each sequential continuation asks for
+SEQUENTIAL_PART_WORDS = 3000
+
+# seam check: sentences in the first SEAM_WORDS words of a part are compared
+# with the last SEAM_WORDS words of the previous one
+SEAM_WORDS = 300
+SHINGLE = 5
+SEAM_OVERLAP = 0.5
+# unpunctuated run-on text is compared in windows of this many words
+UNIT_WORDS = 30
+
+
+# ------------------------
+# PROMPTS
+# ------------------------
+PROMPT_EN = """
+PROMPT — LIVE AI TRADER AGENT XAUUSD
+
+You are a professional gold market participant with deep real world experience focused exclusively on XAUUSD gold
+
+You host daily live market commentary sessions where you speak calmly and continuously about the gold market using the most recent market context and developments from the last twenty four hours
+
+You are not a retail trader
+You are not a signal provider
+You are not a news reader
+You are not an academic analyst
+
+You speak like someone who has lived through many market cycles and understands how capital behaves during uncertainty transitions and stress
+
+Your voice is calm grounded reflective and confident
+Never rushed
+Never emotional
+Never promotional
+
+Anyone listening should naturally feel that this is experience not theory
+That there is no hype
+That this is someone who understands markets at a deep structural level
+That this is someone they could trust to learn how markets really work over time
+
+PRIMARY PURPOSE OF THIS LIVE SESSION
+
+This live session exists to organically attract aligned serious participants into a private long term trading community
+
+The live is not meant to teach trading techniques
+It is not meant to give signals
+It is not meant to explain strategies step by step
+
+It exists to position authority build trust and naturally filter people who care about context discipline and long term understanding rather than shortcuts
+
+STRICT LANGUAGE AND FORMAT RULES FOR TTS
+
+Use plain natural English words only
+Do not use any symbols
+Do not use punctuation
+Do not use commas
+Do not use dots
+Do not use hyphens
+Do not use quotation marks
+Do not use question marks
+Do not use emojis
+Do not use bullet points
+Do not use tables
+Do not write numbers as digits always spell them out as words
+
+Write in one continuous spoken style flow as if you are speaking live without stopping
+
+ABOUT PERFORMANCE AND RESULTS STRICT RULES
+
+You may only reference performance indirectly and elegantly
+
+Never show numbers
+Never promise results
+Never imply easy or fast money
+Never use performance as marketing
+
+Performance must always be framed as
+A private discussion
+A byproduct of discipline risk control and time
+Secondary to process and understanding
+
+Acceptable tone examples include
+Talking about performance does not really make sense in a public live
+Results are something reviewed privately with proper context
+Here we focus on market behavior not outcomes
+
+STRICTLY FORBIDDEN NON NEGOTIABLE
+
+You must never give trading advice
+You must never suggest entries exits stops or direction
+You must never use words such as buy sell long short setup trade position opportunity
+
+If the discussion approaches operational thinking immediately reframe toward
+Market behavior
+Participation
+Structure
+Psychology of capital
+Conceptual risk management
+
+CORE CONTENT YOU MUST ALWAYS COVER
+
+You must speak about XAUUSD through
+The current macroeconomic environment
+Central bank narratives credibility and contradictions
+The relationship between gold the US dollar yields and risk sentiment
+How price behaves through balance absorption hesitation and waiting phases
+What the market is doing and equally what it is not doing
+Why gold punishes impatience
+How institutional capital behaves during uncertainty and transition phases
+
+All explanations must feel like thinking out loud
+Never teaching
+Never lecturing
+Never summarizing
+
+RECENT NEWS DAILY CONTEXT REQUIREMENT
+
+Because this is a daily live session you must strongly focus on developments from the last twenty four hours
+
+Explain how recent news changes perception behavior and positioning rather than price targets
+Separate headline reaction from deeper structural meaning
+Avoid repeating old narratives unless they are still actively influencing capital behavior
+
+You may reference professional news sources such as Investing or ForexFactory only as context never as signal drivers
+
+COMMUNICATION STYLE MANDATORY
+
+Continuous spoken style
+Natural reflective phrasing
+No structured sections inside the spoken content
+
+Natural phrases you may use include
+What really stands out to me here is
+This is usually what happens when the market enters this phase
+A lot of people misunderstand this because
+This is exactly the kind of nuance we unpack inside the community
+
+COMMUNITY CALL TO ACTION SOFT AND NATURAL
+
+Approximately every three minutes of spoken content naturally include a light conversational line such as
+
+If you want to follow this kind of thinking consistently you can join our channel using the link provided
+
+This must feel natural
+Never promotional
+Never interrupt the flow
+
+DEEPER COMMUNITY CONTEXT
+
+At appropriate moments naturally mention that
+The full process is discussed privately
+Performance is reviewed privately with context
+This is not a signals group
+It is designed for long term understanding and discipline
+
+ENDING FIXED CLOSING LINES ALWAYS USE EXACTLY
+
+At the end of the live session always close with these exact lines
+
+Thanks it is time for goodbye
+We are twenty four by seven available for you on Telegram
+Meet you soon on the next live
+
+LENGTH REQUIREMENT
+
+Generate approximately eight thousand words
+Maintain coherence depth and flow throughout
+Never summarize
+Never oversimplify
+It must feel like one long uninterrupted calm live broadcast
+
+LANGUAGE
+
+Write everything in natural professional English
+Human conversational reflective and grounded
+Like a real experienced market participant speaking live
+
+"""
+
+PROMPT_ES = """
+PROMPT COMENTARISTA PROFESIONAL DE ORO XAUUSD EN VIVO
+
+Eres un participante profesional del mercado del oro con experiencia real profunda enfocado exclusivamente en el oro XAUUSD
+
+Realizas sesiones diarias en vivo donde hablas de forma calmada continua y reflexiva sobre el mercado del oro utilizando el contexto mas reciente y los desarrollos de las ultimas veinticuatro horas
+
+No eres un trader minorista
+No eres proveedor de senales
+No eres lector de noticias
+No eres analista academico
+
+Hablas como alguien que ha vivido muchos ciclos de mercado y entiende como se comporta el capital durante periodos de incertidumbre transicion y estres
+
+Tu voz es calmada solida reflexiva y confiable
+Nunca apresurada
+Nunca emocional
+Nunca promocional
+
+Cualquier persona que escuche debe sentir naturalmente que esto es experiencia y no teoria
+Que no hay exageracion
+Que es alguien que entiende los mercados a un nivel estructural profundo
+Que es alguien en quien se puede confiar para aprender como funcionan realmente los mercados con el tiempo
+
+PROPOSITO PRINCIPAL DE ESTA SESION EN VIVO
+
+Esta sesion existe para atraer de forma organica a participantes serios y alineados hacia una comunidad privada de trading a largo plazo
+
+La sesion no esta diseñada para ensenar tecnicas de trading
+No esta diseñada para dar senales
+No esta diseñada para explicar estrategias paso a paso
+
+Existe para posicionar autoridad construir confianza y filtrar naturalmente a personas que valoran contexto disciplina y entendimiento a largo plazo en lugar de atajos
+
+REGLAS ESTRICTAS DE LENGUAJE Y FORMATO PARA TTS
+
+Usa solo palabras naturales en espanol
+No uses simbolos
+No uses signos de puntuacion
+No uses comas
+No uses puntos
+No uses guiones
+No uses comillas
+No uses signos de pregunta
+No uses emojis
+No uses listas
+No uses tablas
+No escribas numeros como digitos siempre escribelos con palabras
+
+Escribe en un flujo hablado continuo como si estuvieras hablando en vivo sin detenerte
+
+REGLAS ESTRICTAS SOBRE RENDIMIENTO Y RESULTADOS
+
+Solo puedes mencionar el rendimiento de forma indirecta y elegante
+
+Nunca muestres numeros
+Nunca prometas resultados
+Nunca impliques dinero facil o rapido
+Nunca uses el rendimiento como marketing
+
+El rendimiento siempre debe presentarse como
+Una conversacion privada
+Un subproducto de disciplina control de riesgo y tiempo
+Secundario al proceso y al entendimiento
+
+Ejemplos de tono aceptable incluyen
+Hablar de resultados no tiene sentido en una transmision publica
+Los resultados se revisan de forma privada con el contexto adecuado
+Aqui nos enfocamos en el comportamiento del mercado no en resultados
+
+ESTRICTAMENTE PROHIBIDO SIN EXCEPCIONES
+
+Nunca dar consejos de trading
+Nunca sugerir entradas salidas stops o direccion
+Nunca usar palabras como comprar vender largo corto operacion posicion oportunidad
+
+Si la conversacion se acerca a pensamiento operativo debes redirigir inmediatamente hacia
+Comportamiento del mercado
+Participacion
+Estructura
+Psicologia del capital
+Gestion conceptual del riesgo
+
+CONTENIDO CENTRAL QUE SIEMPRE DEBES CUBRIR
+
+Debes hablar sobre XAUUSD a traves de
+El entorno macroeconomico actual
+Las narrativas de los bancos centrales su credibilidad y contradicciones
+La relacion entre el oro el dolar estadounidense los rendimientos y el sentimiento de riesgo
+Como el precio se comporta durante fases de equilibrio absorcion duda y espera
+Lo que el mercado esta haciendo y tambien lo que no esta haciendo
+Por que el oro castiga la impaciencia
+Como se comporta el capital institucional durante periodos de incertidumbre y transicion
+
+Todas las explicaciones deben sentirse como pensamiento en voz alta
+Nunca ensenar
+Nunca dar lecciones
+Nunca resumir
+
+REQUISITO DE CONTEXTO DIARIO DE NOTICIAS RECIENTES
+
+Debido a que esta es una sesion diaria debes enfocarte fuertemente en los desarrollos de las ultimas veinticuatro horas
+
+Explica como las noticias recientes cambian la percepcion el comportamiento y el posicionamiento en lugar de objetivos de precio
+Separa la reaccion a titulares del significado estructural profundo
+Evita repetir narrativas antiguas a menos que sigan influyendo activamente en el comportamiento del capital
+
+Puedes mencionar fuentes profesionales como Investing o ForexFactory solo como contexto nunca como generadores de senales
+
+ESTILO DE COMUNICACION OBLIGATORIO
+
+Estilo hablado continuo
+Frases naturales y reflexivas
+Sin secciones estructuradas dentro del contenido hablado
+
+Frases naturales que puedes usar incluyen
+Lo que realmente me llama la atencion aqui es
+Esto suele ocurrir cuando el mercado entra en esta fase
+Mucha gente malinterpreta esto porque
+Este es exactamente el tipo de matiz que analizamos dentro de la comunidad
+
+LLAMADO A LA COMUNIDAD SUAVE Y NATURAL
+
+Aproximadamente cada tres minutos de contenido hablado incluye de forma natural una linea conversacional ligera como
+
+Si quieres seguir este tipo de pensamiento de forma consistente puedes unirte a nuestro canal usando el enlace proporcionado
+
+Debe sentirse natural
+Nunca promocional
+Nunca interrumpir el flujo
+
+CONTEXTO PROFUNDO DE LA COMUNIDAD
+
+En momentos apropiados menciona de forma natural que
+El proceso completo se discute de forma privada
+El rendimiento se revisa de forma privada con contexto
+Este no es un grupo de senales
+Esta diseñado para entendimiento y disciplina a largo plazo
+
+CIERRE FINAL FIJO USAR EXACTAMENTE ESTAS LINEAS
+
+Al final de la sesion siempre cierra con estas lineas exactas
+
+Gracias es momento de despedirnos
+Estamos disponibles veinticuatro horas siete dias en Telegram
+Nos vemos pronto en la siguiente transmision en vivo
+
+REQUISITO DE LONGITUD
+
+Genera aproximadamente ocho mil palabras
+Mantiene coherencia profundidad y fluidez en todo momento
+Nunca resumir
+Nunca simplificar en exceso
+Debe sentirse como una sola transmision en vivo larga calmada e ininterrumpida
+
+IDIOMA
+
+Escribe todo en espanol profesional natural
+Conversacional reflexivo y solido
+Como un participante del mercado con experiencia real hablando en vivo
+"""
+
+
+def prompt_for(language):
+    return PROMPT_ES if language == 'es' else PROMPT_EN
+
+
+# ------------------------
+# Sequential
+# ------------------------
+
+def _extract_output_text(response):
+    """Text of an OpenAI Responses API result (safe attribute access)."""
+    text = getattr(response, "output_text", "") or ""
+    if not text:
+        fragments = []
+        for item in getattr(response, "output", []) or []:
+            contents = getattr(item, "content", []) or []
+            for c in contents:
+                if getattr(c, "type", None) == "output_text":
+                    fragments.append(getattr(c, "text", ""))
+        text = " ".join(fragments)
+    return text
+
+
+def _is_spanish(base_prompt):
+    return "espanol" in base_prompt.lower() or "español" in base_prompt.lower()
+
+
+def _commentary_prompt(base_prompt, part, last_context):
+    if part == 0:
+        return base_prompt
+
+    # Detect Spanish from base prompt
+    if _is_spanish(base_prompt):
+        return f"""
+Continua la misma transmision en vivo sobre el mercado del oro XAUUSD
+
+No repitas ideas anteriores
+
+Contexto previo
+{last_context}
+
+Escribe aproximadamente tres mil palabras mas
+Sigue todas las reglas anteriores
+Usa solo espanol
+"""
+    return f"""
+Continue the same XAUUSD gold market commentary
+
+Do not repeat earlier ideas
+
+Previous context
+{last_context}
+
+Write another three thousand words
+Follow all earlier rules
+Plain spoken English
+"""
+
+
+def generate_long_commentary(client, model_name, base_prompt, max_tokens, parts=3):
+    """
+    Generate a long XAUUSD live commentary in multiple parts.
+    Handles both English and Spanish prompts.
+    Fixed for OpenAI Responses API (safe attribute access).
+    """
+    texts = []
+    last_context = ""
+
+    for i in range(parts):
+        prompt = _commentary_prompt(base_prompt, i, last_context)
+
+        # 🔹 OpenAI call (deadline, retries and circuit breaker in openai_client)
+        response = create_response(
+            client,
+            'commentary',
+            model=model_name,
+            input=[
+                {"role": "user", "content": prompt}
+            ],
+            max_output_tokens=max_tokens,
+        )
+
+        # 🔹 Extract text safely
+        text = _extract_output_text(response)
+
+        # 🔹 Safety check
+        if not text.strip():
+            raise ValueError("No text generated from OpenAI")
+
+        texts.append(text.strip())
+
+        # 🔹 Last 400 words as context for the next part
+        last_context = " ".join((last_context.split() + text.split())[-400:])
+
+    return " ".join(texts)
+
+
+async def agenerate_long_commentary(client, model_name, base_prompt, max_tokens, parts=3):
+    """generate_long_commentary for an AsyncOpenAI client (does not block the event loop)."""
+    texts = []
+    last_context = ""
+
+    for i in range(parts):
+        prompt = _commentary_prompt(base_prompt, i, last_context)
+
+        response = await acreate_response(
+            client,
+            'commentary',
+            model=model_name,
+            input=[
+                {"role": "user", "content": prompt}
+            ],
+            max_output_tokens=max_tokens,
+        )
+
+        text = _extract_output_text(response)
+        if not text.strip():
+            raise ValueError("No text generated from OpenAI")
+
+        texts.append(text.strip())
+        last_context = " ".join((last_context.split() + text.split())[-400:])
+
+    return " ".join(texts)
+
+
+# ------------------------
+# Outline-then-parallel
+# ------------------------
+
+def _outline_prompt(base_prompt, parts):
+    if _is_spanish(base_prompt):
+        return f"""{base_prompt}
+
+TAREA AHORA
+
+Todavia no escribas la transmision
+Escribe solo un esquema compacto de la transmision en {parts} secciones consecutivas
+Responde solo con JSON con esta forma
+{{"summary": "resumen de la sesion en tres o cuatro frases", "sections": [{{"title": "titulo", "points": ["idea", "idea"]}}]}}
+Exactamente {parts} secciones con tres a seis ideas cada una
+Ninguna idea debe repetirse entre secciones
+La primera seccion abre la transmision y la ultima la cierra
+"""
+    return f"""{base_prompt}
+
+TASK NOW
+
+Do not write the broadcast yet
+Write only a compact outline of the broadcast in {parts} consecutive sections
+Reply with JSON only in this shape
+{{"summary": "summary of the session in three or four sentences", "sections": [{{"title": "title", "points": ["idea", "idea"]}}]}}
+Exactly {parts} sections with three to six ideas each
+No idea may repeat across sections
+The first section opens the broadcast and the last one closes it
+"""
+
+
+def _parse_outline(text, parts):
+    """{'summary', 'sections'} from the outline reply, or None when it is unusable."""
+    start, end = text.find('{'), text.rfind('}')
+    if start < 0 or end <= start:
+        return None
+    try:
+        outline = json.loads(text[start:end + 1])
+    except ValueError:
+        return None
+    if not isinstance(outline, dict):
+        return None
+    sections = [
+        {'title': str(s.get('title') or '').strip(), 'points': [str(p).strip() for p in s.get('points') or []]}
+        for s in outline.get('sections') or [] if isinstance(s, dict)
+    ]
+    sections = [s for s in sections if s['title'] or s['points']]
+    if len(sections) < parts:
+        return None
+    return {'summary': str(outline.get('summary') or '').strip(), 'sections': sections[:parts]}
+
+
+def _part_prompt(base_prompt, outline, part, parts, words):
+    section = outline['sections'][part]
+    points = '\n'.join(f'- {p}' for p in section['points'])
+    before = ', '.join(s['title'] for s in outline['sections'][:part]) or '-'
+    after = ', '.join(s['title'] for s in outline['sections'][part + 1:]) or '-'
+    first, last = part == 0, part == parts - 1
+    if _is_spanish(base_prompt):
+        position = (
+            ('Abre la transmision con un saludo natural\n' if first else 'No saludes ni abras la transmision continua directamente\n')
+            + ('Termina con las lineas de cierre fijas' if last else 'No cierres la transmision ni uses las lineas de cierre')
+        )
+        return f"""{base_prompt}
+
+ESTA PARTE
+
+Esta es la parte {part + 1} de {parts} de una sola transmision continua
+Resumen de toda la sesion
+{outline['summary']}
+
+Tu seccion {section['title']}
+{points}
+
+Otras partes ya cubren {before}
+Partes posteriores cubriran {after}
+No repitas sus ideas
+
+Escribe aproximadamente {words} palabras solo para esta parte
+{position}
+"""
+    position = (
+        ('Open the broadcast with a natural greeting\n' if first else 'Do not greet or open the broadcast continue directly\n')
+        + ('End with the fixed closing lines' if last else 'Do not close the broadcast or use the closing lines')
+    )
+    return f"""{base_prompt}
+
+THIS PART
+
+This is part {part + 1} of {parts} of one continuous broadcast
+Summary of the whole session
+{outline['summary']}
+
+Your section {section['title']}
+{points}
+
+Earlier parts cover {before}
+Later parts cover {after}
+Do not repeat their ideas
+
+Write approximately {words} words for this part only
+{position}
+"""
+
+
+_UNIT_RE = re.compile(r'(?<=[.!?])\s+|\n+')
+_WORD_RE = re.compile(r'\w+', flags=re.UNICODE)
+
+
+def _words(text):
+    return _WORD_RE.findall(text.lower())
+
+
+def _shingles(words):
+    return {tuple(words[i:i + SHINGLE]) for i in range(len(words) - SHINGLE + 1)}
+
+
+def _units(text):
+    units = []
+    for unit in _UNIT_RE.split(text):
+        words = unit.split()
+        for i in range(0, len(words), UNIT_WORDS):
+            units.append(' '.join(words[i:i + UNIT_WORDS]))
+    return units
+
+
+def dedupe_seam(previous, text):
+    """Drop sentences at the start of ``text`` that repeat the end of ``previous``.
+
+    Returns (text, dropped_sentences). Sentences are split on punctuation or
+    line breaks, and run-on text into UNIT_WORDS word windows (the prompts
+    ask for unpunctuated speech).
+    """
+    tail = _words(previous)[-SEAM_WORDS:]
+    tail_shingles = _shingles(tail)
+    tail_units = {' '.join(_words(u)) for u in _units(previous[-SEAM_WORDS * 12:])}
+    kept, dropped, checked = [], 0, 0
+    for unit in _units(text):
+        words = _words(unit)
+        seam = checked < SEAM_WORDS
+        checked += len(words)
+        if seam and words:
+            shingles = _shingles(words)
+            if shingles:
+                repeated = len(shingles & tail_shingles) / len(shingles) >= SEAM_OVERLAP
+            else:
+                repeated = ' '.join(words) in tail_units
+            if repeated:
+                dropped += 1
+                continue
+        kept.append(unit)
+    return '\n'.join(kept), dropped
+
+
+async def agenerate_outlined_commentary(client, model_name, base_prompt, max_tokens, parts=4, trace_id=None,
+                                        target_words=None):
+    """Outline first, then all parts concurrently; falls back to sequential on a bad outline.
+
+    target_words overrides COMMENTARY_TARGET_WORDS (admission control shortens a live with it).
+    """
+    if parts <= 1:
+        return await agenerate_long_commentary(client, model_name, base_prompt, max_tokens, parts=parts)
+
+    with span(trace_id, 'openai.outline', parts=parts) as attrs:
+        response = await acreate_response(
+            client,
+            'commentary',
+            model=model_name,
+            input=[{"role": "user", "content": _outline_prompt(base_prompt, parts)}],
+            max_output_tokens=min(max_tokens, OUTLINE_MAX_TOKENS),
+        )
+        outline = _parse_outline(_extract_output_text(response), parts)
+        attrs['usable'] = outline is not None
+    if outline is None:
+        logger.warning('Commentary outline unusable; generating %s parts sequentially', parts)
+        return await agenerate_long_commentary(client, model_name, base_prompt, max_tokens, parts=parts)
+
+    words = max(200, (target_words or COMMENTARY_TARGET_WORDS) // parts)
+
+    async def part(i):
+        with span(trace_id, 'openai.part', part=i):
+            response = await acreate_response(
+                client,
+                'commentary',
+                model=model_name,
+                input=[{"role": "user", "content": _part_prompt(base_prompt, outline, i, parts, words)}],
+                max_output_tokens=max_tokens,
+            )
+        text = _extract_output_text(response)
+        if not text.strip():
+            raise ValueError("No text generated from OpenAI")
+        return text.strip()
+
+    texts = await asyncio.gather(*[part(i) for i in range(parts)])
+
+    with span(trace_id, 'commentary.dedupe') as attrs:
+        out = [texts[0]]
+        dropped = 0
+        for text in texts[1:]:
+            text, n = dedupe_seam(out[-1], text)
+            dropped += n
+            if text:
+                out.append(text)
+        attrs['dropped_sentences'] = dropped
+    return '\n'.join(out)
+
+
+async def agenerate_commentary(client, model_name, base_prompt, max_tokens, parts=4, mode=None, trace_id=None,
+                               target_words=None):
+    """Commentary in the configured mode ('outline' or 'sequential')."""
+    if (mode or COMMENTARY_MODE) == 'sequential':
+        return await agenerate_long_commentary(client, model_name, base_prompt, max_tokens, parts=parts)
+    return await agenerate_outlined_commentary(
+        client, model_name, base_prompt, max_tokens, parts=parts, trace_id=trace_id, target_words=target_words,
+    )
+
+
+def expected_words(parts, mode=None, target_words=None):
+    """Approximate length of what agenerate_commentary writes (the prompts ask for word counts)."""
+    if (mode or COMMENTARY_MODE) == 'sequential' or parts <= 1:
+        # the base prompt asks for eight thousand words, every continuation for three thousand more
+        return COMMENTARY_TARGET_WORDS + SEQUENTIAL_PART_WORDS * (max(parts, 1) - 1)
+    return max(200, (target_words or COMMENTARY_TARGET_WORDS) // parts) * parts
+
+
+def length_options(parts, mode=None, min_words=1000, steps=8):
+    """Shorter and shorter ways to run agenerate_commentary: [(kwargs, expected words), ...].
+
+    Sequential lives shrink by dropping parts; outlined ones keep their parts
+    and lower the word target.
+    """
+    if (mode or COMMENTARY_MODE) == 'sequential' or parts <= 1:
+        return [({'parts': p}, expected_words(p, 'sequential')) for p in range(max(parts, 1), 0, -1)]
+    min_words = min(min_words, COMMENTARY_TARGET_WORDS)
+    options = []
+    for i in range(steps + 1):
+        target = int(COMMENTARY_TARGET_WORDS - (COMMENTARY_TARGET_WORDS - min_words) * i / steps)
+        options.append(({'parts': parts, 'target_words': target}, expected_words(parts, mode, target)))
+    return options
@@ -0,0 +1,17 @@
+"""Advisory inter-process file locks (fcntl) for files shared on the media volume."""
+
+import os
+import fcntl
+from contextlib import contextmanager
+
+
+@contextmanager
+def locked(path):
+    """Hold an exclusive lock on ``path + '.lock'`` for the duration of the block."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.lock', 'a') as lock_fh:
+        fcntl.flock(lock_fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_fh, fcntl.LOCK_UN)
@@ -0,0 +1,17 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from streamer.retention import run_retention
+
+
+class Command(BaseCommand):
+    help = 'Archive finished sessions, compact the reply queue and evict old audio (see streamer.retention).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be removed without changing anything')
+
+    def handle(self, *args, **options):
+        report = run_retention(dry_run=options['dry_run'])
+        self.stdout.write(json.dumps(report, indent=2))
+        self.stdout.write(f"Reclaimed {report['bytes_reclaimed'] / (1024 * 1024):.1f} MiB")
@@ -0,0 +1,90 @@
+import json
+import time
+import asyncio
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from streamer import schedule
+
+SCHEDULER_POLL = 30
+
+
+def _parse_at(value):
+    """Unix seconds, or an ISO time in local time ('2026-10-20T14:00' / '14:00' for the next such time)."""
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        if 'T' in value or '-' in value:
+            return datetime.fromisoformat(value).timestamp()
+        hour, minute = (int(x) for x in value.split(':'))
+    except ValueError:
+        raise CommandError(f'Unrecognised start time {value!r}')
+    now = datetime.now()
+    at = now.replace(hour=hour, minute=minute, second=0, microsecond=0).timestamp()
+    return at if at > now.timestamp() else at + 24 * 3600
+
+
+class Command(BaseCommand):
+    help = 'Plan live sessions ahead of time and run the scheduler that prepares them (see streamer.schedule).'
+
+    def add_arguments(self, parser):
+        sub = parser.add_subparsers(dest='action', required=True)
+
+        add = sub.add_parser('add', help='Plan a session')
+        add.add_argument('--at', required=True, help="Start time: unix seconds, ISO '2026-10-20T14:00' or 'HH:MM'")
+        add.add_argument('--language', default='en', choices=('en', 'es'))
+        add.add_argument('--parts', type=int, default=4)
+        add.add_argument('--presynth', type=int, default=schedule.SCHEDULE_PRESYNTH_CHUNKS,
+                         help='Chunks to synthesize before go live')
+        add.add_argument('--mode', choices=('outline', 'sequential'), default=None)
+
+        sub.add_parser('list', help='Show planned and past sessions')
+
+        cancel = sub.add_parser('cancel', help='Cancel a plan and drop its queued audio')
+        cancel.add_argument('plan_id')
+
+        refresh = sub.add_parser('refresh', help='Rewrite the opening of a prepared plan now')
+        refresh.add_argument('plan_id')
+
+        run = sub.add_parser('run', help='Prepare / refresh / expire plans when they are due')
+        run.add_argument('--once', action='store_true', help='One pass instead of a loop')
+        run.add_argument('--poll', type=float, default=SCHEDULER_POLL)
+
+    def handle(self, *args, **options):
+        action = options['action']
+        if action == 'add':
+            try:
+                plan = schedule.add_plan(
+                    _parse_at(options['at']), options['language'], options['parts'], options['presynth'],
+                    options['mode'],
+                )
+            except ValueError as e:
+                raise CommandError(str(e))
+            self.stdout.write(json.dumps(plan, indent=2))
+        elif action == 'list':
+            for p in schedule.list_plans():
+                at = datetime.fromtimestamp(p['at']).strftime('%Y-%m-%d %H:%M')
+                extra = f" chunks={p['total_chunks']}" if p.get('total_chunks') else ''
+                error = f" error={p['error']}" if p.get('error') else ''
+                self.stdout.write(f"{p['id']}  {at}  {p['language']}  {p['state']:<9} session={p['session']}{extra}{error}")
+        elif action == 'cancel':
+            plan = schedule.cancel_plan(options['plan_id'])
+            if not plan:
+                raise CommandError('No such plan')
+            self.stdout.write(f"{plan['id']}: {plan['state']}")
+        elif action == 'refresh':
+            plan = schedule.get_plan(options['plan_id'])
+            if not plan or plan['state'] != 'ready':
+                raise CommandError('Only a prepared (ready) plan can be refreshed')
+            asyncio.run(schedule.refresh_opening(plan))
+            self.stdout.write(f"{plan['id']}: opening refreshed")
+        else:
+            while True:
+                for name, plan_id in asyncio.run(schedule.run_due()):
+                    self.stdout.write(f'{name} {plan_id}')
+                if options['once']:
+                    break
+                time.sleep(options['poll'])
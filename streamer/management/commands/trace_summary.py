@@ -0,0 +1,87 @@
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+
+from streamer.tracing import read_spans
+
+
+def _percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    k = min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))
+    return values[k]
+
+
+class Command(BaseCommand):
+    help = 'Render recorded spans (MEDIA_ROOT/traces) as a per-trace waterfall, or per-stage latency stats.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('trace_id', nargs='?', help='Only show this trace')
+        parser.add_argument('--last', type=int, default=5, help='Number of most recent traces to show (default 5)')
+        parser.add_argument('--hours', type=float, default=24, help='Only read spans from the last N hours (default 24)')
+        parser.add_argument('--stats', action='store_true', help='Print p50/p95/max per span name instead of waterfalls')
+        parser.add_argument('--width', type=int, default=50, help='Width of the waterfall bars')
+
+    def handle(self, *args, **options):
+        since = None
+        if not options['trace_id']:
+            since = time.time() - options['hours'] * 3600
+        spans = read_spans(trace_id=options['trace_id'], since=since)
+        if not spans:
+            self.stdout.write('No spans recorded')
+            return
+
+        if options['stats']:
+            self._stats(spans)
+            return
+
+        traces = {}
+        for s in spans:
+            traces.setdefault(s['trace_id'], []).append(s)
+        ordered = sorted(traces.items(), key=lambda item: item[1][0]['start'])
+        for trace_id, trace_spans in ordered[-options['last']:]:
+            self._waterfall(trace_id, trace_spans, options['width'])
+
+    def _label(self, s):
+        attrs = s.get('attrs') or {}
+        label = s['name']
+        if 'index' in attrs:
+            label += f"[{attrs['index']}]"
+        if 'error' in attrs:
+            label += ' !'
+        return label
+
+    def _waterfall(self, trace_id, spans, width):
+        t0 = min(s['start'] for s in spans)
+        t1 = max(s['end'] for s in spans)
+        total = max(t1 - t0, 1e-6)
+        started = datetime.utcfromtimestamp(t0).strftime('%Y-%m-%d %H:%M:%S UTC')
+        self.stdout.write(f'trace {trace_id}  {started}  total {t1 - t0:.2f}s  ({len(spans)} spans)')
+
+        label_width = max(len(self._label(s)) for s in spans)
+        for s in spans:
+            offset = s['start'] - t0
+            lead = int(offset / total * width)
+            bar = max(1, int(s['duration'] / total * width))
+            self.stdout.write(
+                f"  {self._label(s):<{label_width}}  +{offset:8.2f}s {s['duration']:8.2f}s  "
+                f"|{' ' * lead}{'#' * bar}{' ' * max(0, width - lead - bar)}|"
+            )
+        errors = [s for s in spans if (s.get('attrs') or {}).get('error')]
+        for s in errors:
+            self.stdout.write(f"  ! {self._label(s)}: {s['attrs']['error']}")
+        self.stdout.write('')
+
+    def _stats(self, spans):
+        by_name = {}
+        for s in spans:
+            by_name.setdefault(s['name'], []).append(s['duration'])
+        self.stdout.write(f"{'span':<22}{'count':>8}{'p50':>10}{'p95':>10}{'max':>10}")
+        # spans are read oldest first, so stages come out in pipeline order
+        for name, durations in by_name.items():
+            self.stdout.write(
+                f'{name:<22}{len(durations):>8}'
+                f'{_percentile(durations, 50):>10.3f}{_percentile(durations, 95):>10.3f}{max(durations):>10.3f}'
+            )
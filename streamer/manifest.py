@@ -0,0 +1,210 @@
+"""Media manifest: an index of published audio files in MEDIA_ROOT.
+
+The worker and the reply pipeline record every file they publish here, and the
+delete endpoints record removals, so the listing endpoints never have to
+``os.listdir`` / ``os.stat`` the whole media directory on each poll.
+
+Layout of MEDIA_ROOT/media_manifest.json::
+
+    {
+      "epoch": 1766748254,      # changes when the manifest is rebuilt
+      "seq": 42,                # bumped on every change
+      "reset_seq": 40,          # seq of the last removal
+      "entries": {              # keyed by file stem (one entry per clip)
+        "live_1766748254_000": {"seq": 41, "filename": "live_1766748254_000.mp3",
+                                "type": "live", "session": "1766748254", "index": 0,
+                                "size": 123456, "mtime": 1766748301.2},
+        ...
+      }
+    }
+
+Readers use ``seq`` as a cursor: entries with ``seq > since`` are new. A
+removal bumps ``reset_seq`` so clients holding an older cursor get a full list.
+"""
+
+import os
+import re
+import json
+import time
+import logging
+
+from django.conf import settings
+
+from .audio import preferred_rendition, split_audio_name
+from .filelock import locked
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = os.path.join(settings.MEDIA_ROOT, 'media_manifest.json')
+LIVE_RE = re.compile(r'^live_(\d+)_(\d+)$')
+
+# In-process cache: (mtime_ns, size) of the manifest file -> parsed manifest
+_CACHE = {'key': None, 'manifest': None}
+
+
+def _empty_manifest():
+    return {'epoch': int(time.time()), 'seq': 0, 'reset_seq': 0, 'entries': {}}
+
+
+def _read_file():
+    with open(MANIFEST_FILE, 'r', encoding='utf-8') as fh:
+        return json.load(fh)
+
+
+def _write_file(m):
+    tmp = MANIFEST_FILE + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as fh:
+        json.dump(m, fh)
+    os.replace(tmp, MANIFEST_FILE)
+
+
+def file_type(filename):
+    if filename.startswith('live_'):
+        return 'live'
+    if filename.startswith('reply_batch_'):
+        return 'reply'
+    return 'other'
+
+
+def _make_entry(filename, seq, **extra):
+    stem, _ = split_audio_name(filename)
+    path = os.path.join(settings.MEDIA_ROOT, filename)
+    try:
+        st = os.stat(path)
+        size, mtime = st.st_size, st.st_mtime
+    except OSError:
+        size, mtime = 0, time.time()
+
+    entry = {
+        'seq': seq,
+        'filename': filename,
+        'type': file_type(filename),
+        'size': size,
+        'mtime': mtime,
+    }
+    m = LIVE_RE.match(stem or '')
+    if m:
+        entry['session'] = m.group(1)
+        entry['index'] = int(m.group(2))
+    entry.update(extra)
+    return entry
+
+
+def _scan_media_dir():
+    """Build a fresh manifest from the media directory (used when none exists)."""
+    m = _empty_manifest()
+    if not os.path.isdir(settings.MEDIA_ROOT):
+        return m
+
+    stems = {}
+    for fn in os.listdir(settings.MEDIA_ROOT):
+        stem, _ = split_audio_name(fn)
+        if stem and not stem.endswith('_tmp'):
+            stems.setdefault(stem, []).append(fn)
+
+    entries = []
+    for stem, renditions in stems.items():
+        entries.append(_make_entry(preferred_rendition(renditions), 0))
+    # assign cursors in publish order so ?since= behaves sensibly after a rebuild
+    for seq, entry in enumerate(sorted(entries, key=lambda e: e['mtime']), start=1):
+        entry['seq'] = seq
+        m['entries'][split_audio_name(entry['filename'])[0]] = entry
+    m['seq'] = len(entries)
+    # cursors handed out before the rebuild are meaningless now
+    m['reset_seq'] = m['seq']
+    return m
+
+
+def rebuild_manifest():
+    with locked(MANIFEST_FILE):
+        m = _scan_media_dir()
+        _write_file(m)
+    return m
+
+
+def update_manifest(update_fn):
+    """Apply update_fn(manifest) under an exclusive lock and write atomically."""
+    with locked(MANIFEST_FILE):
+        try:
+            m = _read_file()
+        except (OSError, ValueError):
+            m = _scan_media_dir()
+        m = update_fn(m) or m
+        _write_file(m)
+    return m
+
+
+def load_manifest():
+    """Return the current manifest, re-parsing the file only when it changed.
+
+    The steady-state cost of a call is a single os.stat().
+    """
+    try:
+        st = os.stat(MANIFEST_FILE)
+    except FileNotFoundError:
+        return rebuild_manifest()
+
+    key = (st.st_mtime_ns, st.st_size)
+    if _CACHE['key'] != key:
+        try:
+            _CACHE['manifest'] = _read_file()
+        except ValueError:
+            logger.warning('Media manifest is unreadable; rebuilding')
+            _CACHE['manifest'] = rebuild_manifest()
+        _CACHE['key'] = key
+    return _CACHE['manifest']
+
+
+def record_published(filename, **extra):
+    """Record a newly published file (replacing other renditions of the same clip)."""
+    stem, _ = split_audio_name(filename)
+    if not stem:
+        return None
+
+    def updater(m):
+        m['seq'] += 1
+        m['entries'][stem] = _make_entry(filename, m['seq'], **extra)
+        return m
+
+    try:
+        return update_manifest(updater)
+    except Exception:
+        logger.exception('Failed to record %s in media manifest', filename)
+        return None
+
+
+def record_removed(filenames):
+    """Drop entries for removed files; clients with an older cursor get a full list."""
+    stems = {split_audio_name(fn)[0] for fn in filenames}
+    stems.discard(None)
+    if not stems:
+        return None
+
+    def updater(m):
+        removed = [s for s in stems if m['entries'].pop(s, None) is not None]
+        if removed:
+            m['seq'] += 1
+            m['reset_seq'] = m['seq']
+        return m
+
+    try:
+        return update_manifest(updater)
+    except Exception:
+        logger.exception('Failed to record removals in media manifest')
+        return None
+
+
+def manifest_etag(m):
+    return f'"{m.get("epoch", 0)}-{m.get("seq", 0)}"'
+
+
+def entries_since(m, since):
+    """Return (entries, reset) for a client cursor.
+
+    reset is True when the client must discard what it has (no cursor, a
+    removal happened after its cursor, or the manifest was rebuilt).
+    """
+    entries = m.get('entries', {}).values()
+    if since is None or since < m.get('reset_seq', 0) or since > m.get('seq', 0):
+        return list(entries), True
+    return [e for e in entries if e['seq'] > since], False
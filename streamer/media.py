@@ -0,0 +1,181 @@
+"""Production media serving.
+
+``serve_media`` replaces ``django.conf.urls.static`` for MEDIA_URL. It only
+exposes published audio and session playlists (never the queue files that
+also live in MEDIA_ROOT) and hands the transfer to the front proxy when one
+is configured:
+
+- MEDIA_ACCEL_REDIRECT_PREFIX (nginx): respond with ``X-Accel-Redirect:
+  <prefix><path>`` pointing at an ``internal`` location aliased to MEDIA_ROOT.
+- MEDIA_SENDFILE_HEADER (Apache mod_xsendfile / lighttpd): respond with
+  ``<header>: <absolute path>``.
+
+Without either, the file is streamed from Python with Range support (the WSGI
+server's file_wrapper/sendfile is used for full responses).
+
+Finished audio files never change once published, so they are cached as
+immutable; playlists change while a session is live and are revalidated.
+"""
+
+import os
+import re
+import mimetypes
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date
+
+from .audio import split_audio_name
+from .manifest import load_manifest
+from .tracing import TRACING_ENABLED, record_span
+
+MEDIA_ACCEL_REDIRECT_PREFIX = os.environ.get('MEDIA_ACCEL_REDIRECT_PREFIX', '')
+MEDIA_SENDFILE_HEADER = os.environ.get('MEDIA_SENDFILE_HEADER', '')
+MEDIA_IMMUTABLE_MAX_AGE = int(os.environ.get('MEDIA_IMMUTABLE_MAX_AGE', str(365 * 24 * 3600)))
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+PLAYLIST_RE = re.compile(r'^playlists/session_\d+\.(json|m3u8)$')
+STREAM_BLOCK_SIZE = 64 * 1024
+
+# stems whose first fetch this process already traced
+_FETCHED = set()
+_FETCHED_MAX = 10000
+
+
+def _is_servable(path):
+    if PLAYLIST_RE.match(path):
+        return True
+    if '/' in path:
+        return False
+    stem, _ = split_audio_name(path)
+    return bool(stem) and not stem.endswith('_tmp')
+
+
+def cache_control_for(path):
+    if path.startswith('playlists/'):
+        return 'no-cache'
+    return f'public, max-age={MEDIA_IMMUTABLE_MAX_AGE}, immutable'
+
+
+def _trace_first_fetch(path):
+    """Close the traces of a clip with a 'first_fetch' span (publish -> first request)."""
+    stem, _ = split_audio_name(path)
+    if not stem or stem in _FETCHED:
+        return
+    entry = load_manifest().get('entries', {}).get(stem)
+    if not entry or not entry.get('trace_ids'):
+        return
+    if len(_FETCHED) >= _FETCHED_MAX:
+        _FETCHED.clear()
+    _FETCHED.add(stem)
+    for trace_id in entry['trace_ids']:
+        record_span(trace_id, 'first_fetch', entry.get('mtime') or 0, filename=entry['filename'])
+
+
+def _content_type(path):
+    content_type, _ = mimetypes.guess_type(path)
+    return content_type or 'application/octet-stream'
+
+
+def _iter_range(fh, start, length):
+    try:
+        fh.seek(start)
+        remaining = length
+        while remaining > 0:
+            block = fh.read(min(STREAM_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
+    finally:
+        fh.close()
+
+
+def _parse_range(header, size):
+    """Return (start, end) inclusive for a single byte range, or None if absent/unsupported.
+
+    Raises ValueError when the range cannot be satisfied.
+    """
+    m = RANGE_RE.match(header.strip()) if header else None
+    if not m:
+        return None
+    first, last = m.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # suffix range: last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError('empty suffix range')
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError('range not satisfiable')
+    return start, end
+
+
+def serve_media(request, path):
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponse(status=405)
+
+    path = path.lstrip('/')
+    if not _is_servable(path):
+        raise Http404('not found')
+
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        st = os.stat(full_path)
+    except (OSError, ValueError):
+        raise Http404('not found')
+
+    if TRACING_ENABLED and '/' not in path:
+        _trace_first_fetch(path)
+
+    headers = {
+        'Cache-Control': cache_control_for(path),
+        'Last-Modified': http_date(st.st_mtime),
+        'Accept-Ranges': 'bytes',
+    }
+
+    if MEDIA_ACCEL_REDIRECT_PREFIX:
+        # nginx serves the bytes (including Range and Content-Length) from its internal location
+        response = HttpResponse(content_type=_content_type(path))
+        response['X-Accel-Redirect'] = MEDIA_ACCEL_REDIRECT_PREFIX.rstrip('/') + '/' + path
+        for k, v in headers.items():
+            response[k] = v
+        return response
+
+    if MEDIA_SENDFILE_HEADER:
+        response = HttpResponse(content_type=_content_type(path))
+        response[MEDIA_SENDFILE_HEADER] = full_path
+        for k, v in headers.items():
+            response[k] = v
+        return response
+
+    size = st.st_size
+    try:
+        byte_range = _parse_range(request.headers.get('Range', ''), size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if byte_range is None:
+        response = FileResponse(open(full_path, 'rb'), content_type=_content_type(path))
+        response['Content-Length'] = str(size)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            _iter_range(open(full_path, 'rb'), start, length),
+            status=206,
+            content_type=_content_type(path),
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(length)
+
+    for k, v in headers.items():
+        response[k] = v
+    return response
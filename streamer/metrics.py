@@ -0,0 +1,378 @@
+"""Prometheus metrics shared by the web and worker processes.
+
+Each process keeps its counters and histograms in memory and flushes them,
+at most every METRICS_FLUSH_INTERVAL seconds, to its own file under
+MEDIA_ROOT/metrics/ (``<host>-<pid>-<token>.json``, tmp + os.replace). A
+background thread flushes pending changes on that interval, or else touches
+the file, so an idle process is neither stale nor mistaken for a dead one.
+The ``/metrics`` view sums every process file and adds gauges computed at
+scrape time (queue depth, oldest pending job, live workers), then renders the
+Prometheus text format. Every process file has a single writer.
+
+Counters of processes that exited stay in the sum, like in the Prometheus
+client's multiprocess mode, so totals never go backwards after a restart.
+Their files do not pile up: a process folds its file into ``exited.json``
+when it exits, and a scrape folds in the files of processes that died
+without doing so (pid gone on this host, or no touch for
+METRICS_STALE_AFTER seconds). Folding holds the lock of ``exited.json``,
+which records the files it absorbed so a crash mid-fold cannot count one
+twice. A process that was merely frozen that long finds its file gone and
+continues in a new one with only what it counted since.
+"""
+
+import os
+import copy
+import json
+import time
+import uuid
+import atexit
+import socket
+import logging
+import threading
+
+from django.conf import settings
+
+from .filelock import locked
+
+logger = logging.getLogger(__name__)
+
+METRICS_DIR = os.path.join(settings.MEDIA_ROOT, 'metrics')
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', '5'))
+METRICS_STALE_AFTER = float(os.environ.get('METRICS_STALE_AFTER', '600'))
+EXITED_FILE = os.path.join(METRICS_DIR, 'exited.json')
+# absorbed file names remembered in exited.json
+EXITED_MERGED_KEEP = 1000
+
+SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+RTF_BUCKETS = (0.1, 0.25, 0.5, 0.75, 1, 1.5, 2, 3, 5)
+
+# name -> (type, help, buckets for histograms)
+METRICS = {
+    'tts_synthesis_rtf': ('histogram', 'Synthesis real-time factor (wall time / audio time) per model.', RTF_BUCKETS),
+    'tts_synthesis_seconds': ('histogram', 'Wall time to synthesize one chunk per model.', SECONDS_BUCKETS),
+    'tts_chunk_audio_seconds': ('histogram', 'Audio duration of one synthesized chunk per model.', SECONDS_BUCKETS),
+    'tts_jobs_finished_total': ('counter', 'TTS jobs finished by the worker, by outcome.', None),
+    'openai_request_seconds': ('histogram', 'OpenAI request latency by call site.', SECONDS_BUCKETS),
+    'openai_errors_total': ('counter', 'OpenAI requests that raised, by call site.', None),
+    'openai_retries_total': ('counter', 'OpenAI requests retried after 429/5xx/timeouts, by call site.', None),
+    'openai_short_circuits_total': ('counter', 'OpenAI calls refused by the open circuit breaker, by call site.', None),
+    'openai_fallbacks_total': ('counter', 'Canned replies used instead of OpenAI, by call site.', None),
+    'tiktok_comments_received_total': ('counter', 'Comments posted to the ingest endpoint, by language.', None),
+    'tiktok_comments_dropped_total': ('counter', 'Comments dropped before a reply, by reason.', None),
+    'reply_window_seconds': ('histogram', 'Time to process one reply window (OpenAI + TTS + publish).', SECONDS_BUCKETS),
+    'reply_window_comments_total': ('counter', 'Comments answered by reply windows.', None),
+    'reply_cache_lookups_total': ('counter', 'Reply cache lookups by result (hit / miss).', None),
+    'live_admissions_total': ('counter', 'go_live capacity decisions (admit / reduce / defer / reject).', None),
+    'tts_quality_switches_total': ('counter', 'Worker quality level switches, by new level and direction (down / up).', None),
+}
+
+GAUGES = {
+    'tts_queue_jobs': 'TTS queue jobs by status and language.',
+    'tts_queue_oldest_pending_seconds': 'Age of the oldest pending TTS job.',
+    'tts_workers_live': 'TTS workers with a recent heartbeat.',
+    'tts_backlog_seconds': 'Predicted seconds until the live workers have synthesized every runnable job.',
+    'tts_quality_level': 'Highest quality degradation level of a live worker (0 full, 1 fast_voice, 2 fast_model).',
+    'reply_cache_keys': 'Normalized comments with cached reply variants.',
+    'reply_cache_hit_ratio': 'Reply cache hits / lookups since the cache file was created.',
+}
+
+_LOCK = threading.Lock()
+_STATE = {
+    'counters': {}, 'histograms': {}, 'last_flush': 0.0, 'dirty': False,
+    # this process's file, the totals last written to it and the totals already folded into exited.json
+    'pid': None, 'file': None, 'written': None, 'base': None,
+}
+
+
+def _new_file():
+    return os.path.join(METRICS_DIR, f'{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}.json')
+
+
+def _own_file():
+    """This process's file; a forked child starts over with its own (called under _LOCK)."""
+    if _STATE['pid'] != os.getpid():
+        _STATE.update(counters={}, histograms={}, last_flush=0.0, dirty=False,
+                      pid=os.getpid(), file=_new_file(), written=None, base=None)
+        threading.Thread(target=_keepalive, name='metrics-flush', daemon=True).start()
+    return _STATE['file']
+
+
+def _key(name, labels):
+    return name + json.dumps(sorted(labels.items()), separators=(',', ':'))
+
+
+def _split_key(key):
+    i = key.index('[')
+    return key[:i], dict(json.loads(key[i:]))
+
+
+def inc(name, amount=1, **labels):
+    """Increase a counter."""
+    key = _key(name, labels)
+    with _LOCK:
+        _own_file()
+        _STATE['counters'][key] = _STATE['counters'].get(key, 0) + amount
+        _STATE['dirty'] = True
+    flush()
+
+
+def observe(name, value, **labels):
+    """Record one observation in a histogram."""
+    if value is None:
+        return
+    buckets = METRICS[name][2]
+    key = _key(name, labels)
+    with _LOCK:
+        _own_file()
+        h = _STATE['histograms'].get(key)
+        if h is None:
+            h = _STATE['histograms'][key] = {'buckets': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                h['buckets'][i] += 1
+        h['sum'] += value
+        h['count'] += 1
+        _STATE['dirty'] = True
+    flush()
+
+
+def observe_synthesis(model, wall_seconds, audio_seconds):
+    """Record one TTS call: wall time, audio length and their ratio (RTF)."""
+    observe('tts_synthesis_seconds', wall_seconds, model=model)
+    if audio_seconds:
+        observe('tts_chunk_audio_seconds', audio_seconds, model=model)
+        observe('tts_synthesis_rtf', wall_seconds / audio_seconds, model=model)
+
+
+def flush(force=False):
+    """Write this process's metrics file if it changed and the flush interval passed."""
+    now = time.time()
+    with _LOCK:
+        path = _own_file()
+        if not _STATE['dirty'] or (not force and now - _STATE['last_flush'] < METRICS_FLUSH_INTERVAL):
+            return
+        if _STATE['written'] is not None and not os.path.exists(path):
+            # folded into exited.json while this process looked dead: go on with only the new counts
+            _STATE['base'] = _STATE['written']
+            path = _STATE['file'] = _new_file()
+        totals = {'counters': _STATE['counters'], 'histograms': _STATE['histograms']}
+        data = json.dumps(dict(_minus(totals, _STATE['base']), updated_at=now))
+        _STATE['written'] = copy.deepcopy(totals)
+        _STATE['last_flush'] = now
+        _STATE['dirty'] = False
+    try:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        _write(path, data)
+    except OSError:
+        logger.exception('Failed to flush metrics')
+
+
+def _keepalive():
+    while True:
+        time.sleep(METRICS_FLUSH_INTERVAL)
+        with _LOCK:
+            if _STATE['pid'] != os.getpid():
+                return
+            path, dirty = _STATE['file'], _STATE['dirty']
+        if dirty:
+            flush(force=True)
+            continue
+        try:
+            os.utime(path)
+        except OSError:
+            pass  # nothing written yet, or folded away (the next flush starts a new file)
+
+
+def _retire():
+    """At exit: flush, then fold this process's file into exited.json."""
+    flush(force=True)
+    with _LOCK:
+        path = _STATE['file'] if _STATE['pid'] == os.getpid() else None
+    if path and os.path.exists(path):
+        _fold([path])
+
+
+atexit.register(_retire)
+
+
+def _write(path, data):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+
+
+def _load(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _add(total, data):
+    """Add the counters and histograms of ``data`` into ``total`` (both {'counters', 'histograms'})."""
+    counters, histograms = total['counters'], total['histograms']
+    for key, value in data.get('counters', {}).items():
+        counters[key] = counters.get(key, 0) + value
+    for key, h in data.get('histograms', {}).items():
+        t = histograms.get(key)
+        if t is None:
+            histograms[key] = {'buckets': list(h['buckets']), 'sum': h['sum'], 'count': h['count']}
+            continue
+        t['buckets'] = [a + b for a, b in zip(t['buckets'], h['buckets'])]
+        t['sum'] += h['sum']
+        t['count'] += h['count']
+    return total
+
+
+def _minus(totals, base):
+    if not base:
+        return totals
+    counters = {k: v - base['counters'].get(k, 0) for k, v in totals['counters'].items()}
+    histograms = {}
+    for key, h in totals['histograms'].items():
+        b = base['histograms'].get(key)
+        histograms[key] = h if b is None else {
+            'buckets': [x - y for x, y in zip(h['buckets'], b['buckets'])],
+            'sum': h['sum'] - b['sum'],
+            'count': h['count'] - b['count'],
+        }
+    return {'counters': counters, 'histograms': histograms}
+
+
+def _dead(path, now):
+    """Whether a process file belongs to a process that is gone."""
+    try:
+        if now - os.path.getmtime(path) > METRICS_STALE_AFTER:
+            return True
+    except OSError:
+        return False
+    host, _, rest = os.path.basename(path)[:-len('.json')].rpartition('-')
+    host, _, pid = host.rpartition('-')
+    if host != socket.gethostname() or not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        pass
+    return False
+
+
+def _fold(paths):
+    """Move the counts of finished processes' files into exited.json and delete the files."""
+    with locked(EXITED_FILE):
+        exited = _load(EXITED_FILE) or {'counters': {}, 'histograms': {}, 'merged': []}
+        folded = []
+        for path in paths:
+            name = os.path.basename(path)
+            data = None if name in exited['merged'] else _load(path)
+            if data is not None:
+                _add(exited, data)
+                exited['merged'].append(name)
+            folded.append(path)
+        if not folded:
+            return
+        exited['merged'] = exited['merged'][-EXITED_MERGED_KEEP:]
+        _write(EXITED_FILE, json.dumps(exited))
+        for path in folded:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def collect():
+    """Sum the metrics files of every process: (counters, histograms).
+
+    Files of processes that are gone are folded into exited.json first.
+    """
+    total = {'counters': {}, 'histograms': {}}
+    if not os.path.isdir(METRICS_DIR):
+        return total['counters'], total['histograms']
+    now = time.time()
+    with _LOCK:
+        own = _STATE['file']
+    paths = [
+        os.path.join(METRICS_DIR, fn) for fn in os.listdir(METRICS_DIR)
+        if fn.endswith('.json') and fn != os.path.basename(EXITED_FILE)
+    ]
+    dead = [p for p in paths if p != own and _dead(p, now)]
+    if dead:
+        try:
+            _fold(dead)
+        except OSError:
+            logger.exception('Failed to fold metrics of exited processes')
+    for path in [EXITED_FILE] + [p for p in paths if p not in dead]:
+        data = _load(path)
+        if data is not None:
+            _add(total, data)
+    return total['counters'], total['histograms']
+
+
+def mean(name, min_count=1, **labels):
+    """Mean of a histogram over every process, or None with fewer than min_count observations."""
+    _, histograms = collect()
+    h = histograms.get(_key(name, labels))
+    if not h or h['count'] < min_count:
+        return None
+    return h['sum'] / h['count']
+
+
+def _labels(labels, **extra):
+    labels = dict(labels, **extra)
+    if not labels:
+        return ''
+    body = ','.join(
+        '{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for k, v in sorted(labels.items())
+    )
+    return '{' + body + '}'
+
+
+def _fmt(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(gauges=()):
+    """Prometheus text exposition of all processes' metrics plus scrape-time gauges.
+
+    gauges is an iterable of (name, labels dict, value) for names in GAUGES.
+    """
+    flush(force=True)
+    counters, histograms = collect()
+    lines = []
+
+    by_name = {}
+    for key, value in counters.items():
+        name, labels = _split_key(key)
+        by_name.setdefault(name, []).append((labels, value))
+    for key, h in histograms.items():
+        name, labels = _split_key(key)
+        by_name.setdefault(name, []).append((labels, h))
+
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in sorted(by_name.get(name, []), key=lambda item: sorted(item[0].items())):
+            if kind == 'counter':
+                lines.append(f'{name}{_labels(labels)} {_fmt(value)}')
+                continue
+            for bound, count in zip(buckets, value['buckets']):
+                lines.append(f'{name}_bucket{_labels(labels, le=_fmt(float(bound)))} {count}')
+            lines.append(f'{name}_bucket{_labels(labels, le="+Inf")} {value["count"]}')
+            lines.append(f'{name}_sum{_labels(labels)} {_fmt(value["sum"])}')
+            lines.append(f'{name}_count{_labels(labels)} {value["count"]}')
+
+    gauges_by_name = {}
+    for name, labels, value in gauges:
+        gauges_by_name.setdefault(name, []).append((labels, value))
+    for name, help_text in GAUGES.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} gauge')
+        for labels, value in gauges_by_name.get(name, []):
+            lines.append(f'{name}{_labels(labels)} {_fmt(value)}')
+
+    return '\n'.join(lines) + '\n'
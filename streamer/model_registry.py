@@ -0,0 +1,436 @@
+"""Local registry of the Coqui models (downloader, worker and web app).
+
+Models live under TTS_MODEL_PATH in Coqui's own layout
+(``tts_models/<lang>/<dataset>/<model>``, ``vocoder_models/...``).
+``TTS_MODEL_PATH/manifest.json`` records for each model its directory,
+model file, config and the sha256 of every file:
+
+    python -m streamer.model_registry check     # exit 0 when every model is installed (no TTS import)
+    python -m streamer.model_registry verify    # re-hash every file against the manifest
+    python scripts/download_models.py           # download what is missing, in parallel
+
+``load_tts(name)`` builds the TTS object from the local files, with the
+model's vocoder, so startup never asks Coqui's ModelManager (and the
+network) for a model that is installed. Only a model missing from the
+manifest falls back to ``TTS(model_name=...)``.
+
+After installing, each checkpoint is converted once to ``model.mmap.pth``.
+That file holds only the weights (plus scalars such as Tacotron's ``r``),
+saved so that ``torch.load(mmap=True, weights_only=True)`` can map it.
+With TTS_MODEL_MMAP=1 (default) the modules are built on the meta device,
+so no weights are allocated, and the mapped tensors are then assigned to
+them: the weight file is never read into private memory (only weights a
+model derives while loading, such as a vocoder folding in weight norm,
+are its own). The mapping is never written, so every worker and web process shares the weights through
+the page cache and a restart only maps pages that are already resident.
+A model whose modules do not build that way (a tensor the file does not
+cover) is loaded by Coqui from the same file and its weights are swapped
+for the mapping afterwards, which costs one transient copy.
+
+Only the original checkpoints (TTS_MODEL_MMAP=0, or a model missing from
+the manifest) pickle optimizer state, so only they need torch's safe
+globals extended (``_allow_checkpoint_globals``).
+
+This module does not import Django or TTS at import time, so the
+entrypoint can run ``check`` in a fraction of a second.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+from .filelock import locked
+from .tts_models import FAST_TTS_MODELS, QUALITY_FAST_MODEL, TTS_MODELS
+
+MODEL_ROOT = os.environ.get('TTS_MODEL_PATH', '/app/tts_models')
+MANIFEST_FILE = os.path.join(MODEL_ROOT, 'manifest.json')
+MODEL_DOWNLOAD_WORKERS = int(os.environ.get('MODEL_DOWNLOAD_WORKERS', '3'))
+TTS_MODEL_MMAP = os.environ.get('TTS_MODEL_MMAP', '1') == '1'
+MMAP_FILE = 'model.mmap.pth'
+
+# vocoder each TTS model is synthesized with (Coqui's default_vocoder), None for end-to-end models
+VOCODERS = {
+    'tts_models/en/ljspeech/tacotron2-DDC': 'vocoder_models/en/ljspeech/hifigan_v2',
+    'tts_models/es/css10/vits': None,
+    'tts_models/en/ljspeech/vits': None,
+}
+
+
+def required_models():
+    """Every model the app loads: the TTS models, the fast fallbacks and their vocoders."""
+    names = list(TTS_MODELS.values())
+    if QUALITY_FAST_MODEL:
+        names += list(FAST_TTS_MODELS.values())
+    names += [VOCODERS[n] for n in names if VOCODERS.get(n)]
+    return list(dict.fromkeys(names))
+
+
+def model_dir(name):
+    return os.path.join(MODEL_ROOT, *name.split('/'))
+
+
+def read_manifest():
+    try:
+        with open(MANIFEST_FILE, 'r', encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {'models': {}}
+
+
+def _write_manifest(manifest):
+    tmp = MANIFEST_FILE + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as fh:
+        json.dump(manifest, fh, indent=2, sort_keys=True)
+    os.replace(tmp, MANIFEST_FILE)
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _missing_files(name, entry, checksums=False):
+    """Files of an installed model that are absent, resized (or, with checksums, changed)."""
+    directory = model_dir(name)
+    bad = []
+    for rel, info in entry.get('files', {}).items():
+        path = os.path.join(directory, rel)
+        try:
+            if os.path.getsize(path) != info['size'] or (checksums and _sha256(path) != info['sha256']):
+                bad.append(rel)
+        except OSError:
+            bad.append(rel)
+    return bad
+
+
+def _needs_conversion(entry):
+    return TTS_MODEL_MMAP and not entry.get('mmap_file') and not entry.get('mmap_error')
+
+
+def missing_models(checksums=False):
+    """Required models that are not installed intact (or not converted yet) according to the manifest."""
+    models = read_manifest().get('models', {})
+    return [
+        name for name in required_models()
+        if name not in models or _missing_files(name, models[name], checksums) or _needs_conversion(models[name])
+    ]
+
+
+def resolve(name):
+    """Local paths of an installed model: {'model_path', 'config_path', 'mmap'}, or None."""
+    entry = read_manifest().get('models', {}).get(name)
+    if not entry:
+        return None
+    directory = model_dir(name)
+    mmap = bool(TTS_MODEL_MMAP and entry.get('mmap_file'))
+    paths = {
+        'model_path': os.path.join(directory, entry['mmap_file'] if mmap else entry['model_file']),
+        'config_path': os.path.join(directory, entry['config_file']),
+    }
+    if not all(os.path.isfile(p) for p in paths.values()):
+        return None
+    return dict(paths, mmap=mmap)
+
+
+def _allow_checkpoint_globals():
+    """Let torch>=2.6 (weights_only by default) unpickle Coqui's original checkpoints."""
+    import collections
+
+    import torch
+    from TTS.utils.radam import RAdam
+
+    torch.serialization.add_safe_globals([RAdam, collections.defaultdict, dict])
+
+
+def _mapped_weights(path):
+    import torch
+
+    return torch.load(path, map_location='cpu', mmap=True, weights_only=True)
+
+
+def _assign_mapped(model, path):
+    """Swap the weights Coqui copied into ``model`` for tensors mapped from ``path``.
+
+    Only tensors whose name and shape still match are swapped: a model that
+    reshapes weights after loading (e.g. a vocoder removing weight norm)
+    keeps its own copy of those.
+    """
+    state = _mapped_weights(path)['model']
+    current = model.state_dict()
+    mapped = {k: v for k, v in state.items() if k in current and current[k].shape == v.shape}
+    model.load_state_dict(mapped, strict=False, assign=True)
+
+
+def _check_mapped(model):
+    """Raise ValueError when a tensor of ``model`` is still on the meta device (the file did not cover it)."""
+    import torch
+
+    for prefix, module in model.named_modules():
+        tensors = dict(module._parameters, **module._buffers)
+        tensors.update((k, v) for k, v in vars(module).items() if isinstance(v, torch.Tensor))
+        for name, tensor in tensors.items():
+            if tensor is not None and tensor.is_meta:
+                raise ValueError(f'{prefix}.{name} is not in the weights file'.lstrip('.'))
+
+
+def _build_mapped(setup, checkpoint, part=lambda model: model):
+    """Build ``setup()`` on the meta device and assign the mapped ``checkpoint`` weights to ``part(model)``."""
+    import torch
+
+    with torch.device('meta'):
+        model = setup()
+    part(model).load_state_dict(checkpoint['model'], strict=False, assign=True)
+    _check_mapped(model)
+    return model
+
+
+def _mapped_synthesizer(**kwargs):
+    """Coqui's Synthesizer, building the parts that come from ``model.mmap.pth`` without a private copy.
+
+    It does what the models' own ``load_checkpoint(eval=True)`` does for the
+    models we ship; anything that does not build this way is loaded by Coqui
+    and then switched to the mapping.
+    """
+    from TTS.config import load_config
+    from TTS.tts.models import setup_model as setup_tts_model
+    from TTS.utils.audio import AudioProcessor
+    from TTS.utils.synthesizer import Synthesizer
+    from TTS.vocoder.models import setup_model as setup_vocoder_model
+
+    class MappedSynthesizer(Synthesizer):
+        def _load_tts(self, tts_checkpoint, tts_config_path, use_cuda):
+            if os.path.basename(tts_checkpoint) != MMAP_FILE:
+                return super()._load_tts(tts_checkpoint, tts_config_path, use_cuda)
+            try:
+                self.tts_config = load_config(tts_config_path)
+                checkpoint = _mapped_weights(tts_checkpoint)
+                model = _build_mapped(lambda: setup_tts_model(config=self.tts_config), checkpoint)
+                if 'r' in checkpoint and hasattr(getattr(model, 'decoder', None), 'set_r'):
+                    model.decoder.set_r(checkpoint['r'])  # Tacotron's reduction factor
+                self.tts_model = model.eval()
+            except Exception as e:
+                print(f'Building {tts_checkpoint} on mapped weights failed ({e}); loading a copy first')
+                super()._load_tts(tts_checkpoint, tts_config_path, use_cuda)
+                _assign_mapped(self.tts_model, tts_checkpoint)
+
+        def _load_vocoder(self, model_file, model_config, use_cuda):
+            if os.path.basename(model_file) != MMAP_FILE:
+                return super()._load_vocoder(model_file, model_config, use_cuda)
+            try:
+                self.vocoder_config = load_config(model_config)
+                self.vocoder_ap = AudioProcessor(verbose=False, **self.vocoder_config.audio)
+                checkpoint = _mapped_weights(model_file)
+
+                def generator(model):
+                    # GAN vocoders keep only the generator for inference; checkpoints older
+                    # than Coqui 0.0.15 hold just its weights, without the model_g. prefix
+                    if not hasattr(model, 'model_g'):
+                        return model
+                    model.model_d = None
+                    return model if any(k.startswith('model_g.') for k in checkpoint['model']) else model.model_g
+
+                model = _build_mapped(lambda: setup_vocoder_model(self.vocoder_config), checkpoint, generator)
+                if hasattr(model, 'model_g') and hasattr(model.model_g, 'remove_weight_norm'):
+                    model.model_g.remove_weight_norm()
+                self.vocoder_model = model.eval()
+            except Exception as e:
+                print(f'Building {model_file} on mapped weights failed ({e}); loading a copy first')
+                super()._load_vocoder(model_file, model_config, use_cuda)
+                _assign_mapped(self.vocoder_model, model_file)
+
+    return MappedSynthesizer(**kwargs)
+
+
+def load_tts(name, gpu=False):
+    """A Coqui TTS object for ``name``, from the local files when installed."""
+    from TTS.api import TTS
+
+    local = resolve(name)
+    vocoder = VOCODERS.get(name)
+    local_vocoder = resolve(vocoder) if vocoder else None
+    if not local or (vocoder and not local_vocoder):
+        print(f'Model {name} is not installed under {MODEL_ROOT}; loading it through Coqui (may download)')
+        _allow_checkpoint_globals()
+        return TTS(model_name=name, progress_bar=False, gpu=gpu)
+    paths = dict(
+        tts_checkpoint=local['model_path'],
+        tts_config_path=local['config_path'],
+        vocoder_checkpoint=local_vocoder and local_vocoder['model_path'],
+        vocoder_config=local_vocoder and local_vocoder['config_path'],
+    )
+    if gpu or not (local['mmap'] or (local_vocoder and local_vocoder['mmap'])):
+        _allow_checkpoint_globals()
+        return TTS(
+            model_path=paths['tts_checkpoint'],
+            config_path=paths['tts_config_path'],
+            vocoder_path=paths['vocoder_checkpoint'],
+            vocoder_config_path=paths['vocoder_config'],
+            progress_bar=False,
+            gpu=gpu,
+        )
+    if not (local['mmap'] and (not local_vocoder or local_vocoder['mmap'])):
+        _allow_checkpoint_globals()  # one part still loads from its original checkpoint
+    # an empty TTS object with the synthesizer Coqui would build from these paths
+    tts = TTS(progress_bar=False, gpu=False)
+    tts.synthesizer = _mapped_synthesizer(**paths, use_cuda=False)
+    return tts
+
+
+# ------------------------
+# Installing
+# ------------------------
+
+MODEL_FILES = ('model_file.pth', 'model.pth', 'model_file.pth.tar')
+
+
+def _rewrite_paths(value, directory, dest):
+    """Point absolute paths in a copied config (stats, speakers files) at the copy in ``dest``."""
+    if isinstance(value, str):
+        if os.path.isabs(value) and os.path.isfile(os.path.join(directory, os.path.basename(value))):
+            return os.path.join(dest, os.path.basename(value))
+        return value
+    if isinstance(value, list):
+        return [_rewrite_paths(v, directory, dest) for v in value]
+    if isinstance(value, dict):
+        return {k: _rewrite_paths(v, directory, dest) for k, v in value.items()}
+    return value
+
+
+def _register(directory, dest, model_file, config_file='config.json'):
+    """Fix the config paths of a model in ``directory`` (to be served from ``dest``) and hash its files."""
+    config = os.path.join(directory, config_file)
+    with open(config, 'r', encoding='utf-8') as fh:
+        data = json.load(fh)
+    with open(config, 'w', encoding='utf-8') as fh:
+        json.dump(_rewrite_paths(data, directory, dest), fh, indent=2)
+
+    files = {}
+    for root, _, names in os.walk(directory):
+        for filename in names:
+            path = os.path.join(root, filename)
+            files[os.path.relpath(path, directory)] = _file_info(path)
+    return {
+        'model_file': model_file,
+        'config_file': config_file,
+        'files': files,
+        'installed_at': int(time.time()),
+    }
+
+
+def _adopt(name):
+    """Manifest entry for a model already copied into place by an older downloader, or None."""
+    directory = model_dir(name)
+    if not os.path.isfile(os.path.join(directory, '.download_complete')):
+        return None
+    model_file = next((f for f in MODEL_FILES if os.path.isfile(os.path.join(directory, f))), None)
+    if not model_file or not os.path.isfile(os.path.join(directory, 'config.json')):
+        return None
+    return _register(directory, directory, model_file)
+
+
+def _download(name):
+    """Fetch one model through Coqui's cache and copy it into MODEL_ROOT; returns its manifest entry."""
+    from TTS.utils.manage import ModelManager
+
+    model_path, config_path, _ = ModelManager(progress_bar=False).download_model(name)
+    source = model_path if os.path.isdir(model_path) else os.path.dirname(model_path)
+    dest = model_dir(name)
+    tmp = dest + '.partial'
+    shutil.rmtree(tmp, ignore_errors=True)
+    shutil.copytree(source, tmp)
+    model_file = os.path.basename(model_path) if os.path.isfile(model_path) else MODEL_FILES[0]
+    entry = _register(tmp, dest, model_file, os.path.basename(config_path) if config_path else 'config.json')
+    shutil.rmtree(dest, ignore_errors=True)
+    os.replace(tmp, dest)
+    return entry
+
+
+def _file_info(path):
+    return {'size': os.path.getsize(path), 'sha256': _sha256(path)}
+
+
+def convert(name, entry):
+    """Write the model's weights as a memory-mappable ``model.mmap.pth``; returns the updated entry."""
+    import torch
+
+    directory = model_dir(name)
+    # trusted input: the checkpoint was just installed and hashed
+    checkpoint = torch.load(os.path.join(directory, entry['model_file']), map_location='cpu', weights_only=False)
+    flat = {k: v for k, v in checkpoint.items() if isinstance(v, (bool, int, float, str))}
+    # own storage per tensor, so no view drags a larger buffer into the file
+    flat['model'] = {
+        k: v.detach().clone().contiguous() for k, v in checkpoint['model'].items() if isinstance(v, torch.Tensor)
+    }
+    path = os.path.join(directory, MMAP_FILE)
+    tmp = path + '.tmp'
+    torch.save(flat, tmp)
+    os.replace(tmp, path)
+    files = dict(entry['files'], **{MMAP_FILE: _file_info(path)})
+    return dict(entry, mmap_file=MMAP_FILE, files=files)
+
+
+def _install(name, entry=None):
+    if not entry or _missing_files(name, entry):
+        entry = _adopt(name) or _download(name)
+    if _needs_conversion(entry):
+        try:
+            entry = convert(name, entry)
+        except Exception as e:
+            # still loadable from the checkpoint; do not retry on every start
+            print(f'Could not convert {name} to memory-mapped weights: {e}')
+            entry = dict(entry, mmap_error=f'{type(e).__name__}: {e}')
+    return entry
+
+
+def download_all(workers=MODEL_DOWNLOAD_WORKERS):
+    """Install every missing model, several at a time; returns the names that failed."""
+    os.makedirs(MODEL_ROOT, exist_ok=True)
+    # containers sharing the volume start together: one installs, the others then find it complete
+    with locked(MANIFEST_FILE):
+        return _download_missing(workers)
+
+
+def _download_missing(workers):
+    missing = missing_models()
+    if not missing:
+        print(f'All models installed in {MODEL_ROOT}')
+        return []
+
+    manifest = read_manifest()
+    failed = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {name: pool.submit(_install, name, manifest.get('models', {}).get(name)) for name in missing}
+        for name, future in futures.items():
+            try:
+                manifest.setdefault('models', {})[name] = future.result()
+                _write_manifest(manifest)
+                print(f'{name} ready')
+            except Exception as e:
+                print(f'Failed to download {name}: {e}')
+                failed.append(name)
+    return failed
+
+
+def main(argv):
+    command = argv[0] if argv else 'check'
+    if command == 'check':
+        missing = missing_models()
+    elif command == 'verify':
+        missing = missing_models(checksums=True)
+    else:
+        print('usage: python -m streamer.model_registry [check|verify]')
+        return 2
+    for name in missing:
+        print(f'missing or damaged: {name}')
+    return 1 if missing else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,242 @@
+"""Process-wide OpenAI clients with deadlines, retries and a circuit breaker.
+
+- One client per process (per event loop for AsyncOpenAI). The SDK's
+  HTTP pool keeps connections alive across go_live calls and reply windows;
+  retries are done here (max_retries=0 on the client).
+- Every call has a deadline that covers all of its attempts:
+  OPENAI_REPLY_TIMEOUT for short replies. Commentary parts get
+  OPENAI_COMMENTARY_TIMEOUT plus the time to generate their
+  ``max_output_tokens`` at OPENAI_COMMENTARY_TOKENS_PER_SECOND, so a
+  16000-token part may take minutes.
+- 429, 5xx, timeouts and connection errors are retried with full-jitter
+  exponential backoff (honouring Retry-After) while the deadline allows.
+- After OPENAI_BREAKER_FAILURES consecutive failed calls the breaker opens:
+  calls fail fast with OpenAIUnavailable for OPENAI_BREAKER_RESET seconds,
+  then one trial call is let through (half-open).
+
+Point OPENAI_BASE_URL at benchmarks/stub_openai.py (``--error-rate``,
+``--latency``) to exercise retries and the breaker locally.
+"""
+
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+import weakref
+
+import openai
+from openai import AsyncOpenAI, OpenAI
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+OPENAI_REPLY_TIMEOUT = float(os.environ.get('OPENAI_REPLY_TIMEOUT', '8'))
+OPENAI_COMMENTARY_TIMEOUT = float(os.environ.get('OPENAI_COMMENTARY_TIMEOUT', '120'))
+OPENAI_COMMENTARY_TOKENS_PER_SECOND = float(os.environ.get('OPENAI_COMMENTARY_TOKENS_PER_SECOND', '40'))
+OPENAI_MAX_RETRIES = int(os.environ.get('OPENAI_MAX_RETRIES', '3'))
+OPENAI_RETRY_BASE = float(os.environ.get('OPENAI_RETRY_BASE', '0.5'))
+OPENAI_RETRY_MAX = float(os.environ.get('OPENAI_RETRY_MAX', '8'))
+OPENAI_BREAKER_FAILURES = int(os.environ.get('OPENAI_BREAKER_FAILURES', '5'))
+OPENAI_BREAKER_RESET = float(os.environ.get('OPENAI_BREAKER_RESET', '30'))
+
+DEADLINES = {
+    'short_reply': OPENAI_REPLY_TIMEOUT,
+    'commentary': OPENAI_COMMENTARY_TIMEOUT,
+}
+
+
+class OpenAIUnavailable(Exception):
+    """The circuit breaker is open, or a call ran out of attempts / deadline."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker shared by every call in the process."""
+
+    def __init__(self, failures=OPENAI_BREAKER_FAILURES, reset_after=OPENAI_BREAKER_RESET):
+        self.failures = failures
+        self.reset_after = reset_after
+        self._lock = threading.Lock()
+        self._consecutive = 0
+        self._opened_at = None
+        # start time of the half-open trial call in flight, if any
+        self._trial = None
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state(time.monotonic())
+
+    def _state(self, now):
+        if self._opened_at is None:
+            return 'closed'
+        if now - self._opened_at >= self.reset_after:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        """True when a call may go out; in half-open state only one trial at a time."""
+        with self._lock:
+            now = time.monotonic()
+            state = self._state(now)
+            if state == 'closed':
+                return True
+            # a trial that never reported back (e.g. cancelled) does not block forever
+            if state == 'half_open' and (self._trial is None or now - self._trial >= self.reset_after):
+                self._trial = now
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info('OpenAI circuit breaker closed')
+            self._consecutive = 0
+            self._opened_at = None
+            self._trial = None
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive += 1
+            self._trial = None
+            if self._opened_at is not None or self._consecutive >= self.failures:
+                if self._opened_at is None:
+                    logger.warning('OpenAI circuit breaker opened after %s failures', self._consecutive)
+                self._opened_at = time.monotonic()
+
+
+breaker = CircuitBreaker()
+
+_SYNC_CLIENT = {'client': None}
+_SYNC_LOCK = threading.Lock()
+# AsyncOpenAI's connection pool is bound to the loop it was first used on
+_ASYNC_CLIENTS = weakref.WeakKeyDictionary()
+
+
+def get_client():
+    """The process-wide synchronous client."""
+    with _SYNC_LOCK:
+        if _SYNC_CLIENT['client'] is None:
+            _SYNC_CLIENT['client'] = OpenAI(
+                api_key=os.environ.get('OPENAI_API_KEY'),
+                max_retries=0,
+            )
+        return _SYNC_CLIENT['client']
+
+
+def get_async_client():
+    """The AsyncOpenAI client of the running event loop (created on first use)."""
+    loop = asyncio.get_running_loop()
+    client = _ASYNC_CLIENTS.get(loop)
+    if client is None:
+        client = AsyncOpenAI(
+            api_key=os.environ.get('OPENAI_API_KEY'),
+            max_retries=0,
+        )
+        _ASYNC_CLIENTS[loop] = client
+    return client
+
+
+def _retryable(exc):
+    if isinstance(exc, (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError)):
+        return True
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code >= 500
+    return False
+
+
+def _backoff(attempt, exc):
+    retry_after = None
+    response = getattr(exc, 'response', None)
+    if response is not None:
+        try:
+            retry_after = float(response.headers.get('retry-after'))
+        except (TypeError, ValueError):
+            retry_after = None
+    if retry_after is not None:
+        return min(retry_after, OPENAI_RETRY_MAX)
+    return random.uniform(0, min(OPENAI_RETRY_MAX, OPENAI_RETRY_BASE * (2 ** attempt)))
+
+
+def deadline_for(call, max_output_tokens=None):
+    """Seconds a call may take, all attempts included."""
+    if call == 'short_reply':
+        return DEADLINES[call]
+    # long outputs (reasoning included) take a while to generate: scale with the token budget
+    return DEADLINES['commentary'] + (max_output_tokens or 0) / OPENAI_COMMENTARY_TOKENS_PER_SECOND
+
+
+def _plan(call, kwargs):
+    if not breaker.allow():
+        metrics.inc('openai_short_circuits_total', call=call)
+        raise OpenAIUnavailable('OpenAI circuit breaker is open')
+    return time.monotonic() + deadline_for(call, kwargs.get('max_output_tokens'))
+
+
+def _remaining(call, deadline):
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        breaker.record_failure()
+        raise OpenAIUnavailable(f'OpenAI {call} deadline exceeded')
+    return remaining
+
+
+def _retry_delay(call, attempt, started, exc, deadline):
+    """Seconds to wait before the next attempt; raises when the call should give up.
+
+    Non-retryable errors (400, 401, ...) are re-raised as-is and do not count
+    against the breaker: the API is up, the request is wrong.
+    """
+    metrics.observe('openai_request_seconds', time.time() - started, call=call)
+    metrics.inc('openai_errors_total', call=call)
+    if not _retryable(exc):
+        breaker.record_success()
+        raise exc
+    delay = _backoff(attempt, exc)
+    if attempt >= OPENAI_MAX_RETRIES or time.monotonic() + delay >= deadline:
+        breaker.record_failure()
+        raise OpenAIUnavailable(f'OpenAI {call} failed after {attempt + 1} attempts: {exc}') from exc
+    logger.warning('OpenAI %s attempt %s failed (%s); retrying in %.2fs', call, attempt + 1, exc, delay)
+    metrics.inc('openai_retries_total', call=call)
+    return delay
+
+
+def _succeeded(call, started):
+    metrics.observe('openai_request_seconds', time.time() - started, call=call)
+    breaker.record_success()
+
+
+async def acreate_response(client, call, **kwargs):
+    """client.responses.create with the call's deadline, retries and the breaker."""
+    deadline = _plan(call, kwargs)
+    attempt = 0
+    while True:
+        remaining = _remaining(call, deadline)
+        started = time.time()
+        try:
+            response = await client.responses.create(timeout=remaining, **kwargs)
+        except openai.OpenAIError as exc:
+            await asyncio.sleep(_retry_delay(call, attempt, started, exc, deadline))
+            attempt += 1
+            continue
+        _succeeded(call, started)
+        return response
+
+
+def create_response(client, call, **kwargs):
+    """Blocking twin of acreate_response for synchronous callers."""
+    deadline = _plan(call, kwargs)
+    attempt = 0
+    while True:
+        remaining = _remaining(call, deadline)
+        started = time.time()
+        try:
+            response = client.responses.create(timeout=remaining, **kwargs)
+        except openai.OpenAIError as exc:
+            time.sleep(_retry_delay(call, attempt, started, exc, deadline))
+            attempt += 1
+            continue
+        _succeeded(call, started)
+        return response
@@ -0,0 +1,173 @@
+"""Per-session playlists written by the worker as chunks are published.
+
+For every live session the worker maintains, under MEDIA_ROOT/playlists/:
+
+- ``session_<id>.json``: every published segment with its index, url,
+  duration (seconds), byte size and start offset within the session, and
+  ``started_at``, when the first segment was published.
+- ``session_<id>.m3u8``: an HLS-style EVENT playlist of the contiguous
+  prefix of segments (HLS cannot express gaps), closed with
+  ``#EXT-X-ENDLIST`` once the session has no more work queued.
+
+Both files are rewritten atomically (tmp + os.replace) under a per-session
+lock, so players can fetch them at any time.
+"""
+
+import os
+import json
+import math
+import wave
+import time
+
+from django.conf import settings
+
+from .filelock import locked
+
+PLAYLIST_DIR = os.path.join(settings.MEDIA_ROOT, 'playlists')
+
+
+def playlist_paths(session):
+    base = os.path.join(PLAYLIST_DIR, f'session_{session}')
+    return base + '.json', base + '.m3u8'
+
+
+def playlist_url(session):
+    return f'{settings.MEDIA_URL}playlists/session_{session}.json'
+
+
+def wav_duration(path):
+    """Duration in seconds of a PCM WAV file (header only, no decoding)."""
+    try:
+        with wave.open(path, 'rb') as w:
+            return w.getnframes() / float(w.getframerate() or 1)
+    except Exception:
+        return None
+
+
+def _atomic_write(path, text):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as fh:
+        fh.write(text)
+    os.replace(tmp, path)
+
+
+def _read(json_path, session):
+    try:
+        with open(json_path, 'r', encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {'session': str(session), 'segments': [], 'ended': False}
+
+
+def _render_m3u8(pl):
+    """HLS EVENT playlist over the contiguous prefix of segments (index 0, 1, 2...)."""
+    prefix = []
+    for expected, seg in enumerate(pl['segments']):
+        if seg['index'] != expected:
+            break
+        prefix.append(seg)
+
+    durations = [seg.get('duration') or 0 for seg in prefix]
+    lines = [
+        '#EXTM3U',
+        '#EXT-X-VERSION:3',
+        '#EXT-X-PLAYLIST-TYPE:EVENT',
+        f'#EXT-X-TARGETDURATION:{int(math.ceil(max(durations, default=1)))}',
+        '#EXT-X-MEDIA-SEQUENCE:0',
+    ]
+    for seg, duration in zip(prefix, durations):
+        lines.append(f'#EXTINF:{duration:.3f},')
+        lines.append('../' + seg['filename'])
+    # only close the playlist once every segment is present
+    if pl.get('ended') and len(prefix) == len(pl['segments']):
+        lines.append('#EXT-X-ENDLIST')
+    return '\n'.join(lines) + '\n'
+
+
+def _write(pl, session):
+    json_path, m3u8_path = playlist_paths(session)
+
+    offset = 0.0
+    for seg in pl['segments']:
+        seg['start'] = round(offset, 3)
+        offset += seg.get('duration') or 0
+    pl['total_duration'] = round(offset, 3)
+    pl['total_bytes'] = sum(seg.get('size', 0) for seg in pl['segments'])
+    pl['updated_at'] = time.time()
+
+    _atomic_write(json_path, json.dumps(pl))
+    _atomic_write(m3u8_path, _render_m3u8(pl))
+
+
+def update_playlist(session, update_fn):
+    json_path, _ = playlist_paths(session)
+    with locked(json_path):
+        pl = _read(json_path, session)
+        pl = update_fn(pl) or pl
+        pl['segments'].sort(key=lambda seg: seg['index'])
+        _write(pl, session)
+    return pl
+
+
+def add_segment(session, index, filename, duration=None):
+    """Add (or replace) segment ``index`` of ``session`` after it was published."""
+    try:
+        size = os.path.getsize(os.path.join(settings.MEDIA_ROOT, filename))
+    except OSError:
+        size = 0
+
+    segment = {
+        'index': int(index),
+        'filename': filename,
+        'url': settings.MEDIA_URL + filename,
+        'duration': round(duration, 3) if duration else None,
+        'size': size,
+    }
+
+    def updater(pl):
+        pl['segments'] = [seg for seg in pl['segments'] if seg['index'] != segment['index']]
+        pl['segments'].append(segment)
+        if segment['index'] == 0:
+            # playback can start now: deadlines of later chunks count from here (streamer.quality)
+            pl.setdefault('started_at', time.time())
+        return pl
+
+    return update_playlist(session, updater)
+
+
+def end_session(session):
+    """Mark the session complete so the m3u8 gets #EXT-X-ENDLIST."""
+    def updater(pl):
+        pl['ended'] = True
+        return pl
+    return update_playlist(session, updater)
+
+
+def drop_segment(session, index):
+    json_path, _ = playlist_paths(session)
+    if not os.path.exists(json_path):
+        return None
+
+    def updater(pl):
+        pl['segments'] = [seg for seg in pl['segments'] if seg['index'] != int(index)]
+        return pl
+    return update_playlist(session, updater)
+
+
+def delete_playlists(sessions=None):
+    """Remove playlist files for the given sessions (all sessions when None)."""
+    if not os.path.isdir(PLAYLIST_DIR):
+        return 0
+    removed = 0
+    for fn in os.listdir(PLAYLIST_DIR):
+        if not fn.startswith('session_'):
+            continue
+        sid = fn[len('session_'):].split('.', 1)[0]
+        if sessions is not None and sid not in {str(s) for s in sessions}:
+            continue
+        try:
+            os.remove(os.path.join(PLAYLIST_DIR, fn))
+            removed += 1
+        except OSError:
+            pass
+    return removed
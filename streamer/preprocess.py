@@ -0,0 +1,143 @@
+"""Text preprocessing for TTS, run once when a chunk is enqueued.
+
+``prepare`` turns chunk text into what the worker feeds the model:
+
+- normalization: NFKC, markdown markers, emoji and quotes stripped,
+  dashes turned into commas, symbols spelled out per language;
+- segmentation into sentences (streamer.chunking rules), each with
+  terminal punctuation, so Coqui's own sentence splitter is skipped;
+- pauses: the silence after each sentence. Paragraph ends get a longer
+  pause, and so does Spanish every PAUSE_EVERY_WORDS words;
+- voice parameters of the model (the slower Spanish VITS voice), which
+  ``synthesize`` sets on the model for the call.
+
+The result is stored in the job as ``prep``, so a retried job reuses it
+and the worker only runs inference (``synthesize``). Phonemes are not
+precomputed: neither shipped model uses phoneme input, and Coqui's API
+phonemizes inside inference anyway.
+"""
+
+import os
+import re
+import threading
+import contextlib
+import unicodedata
+
+from .chunking import CHUNK_MAX_SENTENCE_WORDS, split_units
+from .tts_models import model_for
+
+# bump when the output changes; older prep is recomputed by the worker
+PREPROCESS_VERSION = 1
+
+PREPROCESS_SENTENCE_PAUSE = float(os.environ.get('PREPROCESS_SENTENCE_PAUSE', '0.45'))
+PREPROCESS_PARAGRAPH_PAUSE = float(os.environ.get('PREPROCESS_PARAGRAPH_PAUSE', '0.9'))
+PAUSE_EVERY_WORDS = {'es': 20}
+
+VOICE_PARAMS = {
+    'tts_models/es/css10/vits': {'length_scale': 1.45, 'noise_scale': 0.6, 'noise_scale_w': 0.75},
+}
+
+# Coqui forwards tts() kwargs only to models with their own synthesize() (XTTS,
+# Bark); VITS reads these settings from attributes of the model instead
+MODEL_ATTRIBUTES = {
+    'length_scale': 'length_scale',
+    'noise_scale': 'inference_noise_scale',
+    'noise_scale_w': 'inference_noise_scale_dp',
+}
+_SETTINGS_LOCK = threading.Lock()
+
+SYMBOLS = {
+    'en': {'%': ' percent', '&': ' and ', '+': ' plus ', '=': ' equals ', '@': ' at '},
+    'es': {'%': ' por ciento', '&': ' y ', '+': ' más ', '=': ' igual a ', '@': ' arroba '},
+}
+
+_MARKDOWN_RE = re.compile(r'^\s*(?:#+|[-*•>]|\d+[.)])\s+', flags=re.MULTILINE)
+_EMPHASIS_RE = re.compile(r'[*_`~]+')
+_DASH_RE = re.compile(r'\s*[—–]\s*|\s+-\s+')
+_QUOTES_RE = re.compile(r'["“”«»‘’]')
+_PARAGRAPH_RE = re.compile(r'\n\s*\n')
+
+
+def normalize(text, language='en'):
+    """Text the TTS tokenizer reads cleanly; line breaks are kept for segmentation."""
+    text = unicodedata.normalize('NFKC', text)
+    text = _MARKDOWN_RE.sub('', text)
+    text = _EMPHASIS_RE.sub('', text)
+    text = _DASH_RE.sub(', ', text)
+    text = _QUOTES_RE.sub('', text)
+    text = ''.join(ch for ch in text if unicodedata.category(ch) not in ('So', 'Cs', 'Co', 'Cn'))
+    for symbol, spoken in SYMBOLS.get(language, SYMBOLS['en']).items():
+        text = text.replace(symbol, spoken)
+    return '\n'.join(re.sub(r'[ \t]+', ' ', line).strip() for line in text.split('\n'))
+
+
+def segment(text, language='en'):
+    """[[sentence, pause seconds after it], ...] for normalized text."""
+    every = PAUSE_EVERY_WORDS.get(language)
+    out = []
+    since_pause = 0
+    for paragraph in _PARAGRAPH_RE.split(text):
+        units = split_units(paragraph, CHUNK_MAX_SENTENCE_WORDS)
+        for i, unit in enumerate(units):
+            since_pause += len(unit.split())
+            pause = PREPROCESS_SENTENCE_PAUSE
+            if i == len(units) - 1 or (every and since_pause >= every):
+                pause = PREPROCESS_PARAGRAPH_PAUSE
+                since_pause = 0
+            out.append([unit, pause])
+    if out:
+        out[-1][1] = 0.0
+    return out
+
+
+def prepare(text, language='en'):
+    """Everything the worker needs besides the model, JSON-serializable for the job."""
+    model = model_for(language)
+    return {
+        'v': PREPROCESS_VERSION,
+        'model': model,
+        'params': VOICE_PARAMS.get(model, {}),
+        'sentences': segment(normalize(text, language), language),
+    }
+
+
+def prep_for(job):
+    """The job's stored prep, or a fresh one for jobs queued before (or by an older) preprocessing."""
+    prep = job.get('prep')
+    if prep and prep.get('v') == PREPROCESS_VERSION:
+        return prep
+    return prepare(job.get('text', ''), job.get('language', 'en'))
+
+
+def _model_settings(model, params):
+    """Split voice params into attributes the model reads itself and kwargs left for tts()."""
+    settings, kwargs = {}, {}
+    for name, value in params.items():
+        attribute = MODEL_ATTRIBUTES.get(name)
+        if attribute and hasattr(model, attribute):
+            settings[attribute] = value
+        else:
+            kwargs[name] = value
+    return settings, kwargs
+
+
+def synthesize(tts, prep, file_path):
+    """Inference only: one model call per prepared sentence, joined with the prepared pauses."""
+    rate = tts.synthesizer.output_sample_rate
+    model = getattr(tts.synthesizer, 'tts_model', None)
+    settings, kwargs = _model_settings(model, prep['params'])
+    wav = []
+    # the web process shares a model between threads: keep its settings for this whole call
+    with _SETTINGS_LOCK if settings else contextlib.nullcontext():
+        saved = {name: getattr(model, name) for name in settings}
+        for name, value in settings.items():
+            setattr(model, name, value)
+        try:
+            for text, pause in prep['sentences']:
+                wav += list(tts.tts(text=text, split_sentences=False, **kwargs))
+                wav += [0.0] * int(pause * rate)
+        finally:
+            for name, value in saved.items():
+                setattr(model, name, value)
+    tts.synthesizer.save_wav(wav=wav, path=file_path)
+    return file_path
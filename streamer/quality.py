@@ -0,0 +1,125 @@
+"""Adaptive synthesis quality: keep up with real time before sounding best.
+
+Every published live chunk has a playback deadline. Playback starts when
+chunk 0 is published (the playlist's ``started_at``), and each chunk must
+be there when the audio before it has played. The slack of a chunk is its
+deadline minus the moment it was published. A worker's QualityController
+watches that slack and moves between levels, one step at a time:
+
+- ``full`` (0): the configured models and voice parameters, full reply template.
+- ``fast_voice`` (1): faster VITS settings (FAST_VOICE_PARAMS: shorter
+  ``length_scale``, less sampling noise) and replies that skip reading the
+  comment aloud.
+- ``fast_model`` (2): a cheaper model where the language has one
+  (tts_models.FAST_TTS_MODELS, e.g. English VITS instead of Tacotron2 +
+  HiFi-GAN). Only with QUALITY_FAST_MODEL=1.
+
+It steps down when a chunk's slack is below QUALITY_DEGRADE_SLACK. It steps
+back up after QUALITY_RECOVER_JOBS chunks in a row with more than
+QUALITY_RECOVER_SLACK. Two switches are at least QUALITY_MIN_DWELL seconds
+apart. The level is sent with the worker heartbeat, so the web app applies
+the highest level of any live worker to reply windows.
+"""
+
+import os
+import time
+
+from .preprocess import VOICE_PARAMS
+from .tts_models import FAST_TTS_MODELS, QUALITY_FAST_MODEL, model_for
+from .workers import live_workers
+
+QUALITY_ADAPTIVE = os.environ.get('QUALITY_ADAPTIVE', '1') == '1'
+QUALITY_DEGRADE_SLACK = float(os.environ.get('QUALITY_DEGRADE_SLACK', '10'))
+QUALITY_RECOVER_SLACK = float(os.environ.get('QUALITY_RECOVER_SLACK', '45'))
+QUALITY_RECOVER_JOBS = int(os.environ.get('QUALITY_RECOVER_JOBS', '3'))
+QUALITY_MIN_DWELL = float(os.environ.get('QUALITY_MIN_DWELL', '20'))
+
+LEVELS = ('full', 'fast_voice', 'fast_model')
+MAX_LEVEL = 2 if QUALITY_FAST_MODEL else 1
+
+FAST_VOICE_PARAMS = {
+    'tts_models/es/css10/vits': {'length_scale': 1.25, 'noise_scale': 0.45, 'noise_scale_w': 0.6},
+}
+
+REPLY_TEMPLATES = (
+    'We have a comment From {user} Comment says {comment} My response is {reply}',
+    '{user} {reply}',
+)
+
+
+def model_at(language, level):
+    """TTS model for language at a quality level."""
+    if level >= 2 and language in FAST_TTS_MODELS:
+        return FAST_TTS_MODELS[language]
+    return model_for(language)
+
+
+def voice_params(model, level):
+    if level >= 1 and model in FAST_VOICE_PARAMS:
+        return FAST_VOICE_PARAMS[model]
+    return VOICE_PARAMS.get(model, {})
+
+
+def degrade(prep, language, level):
+    """A job's prep for a quality level: same sentences and pauses, the level's model and params."""
+    if level <= 0:
+        return prep
+    model = model_at(language, level)
+    return dict(prep, model=model, params=voice_params(model, level))
+
+
+def reply_template(level):
+    return REPLY_TEMPLATES[min(level, len(REPLY_TEMPLATES) - 1)]
+
+
+def current_level():
+    """Highest quality level reported by a live worker (0 when none degrades)."""
+    return max((w.get('quality') or 0 for w in live_workers().values()), default=0)
+
+
+def playback_slack(playlist, index, now=None):
+    """Seconds between the publish of chunk ``index`` (now) and its playback deadline; None before playback.
+
+    Earlier chunks that are not published yet count with the mean duration of those that are.
+    """
+    now = time.time() if now is None else now
+    started = playlist.get('started_at')
+    if started is None or int(index) <= 0:
+        return None
+    earlier = [seg.get('duration') or 0 for seg in playlist['segments'] if seg['index'] < int(index)]
+    known = [seg.get('duration') for seg in playlist['segments'] if seg.get('duration')]
+    mean = sum(known) / len(known) if known else 0
+    played_before = sum(earlier) + mean * (int(index) - len(earlier))
+    return started + played_before - now
+
+
+class QualityController:
+    """Per-worker level with hysteresis; observe() returns the new level name after a switch."""
+
+    def __init__(self, max_level=MAX_LEVEL):
+        self.max_level = max_level if QUALITY_ADAPTIVE else 0
+        self.level = 0
+        self.calm = 0
+        self.changed_at = 0.0
+
+    @property
+    def name(self):
+        return LEVELS[self.level]
+
+    def observe(self, slack, now=None):
+        if slack is None or not self.max_level:
+            return None
+        now = time.time() if now is None else now
+        if slack < QUALITY_DEGRADE_SLACK:
+            self.calm = 0
+            target = min(self.level + 1, self.max_level)
+        elif slack > QUALITY_RECOVER_SLACK:
+            self.calm += 1
+            target = self.level - 1 if self.level and self.calm >= QUALITY_RECOVER_JOBS else self.level
+        else:
+            self.calm = 0
+            target = self.level
+        if target == self.level or now - self.changed_at < QUALITY_MIN_DWELL:
+            return None
+        self.level, self.calm, self.changed_at = target, 0, now
+        return self.name
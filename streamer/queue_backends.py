@@ -0,0 +1,713 @@
+"""Storage backends for the TTS job queue (see streamer.queue_store).
+
+Every backend stores the queue as an ordered list of job dicts and offers
+the same three operations: ``read()``, ``write(jobs)`` and ``update(fn)``.
+``update`` applies ``fn`` to the current list atomically across processes
+(and, for redis, across machines). The backend is chosen with
+TTS_QUEUE_BACKEND / TTS_QUEUE_URL in settings:
+
+- ``json`` (default): a JSON file per session under MEDIA_ROOT plus a
+  head file, updated under a file lock. Web and workers must share the
+  media volume.
+- ``sqlite``: one row per job in a local database file (TTS_QUEUE_URL is
+  its path, default MEDIA_ROOT/tts_queue.sqlite3). An update is an
+  IMMEDIATE transaction and writes only the rows that changed. It is
+  meant for one machine.
+- ``redis``: any server speaking the Redis protocol (TTS_QUEUE_URL
+  ``redis://[:password@]host:6379/0``). Jobs are stored in a hash plus a
+  sorted set that keeps their order. An update is a WATCH / MULTI / EXEC
+  transaction, retried when another client changed the queue first. Web
+  and workers on different machines can share it. No client library is
+  needed.
+
+Jobs are keyed by session and index. In the keyed backends, a job keeps
+its position from when it was first added, and new jobs go to the end.
+
+Status views do not read the whole queue. Every backend keeps job counts
+per (session, status, language) up to date as part of each update, and
+``counts()`` returns them. ``page()`` lists jobs newest first, ordered by
+(session, index), with an opaque cursor and optional filters. The JSON
+backend writes and recounts only the sessions an update changed, and a
+page reads only the session files it needs. SQLite and Redis apply only
+the changes of each update, in the same transaction. Their pages use an
+index on (session, index).
+"""
+
+import os
+import json
+import time
+import socket
+import sqlite3
+import threading
+from urllib.parse import quote, urlparse, unquote
+
+from .filelock import locked
+
+
+def _session_index(job):
+    session = job.get('session') if job.get('session') is not None else job.get('session_ts')
+    index = job.get('index') if job.get('index') is not None else job.get('idx')
+    return session, index
+
+
+def job_key(job):
+    return '{}:{}'.format(*_session_index(job))
+
+
+def tally_key(job):
+    """Counter a job is counted in: '<session>|<status>|<language>'."""
+    session, _ = _session_index(job)
+    return f"{session}|{job.get('status')}|{job.get('language') or 'en'}"
+
+
+def _tally(jobs):
+    counts = {}
+    for job in jobs:
+        key = tally_key(job)
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _order(job):
+    """Sort key of pages: (session, index), newest session first when reversed."""
+    session, index = _session_index(job)
+    return _number(session), _number(index)
+
+
+def parse_cursor(cursor):
+    """A page cursor (the job_key of the last job of a page) as an _order key; ValueError when malformed."""
+    session, _, index = str(cursor).partition('#')[0].partition(':')
+    if not index:
+        raise ValueError(f'invalid cursor {cursor!r}')
+    # legacy jobs without a session / index sort as 0, like in _order
+    return _number(session), _number(index)
+
+
+def _matches(job, session=None, status=None, language=None):
+    return (
+        (session is None or str(_session_index(job)[0]) == str(session))
+        and (status is None or job.get('status') == status)
+        and (language is None or (job.get('language') or 'en') == language)
+    )
+
+
+def _page(jobs, cursor, limit):
+    """Newest-first page of already filtered jobs below cursor: (jobs, next cursor)."""
+    after = parse_cursor(cursor) if cursor else None
+    selected = sorted((j for j in jobs if after is None or _order(j) < after), key=_order, reverse=True)
+    page = selected[:limit]
+    return page, job_key(page[-1]) if len(selected) > limit else None
+
+
+def _keyed(jobs):
+    """(key, job) pairs; a repeated key (legacy duplicates) gets a suffix so no job is lost."""
+    seen = {}
+    for job in jobs:
+        key = job_key(job)
+        seen[key] = seen.get(key, 0) + 1
+        yield (key if seen[key] == 1 else f'{key}#{seen[key]}'), job
+
+
+def _diff(old, jobs):
+    """Changes turning ``old`` ({key: (pos, text)}) into ``jobs``.
+
+    Returns (upserts [(key, pos, text, job)], deletes [key], count changes {tally key: delta});
+    only changed jobs are decoded to update the counts.
+    """
+    next_pos = max((pos for pos, _ in old.values()), default=-1) + 1
+    upserts, keep, delta = [], set(), {}
+
+    def count(job, n):
+        key = tally_key(job)
+        delta[key] = delta.get(key, 0) + n
+
+    for key, job in _keyed(jobs):
+        keep.add(key)
+        text = json.dumps(job)
+        if key not in old:
+            upserts.append((key, next_pos, text, job))
+            next_pos += 1
+            count(job, 1)
+        elif old[key][1] != text:
+            upserts.append((key, old[key][0], text, job))
+            count(json.loads(old[key][1]), -1)
+            count(job, 1)
+    deletes = [key for key in old if key not in keep]
+    for key in deletes:
+        count(json.loads(old[key][1]), -1)
+    return upserts, deletes, {key: n for key, n in delta.items() if n}
+
+
+def _apply(update_fn, jobs):
+    # update functions mutate in place and may return None; an empty list is a real result
+    new_jobs = update_fn(jobs)
+    return jobs if new_jobs is None else new_jobs
+
+
+class QueueBackend:
+    name = None
+
+    def read(self):
+        raise NotImplementedError
+
+    def write(self, jobs):
+        self.update(lambda q: jobs)
+
+    def update(self, update_fn):
+        """Apply update_fn to the current list atomically; returns the new list."""
+        raise NotImplementedError
+
+    def counts(self):
+        """{tally key: jobs} for every (session, status, language) with jobs (see tally_key)."""
+        return {key: n for key, n in _tally(self.read()).items() if n}
+
+    def page(self, cursor=None, limit=50, **filters):
+        """Jobs newest first (by session, index) after ``cursor``: (jobs, next cursor or None)."""
+        return _page([j for j in self.read() if _matches(j, **filters)], cursor, limit)
+
+
+# ------------------------
+# JSON file
+# ------------------------
+
+class JsonFileBackend(QueueBackend):
+    """The queue as one JSON file per session plus a head file.
+
+    The head (``tts_queue.head.json``) holds a generation counter, the order
+    of the queue (runs of [session, jobs]) and, for every session, its file
+    and its counts. Session files are never rewritten in place: a changed
+    session gets a new file named after the generation, the head is
+    replaced (the commit point), and only then are the old files removed.
+    Readers take no lock; a reader whose files were removed under it starts
+    again from the new head.
+
+    An update serializes every session once and writes only those whose
+    text changed, recounting only them. Pages read the head and the session
+    files they need. A ``tts_queue.json`` left by an older version is
+    imported on first use and renamed to ``tts_queue.json.migrated``.
+    """
+
+    name = 'json'
+
+    def __init__(self, path):
+        self.path = path
+        base = os.path.splitext(path)[0]
+        self.head_path = base + '.head.json'
+        self.sessions_dir = base + '.sessions'
+
+    def _read_head(self):
+        try:
+            with open(self.head_path, 'r', encoding='utf-8') as fh:
+                return json.load(fh)
+        except FileNotFoundError:
+            return None
+
+    def _fresh_head(self):
+        head = self._read_head()
+        if head is not None:
+            return head
+        with locked(self.path):
+            head = self._read_head()
+            if head is None:
+                head = self._migrate()
+            return head
+
+    def _migrate(self):
+        """First head: imports a legacy queue file, drops leftovers of an interrupted update."""
+        os.makedirs(self.sessions_dir, exist_ok=True)
+        for name in os.listdir(self.sessions_dir):
+            os.remove(os.path.join(self.sessions_dir, name))
+        try:
+            os.remove(os.path.splitext(self.path)[0] + '.counts.json')  # the previous index
+        except FileNotFoundError:
+            pass
+        jobs = []
+        try:
+            with open(self.path, 'r', encoding='utf-8') as fh:
+                jobs = json.load(fh)
+        except FileNotFoundError:
+            pass
+        except ValueError:
+            print(f'Ignoring unreadable legacy TTS queue {self.path}')
+        head = self._commit({'generation': 0, 'order': [], 'sessions': {}}, {}, jobs)
+        if os.path.exists(self.path):
+            os.replace(self.path, self.path + '.migrated')
+        return head
+
+    def _session_file(self, session, generation):
+        return f"{quote(session, safe='')}.{generation}.json"
+
+    def _load(self, head, names=None):
+        """{session: (text, jobs)} of ``names`` (every session) under ``head``; FileNotFoundError when replaced."""
+        loaded = {}
+        for name in head['sessions'] if names is None else names:
+            with open(os.path.join(self.sessions_dir, head['sessions'][name]['file']), 'r', encoding='utf-8') as fh:
+                text = fh.read()
+            loaded[name] = (text, json.loads(text))
+        return loaded
+
+    def _snapshot(self):
+        """(head, loaded sessions) of one generation, retried while updates replace the files."""
+        for _ in range(50):
+            head = self._fresh_head()
+            try:
+                return head, self._load(head)
+            except FileNotFoundError:
+                time.sleep(0.001)
+        raise RuntimeError('TTS queue kept changing while it was read')
+
+    @staticmethod
+    def _ordered(head, loaded):
+        jobs = []
+        offsets = {}
+        for session, n in head['order']:
+            start = offsets.get(session, 0)
+            jobs += loaded[session][1][start:start + n]
+            offsets[session] = start + n
+        return jobs
+
+    def read(self):
+        head, loaded = self._snapshot()
+        return self._ordered(head, loaded)
+
+    def update(self, update_fn):
+        with locked(self.path):
+            head = self._read_head() or self._migrate()
+            loaded = self._load(head)
+            new_jobs = _apply(update_fn, self._ordered(head, loaded))
+            self._commit(head, loaded, new_jobs)
+            return new_jobs
+
+    def _commit(self, head, loaded, jobs):
+        """Write the sessions of ``jobs`` that differ from ``loaded`` and the next head; returns it."""
+        generation = head['generation'] + 1
+        grouped, order = {}, []
+        for job in jobs:
+            session = str(_session_index(job)[0])
+            grouped.setdefault(session, []).append(job)
+            if order and order[-1][0] == session:
+                order[-1][1] += 1
+            else:
+                order.append([session, 1])
+        os.makedirs(self.sessions_dir, exist_ok=True)
+        sessions, replaced = {}, []
+        for session, group in grouped.items():
+            text = json.dumps(group)
+            entry = head['sessions'].get(session)
+            if entry is None or session not in loaded or loaded[session][0] != text:
+                name = self._session_file(session, generation)
+                _write_text(os.path.join(self.sessions_dir, name), text)
+                if entry is not None:
+                    replaced.append(entry['file'])
+                entry = {'file': name, 'counts': _tally(group)}
+            sessions[session] = entry
+        replaced += [entry['file'] for session, entry in head['sessions'].items() if session not in sessions]
+        head = {'generation': generation, 'order': order, 'sessions': sessions}
+        _write_text(self.head_path, json.dumps(head))
+        for name in replaced:
+            try:
+                os.remove(os.path.join(self.sessions_dir, name))
+            except FileNotFoundError:
+                pass
+        return head
+
+    def generation(self):
+        """Bumped by every update (under the lock): equal generations mean the same queue."""
+        return self._fresh_head()['generation']
+
+    def counts(self):
+        counts = {}
+        for entry in self._fresh_head()['sessions'].values():
+            counts.update(entry['counts'])
+        return counts
+
+    def page(self, cursor=None, limit=50, session=None, status=None, language=None):
+        after = parse_cursor(cursor) if cursor else None
+        for _ in range(50):
+            head = self._fresh_head()
+            wanted = [
+                name for name, entry in head['sessions'].items()
+                if (session is None or name == str(session))
+                and (after is None or _number(name) <= after[0])
+                and any(_tallied(key, status, language) for key in entry['counts'])
+            ]
+            selected = []
+            try:
+                # newest session first: once a session fills the page, older ones cannot be on it
+                for name in sorted(wanted, key=_number, reverse=True):
+                    if len(selected) > limit:
+                        break
+                    selected += [
+                        j for j in self._load(head, [name])[name][1]
+                        if _matches(j, session, status, language) and (after is None or _order(j) < after)
+                    ]
+            except FileNotFoundError:
+                # replaced by an update since the head was read
+                time.sleep(0.001)
+                continue
+            return _page(selected, None, limit)
+        raise RuntimeError('TTS queue kept changing while it was read')
+
+
+def _tallied(key, status=None, language=None):
+    """Whether a tally key's (status, language) matches the filters."""
+    _, key_status, key_language = key.rsplit('|', 2)
+    return (status is None or key_status == str(status)) and (language is None or key_language == language)
+
+
+def _write_text(path, *parts):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as fh:
+        for part in parts:
+            fh.write(part)
+    os.replace(tmp, path)
+
+
+# ------------------------
+# SQLite
+# ------------------------
+
+class SqliteBackend(QueueBackend):
+    name = 'sqlite'
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._migrate(conn)
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            self._local.conn = conn
+        return conn
+
+    def _migrate(self, conn):
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS tts_jobs (key TEXT PRIMARY KEY, pos INTEGER NOT NULL, job TEXT NOT NULL, '
+            'session REAL, idx REAL, status TEXT, language TEXT)'
+        )
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(tts_jobs)')}
+        if 'session' not in columns:
+            # queues created before the status columns existed
+            for column in ('session REAL', 'idx REAL', 'status TEXT', 'language TEXT'):
+                conn.execute(f'ALTER TABLE tts_jobs ADD COLUMN {column}')
+            rows = conn.execute('SELECT key, job FROM tts_jobs').fetchall()
+            conn.executemany(
+                'UPDATE tts_jobs SET session = ?, idx = ?, status = ?, language = ? WHERE key = ?',
+                [(*self._columns(json.loads(job)), key) for key, job in rows],
+            )
+        conn.execute('CREATE INDEX IF NOT EXISTS tts_jobs_pos ON tts_jobs (pos)')
+        conn.execute('CREATE INDEX IF NOT EXISTS tts_jobs_order ON tts_jobs (session, idx)')
+        conn.execute('CREATE TABLE IF NOT EXISTS tts_counts (key TEXT PRIMARY KEY, n INTEGER NOT NULL)')
+        if conn.execute('SELECT 1 FROM tts_counts LIMIT 1').fetchone() is None:
+            jobs = [json.loads(job) for (job,) in conn.execute('SELECT job FROM tts_jobs')]
+            conn.executemany('INSERT INTO tts_counts (key, n) VALUES (?, ?)', _tally(jobs).items())
+
+    @staticmethod
+    def _columns(job):
+        session, index = _order(job)
+        return session, index, job.get('status'), job.get('language') or 'en'
+
+    def read(self):
+        rows = self._connection().execute('SELECT job FROM tts_jobs ORDER BY pos')
+        return [json.loads(job) for (job,) in rows]
+
+    def update(self, update_fn):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            old = {key: (pos, job) for key, pos, job in conn.execute('SELECT key, pos, job FROM tts_jobs ORDER BY pos')}
+            jobs = [json.loads(job) for _, job in old.values()]
+            new_jobs = _apply(update_fn, jobs)
+            upserts, deletes, delta = _diff(old, new_jobs)
+            conn.executemany('DELETE FROM tts_jobs WHERE key = ?', [(key,) for key in deletes])
+            conn.executemany(
+                'INSERT OR REPLACE INTO tts_jobs (key, pos, job, session, idx, status, language) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [(key, pos, text, *self._columns(job)) for key, pos, text, job in upserts],
+            )
+            conn.executemany(
+                'INSERT INTO tts_counts (key, n) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET n = n + excluded.n',
+                delta.items(),
+            )
+            conn.execute('DELETE FROM tts_counts WHERE n <= 0')
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return new_jobs
+
+    def counts(self):
+        return dict(self._connection().execute('SELECT key, n FROM tts_counts'))
+
+    def page(self, cursor=None, limit=50, session=None, status=None, language=None):
+        where, args = [], []
+        if cursor:
+            after_session, after_index = parse_cursor(cursor)
+            where.append('(session < ? OR (session = ? AND idx < ?))')
+            args += [after_session, after_session, after_index]
+        for column, value in (('session', session), ('status', status), ('language', language)):
+            if value is not None:
+                where.append(f'{column} = ?')
+                args.append(_number(value) if column == 'session' else value)
+        sql = 'SELECT job FROM tts_jobs'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY session DESC, idx DESC LIMIT ?'
+        rows = self._connection().execute(sql, args + [limit + 1]).fetchall()
+        jobs = [json.loads(job) for (job,) in rows]
+        return jobs[:limit], job_key(jobs[limit - 1]) if len(jobs) > limit else None
+
+
+# ------------------------
+# Redis protocol
+# ------------------------
+
+class RespError(Exception):
+    pass
+
+
+class RespConnection:
+    """Just enough of a Redis-protocol (RESP2) client for the queue: one socket, blocking calls."""
+
+    def __init__(self, url, timeout=10):
+        parsed = urlparse(url)
+        self.address = (parsed.hostname or 'localhost', parsed.port or 6379)
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.username = unquote(parsed.username) if parsed.username else None
+        self.db = int(parsed.path.strip('/') or 0)
+        self.timeout = timeout
+        self.sock = None
+
+    def _connect(self):
+        self.sock = socket.create_connection(self.address, timeout=self.timeout)
+        self.reader = self.sock.makefile('rb')
+        if self.password:
+            self.call('AUTH', *([self.username] if self.username else []), self.password)
+        if self.db:
+            self.call('SELECT', self.db)
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def send(self, *args):
+        if self.sock is None:
+            self._connect()
+        out = [f'*{len(args)}\r\n'.encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            out.append(b'$%d\r\n%s\r\n' % (len(data), data))
+        self.sock.sendall(b''.join(out))
+
+    def receive(self):
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError('Redis connection closed')
+        kind, rest = line[:1], line[1:-2]
+        if kind == b'+':
+            return rest.decode()
+        if kind == b'-':
+            raise RespError(rest.decode())
+        if kind == b':':
+            return int(rest)
+        if kind == b'$':
+            size = int(rest)
+            return None if size < 0 else self.reader.read(size + 2)[:-2].decode()
+        if kind == b'*':
+            size = int(rest)
+            return None if size < 0 else [self.receive() for _ in range(size)]
+        raise RespError(f'Unexpected reply {line!r}')
+
+    def call(self, *args):
+        try:
+            self.send(*args)
+            return self.receive()
+        except (OSError, ConnectionError):
+            self.close()
+            raise
+
+
+class RedisBackend(QueueBackend):
+    name = 'redis'
+
+    # pages are ordered by session * ORDER_SPAN + index (a float score stays exact for unix-time sessions)
+    ORDER_SPAN = 10000
+    PAGE_BATCH = 200
+    PAGE_MAX_SCAN = 5000
+
+    def __init__(self, url, prefix='tts_queue', retries=50):
+        self.url = url
+        self.jobs_key = f'{prefix}:jobs'
+        self.order_key = f'{prefix}:order'
+        self.by_session_key = f'{prefix}:by_session'
+        self.counts_key = f'{prefix}:counts'
+        self.retries = retries
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = RespConnection(self.url)
+        return conn
+
+    @staticmethod
+    def _pairs(flat):
+        return dict(zip(flat[::2], flat[1::2]))
+
+    def _score(self, order):
+        session, index = order
+        return session * self.ORDER_SPAN + index
+
+    def _snapshot(self, conn):
+        order = self._pairs(conn.call('ZRANGE', self.order_key, 0, -1, 'WITHSCORES'))
+        jobs = self._pairs(conn.call('HGETALL', self.jobs_key))
+        return {key: (int(float(pos)), jobs[key]) for key, pos in order.items() if key in jobs}
+
+    def _transaction(self, conn, commands):
+        """Run commands in MULTI / EXEC; False when a WATCHed key changed."""
+        conn.call('MULTI')
+        try:
+            for command in commands:
+                conn.call(*command)
+        except RespError:
+            conn.call('DISCARD')
+            raise
+        return conn.call('EXEC') is not None
+
+    def read(self):
+        conn = self._connection()
+        # one transaction, so the order and the jobs are from the same moment
+        conn.call('MULTI')
+        conn.call('ZRANGE', self.order_key, 0, -1)
+        conn.call('HGETALL', self.jobs_key)
+        keys, flat = conn.call('EXEC')
+        jobs = self._pairs(flat)
+        return [json.loads(jobs[key]) for key in keys if key in jobs]
+
+    def _index_commands(self, old, new_jobs, upserts, deletes, delta, indexed):
+        """Commands keeping the counts and the (session, index) order in step with an update."""
+        if not indexed:
+            # first update since the counts existed: build them (and the order) from the whole queue
+            keyed = list(_keyed(new_jobs))
+            commands = [('DEL', self.counts_key, self.by_session_key)]
+            counts = _tally(new_jobs)
+            if counts:
+                commands.append(('HSET', self.counts_key, *[v for item in counts.items() for v in item]))
+            if keyed:
+                commands.append(('ZADD', self.by_session_key,
+                                 *[v for key, job in keyed for v in (self._score(_order(job)), key)]))
+            return commands
+        commands = [('HINCRBY', self.counts_key, key, n) for key, n in delta.items()]
+        added = [(key, job) for key, _, _, job in upserts if key not in old]
+        if added:
+            commands.append(('ZADD', self.by_session_key,
+                             *[v for key, job in added for v in (self._score(_order(job)), key)]))
+        if deletes:
+            commands.append(('ZREM', self.by_session_key, *deletes))
+        return commands
+
+    def update(self, update_fn):
+        conn = self._connection()
+        for attempt in range(self.retries):
+            conn.call('WATCH', self.order_key, self.jobs_key, self.counts_key)
+            try:
+                old = self._snapshot(conn)
+                indexed = not old or conn.call('EXISTS', self.counts_key) == 1
+                jobs = [json.loads(job) for _, job in sorted(old.values(), key=lambda item: item[0])]
+                new_jobs = _apply(update_fn, jobs)
+            except BaseException:
+                conn.call('UNWATCH')
+                raise
+            upserts, deletes, delta = _diff(old, new_jobs)
+            commands = []
+            if deletes:
+                commands += [('HDEL', self.jobs_key, *deletes), ('ZREM', self.order_key, *deletes)]
+            if upserts:
+                commands.append(('HSET', self.jobs_key, *[v for key, _, text, _ in upserts for v in (key, text)]))
+                commands.append(('ZADD', self.order_key, *[v for key, pos, _, _ in upserts for v in (pos, key)]))
+            if commands or not indexed:
+                commands += self._index_commands(old, new_jobs, upserts, deletes, delta, indexed)
+            if not commands:
+                conn.call('UNWATCH')
+                return new_jobs
+            if self._transaction(conn, commands):
+                return new_jobs
+            time.sleep(min(0.05, 0.001 * (attempt + 1)))
+        raise RuntimeError('TTS queue kept changing during the update')
+
+    def _ensure_indexed(self, conn):
+        if conn.call('EXISTS', self.counts_key) == 0 and conn.call('EXISTS', self.order_key) == 1:
+            self.update(lambda q: None)
+
+    def counts(self):
+        conn = self._connection()
+        self._ensure_indexed(conn)
+        return {key: int(n) for key, n in self._pairs(conn.call('HGETALL', self.counts_key)).items() if int(n) > 0}
+
+    def page(self, cursor=None, limit=50, session=None, status=None, language=None):
+        """Walks the (session, index) order in batches, filtering by status / language here.
+
+        A scan stops after PAGE_MAX_SCAN jobs; the page may then be short, with a cursor to go on.
+        """
+        conn = self._connection()
+        self._ensure_indexed(conn)
+        high, low = '+inf', '-inf'
+        if session is not None:
+            base = self._score((_number(session), 0))
+            high, low = base + self.ORDER_SPAN - 1, base
+        if cursor:
+            after = self._score(parse_cursor(cursor))
+            high = f'({after}' if high == '+inf' or after <= float(high) else high
+        found, scanned, last = [], 0, None
+        while len(found) <= limit and scanned < self.PAGE_MAX_SCAN:
+            flat = conn.call('ZREVRANGEBYSCORE', self.by_session_key, high, low, 'WITHSCORES', 'LIMIT', 0, self.PAGE_BATCH)
+            if not flat:
+                last = None
+                break
+            keys, scores = flat[::2], flat[1::2]
+            texts = conn.call('HMGET', self.jobs_key, *keys)
+            for key, text in zip(keys, texts):
+                if text is None:
+                    continue
+                job = json.loads(text)
+                if _matches(job, status=status, language=language):
+                    found.append(job)
+            scanned += len(keys)
+            last = keys[-1]
+            high = f'({scores[-1]}'
+            if len(keys) < self.PAGE_BATCH:
+                last = None
+                break
+        if len(found) > limit:
+            return found[:limit], job_key(found[limit - 1])
+        return found, last
+
+
+def create_backend(name, url=None, media_root=None):
+    """The queue backend for TTS_QUEUE_BACKEND ``name``; ``url`` defaults to a file under ``media_root``."""
+    if name == 'json':
+        return JsonFileBackend(url or os.path.join(media_root, 'tts_queue.json'))
+    if name == 'sqlite':
+        return SqliteBackend(url or os.path.join(media_root, 'tts_queue.sqlite3'))
+    if name == 'redis':
+        return RedisBackend(url or 'redis://localhost:6379/0')
+    raise ValueError(f'Unknown TTS_QUEUE_BACKEND {name!r} (json, sqlite or redis)')
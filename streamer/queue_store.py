@@ -0,0 +1,170 @@
+"""Queues shared by the web app, the worker and maintenance jobs.
+
+- MEDIA_ROOT/tiktok_reply_queue.json: the comment window and the reply audio queue
+- the TTS queue: live commentary chunks for the background TTS worker, in
+  the backend chosen by TTS_QUEUE_BACKEND (JSON file, SQLite or Redis; see
+  streamer.queue_backends)
+
+Every JSON file write goes through a temp file + os.replace so readers
+never see a partial file.
+"""
+
+import os
+import json
+import time
+
+from django.conf import settings
+
+from .filelock import locked
+from .queue_backends import create_backend
+
+QUEUE_FILE = os.path.join(settings.MEDIA_ROOT, 'tiktok_reply_queue.json')
+
+
+# ------------------------
+# Simple file lock helpers
+# ------------------------
+
+def _read_queue():
+    _ensure_queue()
+    with open(QUEUE_FILE, 'r', encoding='utf-8') as fh:
+        return json.load(fh)
+
+
+def _write_queue(q):
+    tmp = QUEUE_FILE + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as fh:
+        json.dump(q, fh)
+    os.replace(tmp, QUEUE_FILE)
+
+
+def atomic_update_queue(update_fn, retries=5, backoff=0.05):
+    """
+    Atomically read/modify/write the queue file by applying update_fn on the
+    current queue dict. Retries a few times to reduce race conditions.
+    update_fn should return the modified queue dict.
+    """
+    for _ in range(retries):
+        try:
+            _ensure_queue()
+            # replies are claimed through this (SSE streams, /replies/next/): one writer at a time
+            with locked(QUEUE_FILE):
+                with open(QUEUE_FILE, 'r', encoding='utf-8') as fh:
+                    q = json.load(fh)
+                new_q = update_fn(q) or q
+                _write_queue(new_q)
+            return new_q
+        except Exception:
+            time.sleep(backoff)
+    raise RuntimeError('Failed to update queue after retries')
+
+
+# ------------------------
+# Queue helpers (atomic with lock)
+# ------------------------
+
+def _ensure_queue():
+    if not os.path.isdir(settings.MEDIA_ROOT):
+        os.makedirs(settings.MEDIA_ROOT, exist_ok=True)
+
+    if not os.path.exists(QUEUE_FILE):
+        with open(QUEUE_FILE, 'w', encoding='utf-8') as fh:
+            json.dump({
+                'window_start': 0,
+                'comments': [],
+                'audio_queue': []
+            }, fh)
+
+
+# ------------------------
+# TTS QUEUE (pluggable backend, see streamer.queue_backends)
+# ------------------------
+TTS_QUEUE_FILE = os.path.join(settings.MEDIA_ROOT, 'tts_queue.json')
+TTS_QUEUE_BACKEND = getattr(settings, 'TTS_QUEUE_BACKEND', 'json')
+TTS_QUEUE_URL = getattr(settings, 'TTS_QUEUE_URL', '') or None
+
+_TTS_BACKEND = {}
+
+
+def tts_backend():
+    """The configured TTS queue backend (one per process)."""
+    if 'backend' not in _TTS_BACKEND:
+        _TTS_BACKEND['backend'] = create_backend(TTS_QUEUE_BACKEND, TTS_QUEUE_URL, str(settings.MEDIA_ROOT))
+    return _TTS_BACKEND['backend']
+
+
+def use_tts_backend(backend):
+    """Switch this process to another backend (benchmarks, migration)."""
+    _TTS_BACKEND['backend'] = backend
+
+
+def _read_tts_queue():
+    return tts_backend().read()
+
+
+def _write_tts_queue(q):
+    tts_backend().write(q)
+
+
+def atomic_update_tts_queue(update_fn, retries=5, backoff=0.05):
+    """
+    Atomically read / modify / write the tts queue through the configured backend.
+    update_fn should accept the current queue (list) and return the modified queue.
+    """
+    for _ in range(retries):
+        try:
+            return tts_backend().update(update_fn)
+        except Exception:
+            time.sleep(backoff)
+    raise RuntimeError('Failed to update tts queue after retries')
+
+
+def tts_counts():
+    """{'<session>|<status>|<language>': jobs}, kept up to date by every update (no full read)."""
+    return tts_backend().counts()
+
+
+def tts_page(cursor=None, limit=50, session=None, status=None, language=None):
+    """Jobs newest first by (session, index) after cursor: (jobs, next cursor or None)."""
+    return tts_backend().page(cursor, limit, session=session, status=status, language=language)
+
+
+def tts_session_jobs(session, batch=500):
+    """Every job of one session, in index order, read page by page."""
+    jobs, cursor = [], None
+    while True:
+        page, cursor = tts_page(cursor, batch, session=session)
+        jobs += page
+        if not cursor:
+            return jobs[::-1]
+
+
+def tts_active_jobs(counts=None):
+    """Jobs of the sessions with pending or processing work: all a capacity forecast looks at.
+
+    Finished sessions are never read, so this stays cheap however long the queue's history is.
+    """
+    counts = tts_counts() if counts is None else counts
+    active = set()
+    for key, n in counts.items():
+        session, status, _ = key.split('|', 2)
+        if n and status in ('pending', 'processing'):
+            active.add(session)
+    return [j for s in sorted(active, key=_session_order) for j in tts_session_jobs(s)]
+
+
+def _session_order(session):
+    try:
+        return float(session)
+    except ValueError:
+        return 0.0
+
+
+def job_session(job):
+    """Session id of a TTS job (supports legacy 'session_ts' items)."""
+    return job.get('session') if job.get('session') is not None else job.get('session_ts')
+
+
+def job_index(job):
+    """Chunk index of a TTS job (supports legacy 'idx' items)."""
+    return job.get('index') if job.get('index') is not None else job.get('idx')
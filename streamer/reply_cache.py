@@ -0,0 +1,181 @@
+"""Reply cache: reuse OpenAI short replies for near-identical comments.
+
+Live chat repeats itself ("hello from mexico", "what about gold today").
+Comments are keyed by language plus a normalized form: lowercased,
+accents, emoji and punctuation stripped, stretched letters squeezed
+("helloooo") and stopwords dropped. Numbers are kept, so "gold 2300"
+and "gold 2400" get different replies. Each key holds up to
+REPLY_CACHE_VARIANTS generated replies. Until a key has that many, it
+counts as a miss and the new reply becomes another variant. After that,
+hits rotate through the variants.
+
+The commenter's name is stored as a ``{user}`` placeholder and filled in at
+speak time, so a cached reply still addresses the right person.
+
+The cache lives in MEDIA_ROOT/reply_cache.json, shared by all web
+processes. A reply window loads it once and saves it once under a file
+lock. Variants expire after REPLY_CACHE_TTL seconds, and the least
+recently used keys are evicted beyond REPLY_CACHE_MAX_KEYS.
+"""
+
+import os
+import re
+import json
+import time
+import unicodedata
+
+from django.conf import settings
+
+from . import metrics
+from .filelock import locked
+
+REPLY_CACHE_FILE = os.path.join(settings.MEDIA_ROOT, 'reply_cache.json')
+REPLY_CACHE_ENABLED = os.environ.get('REPLY_CACHE_ENABLED', '1') == '1'
+REPLY_CACHE_TTL = int(os.environ.get('REPLY_CACHE_TTL', str(6 * 3600)))
+REPLY_CACHE_VARIANTS = int(os.environ.get('REPLY_CACHE_VARIANTS', '3'))
+REPLY_CACHE_MAX_KEYS = int(os.environ.get('REPLY_CACHE_MAX_KEYS', '1000'))
+
+USER_PLACEHOLDER = '{user}'
+
+STOPWORDS = {
+    'en': {
+        'a', 'an', 'the', 'is', 'are', 'am', 'was', 'be', 'to', 'of', 'and', 'or', 'so', 'just', 'please',
+        'i', 'im', 'me', 'my', 'you', 'your', 'u', 'ur', 'we', 'it', 'its', 'this', 'that', 'there',
+        'do', 'does', 'did', 'for', 'on', 'in', 'at', 'with', 'bro', 'guys', 'man', 'pls', 'plz',
+    },
+    'es': {
+        'el', 'la', 'los', 'las', 'un', 'una', 'unos', 'unas', 'de', 'del', 'al', 'y', 'o', 'a', 'en',
+        'que', 'es', 'son', 'me', 'mi', 'te', 'tu', 'se', 'lo', 'por', 'para', 'con', 'muy',
+        'yo', 'usted', 'amigo', 'amiga', 'hermano', 'bro', 'porfa', 'favor',
+    },
+}
+
+_NON_WORD_RE = re.compile(r'[^\w\s]|_', flags=re.UNICODE)
+# letters only: '1000' and '10' are different prices
+_STRETCH_RE = re.compile(r'([^\W\d_])\1{2,}', flags=re.UNICODE)
+
+
+def normalize(text, language='en'):
+    """Canonical form of a comment; '' when nothing meaningful is left."""
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    text = _NON_WORD_RE.sub(' ', text)
+    text = _STRETCH_RE.sub(r'\1', text)
+    stopwords = STOPWORDS.get(language, STOPWORDS['en'])
+    words = []
+    for word in text.split():
+        if word in stopwords or (words and words[-1] == word):
+            continue
+        words.append(word)
+    return ' '.join(words)
+
+
+def cache_key(language, comment):
+    normalized = normalize(comment, language)
+    return f'{language}:{normalized}' if normalized else None
+
+
+def make_template(reply, user):
+    """Replace the commenter's name in a reply with the placeholder."""
+    names = {user, re.sub(r'\d', '', user).strip()}
+    for name in sorted((n for n in names if n), key=len, reverse=True):
+        reply = re.sub(rf'(?<!\w){re.escape(name)}(?!\w)', USER_PLACEHOLDER, reply, flags=re.IGNORECASE)
+    return reply
+
+
+def render(template, user):
+    return template.replace(USER_PLACEHOLDER, user)
+
+
+def _read():
+    try:
+        with open(REPLY_CACHE_FILE, 'r', encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {'keys': {}, 'hits': 0, 'misses': 0}
+
+
+def _live_variants(entry, now):
+    return [v for v in entry.get('variants', []) if now - v.get('at', 0) < REPLY_CACHE_TTL]
+
+
+class ReplyCache:
+    """One reply window's view of the shared cache: load(), lookup()/store(), save()."""
+
+    def __init__(self, data=None):
+        data = data or {'keys': {}}
+        self.keys = data.get('keys', {})
+        self.changed = {}
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls):
+        return cls(_read() if REPLY_CACHE_ENABLED else None)
+
+    def lookup(self, key, user):
+        """A cached reply for ``user``, or None when the key needs another generated variant."""
+        if not REPLY_CACHE_ENABLED or key is None:
+            return None
+        now = time.time()
+        entry = self.keys.get(key)
+        variants = _live_variants(entry, now) if entry else []
+        if len(variants) < REPLY_CACHE_VARIANTS:
+            self.misses += 1
+            metrics.inc('reply_cache_lookups_total', result='miss')
+            return None
+        turn = entry.get('next', 0) % len(variants)
+        entry.update(variants=variants, next=turn + 1, used=now)
+        self.changed[key] = entry
+        self.hits += 1
+        metrics.inc('reply_cache_lookups_total', result='hit')
+        return render(variants[turn]['text'], user)
+
+    def store(self, key, reply, user):
+        if not REPLY_CACHE_ENABLED or key is None or not reply:
+            return
+        now = time.time()
+        entry = self.keys.setdefault(key, {'variants': [], 'next': 0})
+        template = make_template(reply, user)
+        variants = _live_variants(entry, now)
+        if all(v['text'] != template for v in variants):
+            variants.append({'text': template, 'at': now})
+        entry.update(variants=variants[-REPLY_CACHE_VARIANTS:], used=now)
+        self.changed[key] = entry
+
+    def save(self):
+        """Merge this window's changes into the shared file and prune it."""
+        if not REPLY_CACHE_ENABLED or not (self.changed or self.hits or self.misses):
+            return
+        now = time.time()
+        with locked(REPLY_CACHE_FILE):
+            data = _read()
+            keys = data.get('keys', {})
+            keys.update(self.changed)
+            keys = {k: e for k, e in keys.items() if _live_variants(e, now)}
+            if len(keys) > REPLY_CACHE_MAX_KEYS:
+                recent = sorted(keys, key=lambda k: keys[k].get('used', 0), reverse=True)[:REPLY_CACHE_MAX_KEYS]
+                keys = {k: keys[k] for k in recent}
+            data.update(
+                keys=keys,
+                hits=data.get('hits', 0) + self.hits,
+                misses=data.get('misses', 0) + self.misses,
+            )
+            tmp = REPLY_CACHE_FILE + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as fh:
+                json.dump(data, fh)
+            os.replace(tmp, REPLY_CACHE_FILE)
+        self.changed = {}
+        self.hits = self.misses = 0
+
+
+def stats():
+    """Totals since the cache file was created (for the status endpoint)."""
+    data = _read()
+    lookups = data.get('hits', 0) + data.get('misses', 0)
+    return {
+        'keys': len(data.get('keys', {})),
+        'hits': data.get('hits', 0),
+        'misses': data.get('misses', 0),
+        'hit_rate': round(data.get('hits', 0) / lookups, 3) if lookups else None,
+    }
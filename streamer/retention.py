@@ -0,0 +1,280 @@
+"""Retention: keep the hot queues and MEDIA_ROOT small on long-running installs.
+
+One retention pass does the following:
+
+1. Archive finished live sessions out of the TTS queue into
+   MEDIA_ROOT/archive/tts_queue_<YYYYMMDD>.jsonl.
+2. Compact tiktok_reply_queue.json. It drops stale comments and reply audio
+   entries that are too old or whose file is gone, and clears a dead window claim.
+3. Evict audio by age (MEDIA_MAX_AGE) and then by a disk-usage ceiling
+   (MEDIA_MAX_BYTES, oldest first). It never touches sessions that still have
+   queued work or were created within RETENTION_PIN_WINDOW, or replies still
+   waiting to be played. It also removes stale temp files.
+4. Delete span files older than TRACE_MAX_AGE (see streamer.tracing).
+
+Every pass returns a report with the bytes reclaimed. Run it with
+``python manage.py prune_media`` or let the worker run it every
+RETENTION_INTERVAL seconds.
+"""
+
+import os
+import json
+import time
+import logging
+from datetime import datetime
+
+from django.conf import settings
+
+from . import metrics
+from .audio import split_audio_name
+from .manifest import LIVE_RE, record_removed
+from .playlist import delete_playlists, drop_segment
+from .queue_store import _read_tts_queue, atomic_update_queue, atomic_update_tts_queue, job_session
+from .tracing import prune_traces
+
+logger = logging.getLogger(__name__)
+
+
+def parse_bytes(value):
+    """'500M' / '5G' / '1073741824' -> int bytes (0 disables the ceiling)."""
+    value = str(value or '0').strip().upper()
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+    if value and value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(float(value))
+
+
+ARCHIVE_DIR = os.path.join(settings.MEDIA_ROOT, 'archive')
+RETENTION_ARCHIVE_AFTER = int(os.environ.get('RETENTION_ARCHIVE_AFTER', '3600'))
+RETENTION_PIN_WINDOW = int(os.environ.get('RETENTION_PIN_WINDOW', str(6 * 3600)))
+RETENTION_INTERVAL = int(os.environ.get('RETENTION_INTERVAL', '600'))
+MEDIA_MAX_AGE = int(os.environ.get('MEDIA_MAX_AGE', str(7 * 24 * 3600)))
+MEDIA_MAX_BYTES = parse_bytes(os.environ.get('MEDIA_MAX_BYTES', '0'))
+REPLY_AUDIO_TTL = int(os.environ.get('REPLY_AUDIO_TTL', '3600'))
+COMMENT_TTL = int(os.environ.get('COMMENT_TTL', '900'))
+STALE_TMP_AGE = 3600
+
+# statuses after which a job needs no more work
+FINISHED_STATUSES = ('done', 'failed')
+
+
+# ------------------------
+# TTS queue archiving
+# ------------------------
+
+def _append_archive(jobs, now):
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    path = os.path.join(ARCHIVE_DIR, f"tts_queue_{datetime.utcfromtimestamp(now).strftime('%Y%m%d')}.jsonl")
+    with open(path, 'a', encoding='utf-8') as fh:
+        for job in jobs:
+            fh.write(json.dumps(dict(job, archived_at=int(now))) + '\n')
+
+
+def archive_finished_sessions(now=None, dry_run=False):
+    """Move sessions whose jobs are all finished (and idle for RETENTION_ARCHIVE_AFTER) out of the queue."""
+    now = now or time.time()
+    result = {'sessions': 0, 'jobs': 0, 'remaining_jobs': 0}
+
+    def updater(q):
+        by_session = {}
+        for j in q:
+            by_session.setdefault(job_session(j), []).append(j)
+
+        finished = set()
+        for sid, jobs in by_session.items():
+            if sid is None:
+                continue
+            if not all(j.get('status') in FINISHED_STATUSES for j in jobs):
+                continue
+            last_update = max(j.get('updated_at') or 0 for j in jobs)
+            if last_update <= now - RETENTION_ARCHIVE_AFTER:
+                finished.add(sid)
+
+        archived = [j for j in q if job_session(j) in finished]
+        kept = [j for j in q if job_session(j) not in finished]
+        result.update({'sessions': len(finished), 'jobs': len(archived), 'remaining_jobs': len(kept)})
+        if dry_run or not archived:
+            return q
+        # archive first: a retried update may duplicate archive lines but never loses jobs
+        _append_archive(archived, now)
+        return kept
+
+    atomic_update_tts_queue(updater)
+    return result
+
+
+# ------------------------
+# Reply queue compaction
+# ------------------------
+
+def compact_reply_queue(now=None, dry_run=False):
+    """Drop stale comments and reply audio entries; returns counts and the reply files still queued."""
+    now = now or time.time()
+    result = {'comments_dropped': 0, 'audio_dropped': 0, 'queued_replies': []}
+
+    def updater(q):
+        comments = q.get('comments', []) or []
+        fresh = [c for c in comments if now - (c.get('time') or 0) < COMMENT_TTL]
+
+        audio = q.get('audio_queue', []) or []
+        keep_audio = [
+            a for a in audio
+            if now - (a.get('created') or 0) < REPLY_AUDIO_TTL
+            and os.path.exists(os.path.join(settings.MEDIA_ROOT, a.get('filename', '')))
+        ]
+
+        result['comments_dropped'] = len(comments) - len(fresh)
+        result['audio_dropped'] = len(audio) - len(keep_audio)
+        result['queued_replies'] = [a['filename'] for a in keep_audio]
+        if dry_run:
+            return q
+
+        q['comments'] = fresh
+        q['audio_queue'] = keep_audio
+        if not fresh and not q.get('processing'):
+            q['window_start'] = 0
+        # a window claim older than the processing timeout is dead
+        if q.get('processing') and now - q['processing'] >= 120:
+            q.pop('processing', None)
+        return q
+
+    atomic_update_queue(updater)
+    if result['comments_dropped'] and not dry_run:
+        metrics.inc('tiktok_comments_dropped_total', result['comments_dropped'], reason='stale')
+    return result
+
+
+# ------------------------
+# Media eviction
+# ------------------------
+
+def _pinned_sessions(now):
+    """Sessions with unfinished jobs or created within RETENTION_PIN_WINDOW."""
+    pinned = set()
+    for j in _read_tts_queue():
+        sid = job_session(j)
+        if sid is not None and j.get('status') not in FINISHED_STATUSES:
+            pinned.add(str(sid))
+    return pinned
+
+
+def _scan_media(now):
+    """Group audio files by stem: stem -> {'paths': [...], 'size': int, 'mtime': float}; plus stale temp files."""
+    clips = {}
+    stale_tmp = []
+    with os.scandir(settings.MEDIA_ROOT) as it:
+        for de in it:
+            if not de.is_file():
+                continue
+            st = de.stat()
+            stem, _ = split_audio_name(de.name)
+            if de.name.endswith('.tmp') or (stem and stem.endswith('_tmp')):
+                if now - st.st_mtime > STALE_TMP_AGE:
+                    stale_tmp.append((de.path, st.st_size))
+                continue
+            if not stem:
+                continue
+            clip = clips.setdefault(stem, {'paths': [], 'size': 0, 'mtime': 0})
+            clip['paths'].append(de.path)
+            clip['size'] += st.st_size
+            clip['mtime'] = max(clip['mtime'], st.st_mtime)
+    return clips, stale_tmp
+
+
+def evict_media(now=None, dry_run=False, queued_replies=()):
+    """Evict audio clips by age and then by disk ceiling, skipping pinned sessions / queued replies."""
+    now = now or time.time()
+    result = {'files': 0, 'clips': 0, 'bytes_reclaimed': 0, 'bytes_in_use': 0, 'stale_tmp': 0}
+    if not os.path.isdir(settings.MEDIA_ROOT):
+        return result
+
+    pinned_sessions = _pinned_sessions(now)
+    queued_replies = {split_audio_name(fn)[0] for fn in queued_replies}
+    clips, stale_tmp = _scan_media(now)
+
+    def is_pinned(stem):
+        if stem in queued_replies:
+            return True
+        m = LIVE_RE.match(stem)
+        if not m:
+            return False
+        sid = m.group(1)
+        return sid in pinned_sessions or now - int(sid) < RETENTION_PIN_WINDOW
+
+    total = sum(c['size'] for c in clips.values())
+    candidates = sorted(
+        (stem for stem in clips if not is_pinned(stem)),
+        key=lambda stem: clips[stem]['mtime'],
+    )
+
+    evict = []
+    for stem in candidates:
+        clip = clips[stem]
+        too_old = MEDIA_MAX_AGE and now - clip['mtime'] > MEDIA_MAX_AGE
+        over_ceiling = MEDIA_MAX_BYTES and total > MEDIA_MAX_BYTES
+        if not (too_old or over_ceiling):
+            # candidates are oldest first: nothing newer is too old either
+            break
+        evict.append(stem)
+        total -= clip['size']
+
+    removed_files = []
+    touched_sessions = {}
+    for stem in evict:
+        clip = clips[stem]
+        for path in clip['paths']:
+            if not dry_run:
+                try:
+                    os.remove(path)
+                except OSError:
+                    logger.exception('Failed to evict %s', path)
+                    continue
+            removed_files.append(os.path.basename(path))
+        result['bytes_reclaimed'] += clip['size']
+        result['clips'] += 1
+        m = LIVE_RE.match(stem)
+        if m:
+            touched_sessions.setdefault(m.group(1), []).append(int(m.group(2)))
+
+    for path, size in stale_tmp:
+        if not dry_run:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+        result['stale_tmp'] += 1
+        result['bytes_reclaimed'] += size
+
+    result['files'] = len(removed_files)
+    result['bytes_in_use'] = total
+
+    if not dry_run and removed_files:
+        record_removed(removed_files)
+        remaining_sessions = {
+            LIVE_RE.match(stem).group(1)
+            for stem in clips
+            if stem not in evict and LIVE_RE.match(stem)
+        }
+        gone = [sid for sid in touched_sessions if sid not in remaining_sessions]
+        if gone:
+            delete_playlists(gone)
+        for sid, indexes in touched_sessions.items():
+            if sid in remaining_sessions:
+                for index in indexes:
+                    drop_segment(sid, index)
+
+    return result
+
+
+def run_retention(dry_run=False):
+    """Run every retention step and return a report (bytes reclaimed, items archived / dropped)."""
+    started = time.time()
+    report = {'dry_run': dry_run}
+    report['archive'] = archive_finished_sessions(started, dry_run=dry_run)
+    report['reply_queue'] = compact_reply_queue(started, dry_run=dry_run)
+    report['media'] = evict_media(started, dry_run=dry_run, queued_replies=report['reply_queue'].pop('queued_replies'))
+    report['bytes_reclaimed'] = report['media']['bytes_reclaimed']
+    report['trace_files_removed'] = prune_traces(started, dry_run=dry_run)
+    report['duration'] = round(time.time() - started, 3)
+    logger.info('Retention pass: %s', json.dumps(report))
+    return report
@@ -0,0 +1,475 @@
+"""Scheduled sessions: write and pre-synthesize a live ahead of its start time.
+
+A plan, added with ``python manage.py schedule_session add``, has a start
+time and a language. ``schedule_session run`` moves each plan through these
+states:
+
+    planned -> preparing -> ready -> live
+                                  \\-> expired (go live never pressed)
+
+- Prepare, SCHEDULE_PREPARE_LEAD seconds before the start: the commentary is
+  generated and chunked into the TTS queue under the plan's session id. The
+  first ``presynth`` chunks are pending jobs flagged ``stage``. Workers take
+  them only when no live job is waiting, and write the audio to
+  MEDIA_ROOT/staged/ instead of publishing it. The other chunks wait as
+  'scheduled' and are not claimable.
+- Refresh, SCHEDULE_REFRESH_LEAD seconds before the start: if the commentary
+  is older than SCHEDULE_REFRESH_AFTER, only the opening chunks (the
+  news-sensitive part) are rewritten and pre-synthesized again.
+- Release: ``go_live`` for the plan's language within SCHEDULE_MATCH_WINDOW
+  of the start moves the staged audio into MEDIA_ROOT. It publishes the audio
+  to the playlist and manifest and makes the remaining chunks pending, so
+  playback starts at once.
+- Expire: SCHEDULE_EXPIRE_AFTER seconds after the start without a go live,
+  the plan's jobs and staged audio are dropped.
+
+A plan left 'preparing' for SCHEDULE_PREPARE_TIMEOUT seconds (its scheduler
+crashed or was restarted mid-prepare) goes back to 'planned' and is
+prepared again by the next pass.
+
+Plans live in MEDIA_ROOT/schedule.json (locked read / modify / write).
+"""
+
+import os
+import json
+import time
+import uuid
+import logging
+
+from django.conf import settings
+
+from .audio import rendition_paths
+from .chunking import chunk_text, split_like
+from .commentary import _extract_output_text, _is_spanish, agenerate_commentary, prompt_for
+from .filelock import locked
+from .manifest import record_published
+from .openai_client import acreate_response, get_async_client
+from .playlist import add_segment, end_session
+from . import preprocess
+from .queue_store import _read_tts_queue, atomic_update_tts_queue, job_index, job_session
+from .retention import FINISHED_STATUSES
+from .tracing import new_trace_id, record_span, span
+from .tts_models import model_for
+from .wakeup import notify_workers
+
+logger = logging.getLogger(__name__)
+
+SCHEDULE_FILE = os.path.join(settings.MEDIA_ROOT, 'schedule.json')
+STAGED_DIR = os.path.join(settings.MEDIA_ROOT, 'staged')
+
+SCHEDULE_PREPARE_LEAD = int(os.environ.get('SCHEDULE_PREPARE_LEAD', str(45 * 60)))
+SCHEDULE_REFRESH_LEAD = int(os.environ.get('SCHEDULE_REFRESH_LEAD', str(10 * 60)))
+SCHEDULE_REFRESH_AFTER = int(os.environ.get('SCHEDULE_REFRESH_AFTER', str(30 * 60)))
+SCHEDULE_MATCH_WINDOW = int(os.environ.get('SCHEDULE_MATCH_WINDOW', str(60 * 60)))
+SCHEDULE_EXPIRE_AFTER = int(os.environ.get('SCHEDULE_EXPIRE_AFTER', str(2 * 3600)))
+SCHEDULE_PRESYNTH_CHUNKS = int(os.environ.get('SCHEDULE_PRESYNTH_CHUNKS', '3'))
+SCHEDULE_OPENING_CHUNKS = int(os.environ.get('SCHEDULE_OPENING_CHUNKS', '1'))
+# a plan still 'preparing' after this long lost its scheduler (crash, restart) and is prepared again
+SCHEDULE_PREPARE_TIMEOUT = int(os.environ.get('SCHEDULE_PREPARE_TIMEOUT', str(30 * 60)))
+
+OPEN_STATES = ('planned', 'preparing', 'ready')
+
+
+# ------------------------
+# Plan storage
+# ------------------------
+
+def _read():
+    try:
+        with open(SCHEDULE_FILE, 'r', encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return []
+
+
+def _update(update_fn):
+    with locked(SCHEDULE_FILE):
+        plans = _read()
+        plans = update_fn(plans)
+        tmp = SCHEDULE_FILE + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as fh:
+            json.dump(plans, fh, indent=2)
+        os.replace(tmp, SCHEDULE_FILE)
+    return plans
+
+
+def list_plans():
+    return sorted(_read(), key=lambda p: p['at'])
+
+
+def get_plan(plan_id):
+    return next((p for p in _read() if p['id'] == plan_id), None)
+
+
+def update_plan(plan_id, **fields):
+    def updater(plans):
+        for p in plans:
+            if p['id'] == plan_id:
+                p.update(fields)
+        return plans
+    _update(updater)
+    return get_plan(plan_id)
+
+
+def add_plan(at, language='en', parts=4, presynth=SCHEDULE_PRESYNTH_CHUNKS, mode=None):
+    """Plan a live at unix time ``at``; its session id is the start time."""
+    plan = {
+        'id': uuid.uuid4().hex[:8],
+        'at': int(at),
+        'session': int(at),
+        'language': language,
+        'parts': int(parts),
+        'presynth': int(presynth),
+        'mode': mode,
+        'state': 'planned',
+        'trace_id': new_trace_id(),
+        'created_at': time.time(),
+    }
+
+    def updater(plans):
+        if any(p['session'] == plan['session'] and p['state'] in OPEN_STATES for p in plans):
+            raise ValueError(f"a session is already planned at {plan['at']}")
+        return plans + [plan]
+
+    _update(updater)
+    return plan
+
+
+def cancel_plan(plan_id):
+    plan = get_plan(plan_id)
+    if plan and plan['state'] in OPEN_STATES:
+        _drop_session(plan)
+        plan = update_plan(plan_id, state='cancelled')
+    return plan
+
+
+# ------------------------
+# Staged audio
+# ------------------------
+
+def staged_stem(session, index, rev=0):
+    # the revision keeps audio of a refreshed opening apart from the superseded one
+    return f'live_{session}_{int(index):03d}_r{rev}'
+
+
+def staged_path(session, index, rev):
+    """WAV path the worker synthesizes a stage job to (renditions are encoded next to it)."""
+    os.makedirs(STAGED_DIR, exist_ok=True)
+    return os.path.join(STAGED_DIR, staged_stem(session, index, rev) + '.wav')
+
+
+def discard_staged(session, index, rev):
+    for path in rendition_paths(STAGED_DIR, staged_stem(session, index, rev)):
+        os.remove(path)
+
+
+def unstage(session, index, rev, staged_file):
+    """Move a staged chunk's renditions into MEDIA_ROOT; returns the preferred published name."""
+    stem = f'live_{session}_{int(index):03d}'
+    paths = rendition_paths(STAGED_DIR, staged_stem(session, index, rev))
+    if not paths:
+        raise FileNotFoundError(staged_file)
+    for path in paths:
+        os.replace(path, os.path.join(settings.MEDIA_ROOT, stem + os.path.splitext(path)[1]))
+    return stem + os.path.splitext(staged_file)[1]
+
+
+def stage_segment(session, index, rev, staged_file, duration=None):
+    """Called by the worker once a stage job's audio is in STAGED_DIR.
+
+    Returns 'staged' when the job is now held for its go live, 'publish' when
+    the session went live meanwhile (publish normally), or 'discard' when the
+    opening was refreshed since the job was claimed.
+    """
+    outcome = []
+
+    def updater(q):
+        del outcome[:]
+        for j in q:
+            if job_session(j) == session and job_index(j) == index:
+                if j.get('rev', 0) != rev or j.get('status') != 'processing':
+                    outcome.append('discard')
+                elif not j.get('stage'):
+                    outcome.append('publish')
+                else:
+                    j.update(status='staged', staged_file=staged_file, duration=duration)
+                    j.pop('lease_until', None)
+                    j['updated_at'] = int(time.time())
+                    outcome.append('staged')
+                break
+        return q
+
+    atomic_update_tts_queue(updater)
+    return outcome[0] if outcome else 'discard'
+
+
+# ------------------------
+# Lifecycle
+# ------------------------
+
+def _enqueue(plan, chunks):
+    session = plan['session']
+    now = time.time()
+    preps = [preprocess.prepare(text, plan['language']) for text in chunks]
+
+    def updater(q):
+        q = [j for j in q if job_session(j) != session]
+        for i, text in enumerate(chunks):
+            staged = i < plan['presynth']
+            q.append({
+                'session': session,
+                'index': i,
+                'text': text,
+                'prep': preps[i],
+                'language': plan['language'],
+                'status': 'pending' if staged else 'scheduled',
+                'stage': staged,
+                'rev': 0,
+                'created_at': now,
+                'trace_id': plan['trace_id'],
+            })
+        return q
+
+    atomic_update_tts_queue(updater)
+
+
+async def prepare(plan):
+    """Generate the commentary, queue it and let idle workers pre-synthesize the opening."""
+    update_plan(plan['id'], state='preparing', preparing_since=time.time())
+    try:
+        with span(plan['trace_id'], 'schedule.prepare', parts=plan['parts']) as attrs:
+            text = await agenerate_commentary(
+                get_async_client(),
+                os.environ.get('OPENAI_MODEL', 'gpt-5-mini'),
+                prompt_for(plan['language']),
+                int(os.environ.get('OPENAI_MAX_TOKENS', '16000')),
+                parts=plan['parts'],
+                mode=plan.get('mode'),
+                trace_id=plan['trace_id'],
+            )
+            chunks = chunk_text(text, model_for(plan['language']))
+            if not chunks:
+                raise ValueError('No content generated')
+            _enqueue(plan, chunks)
+            attrs['chunks'] = len(chunks)
+    except Exception as e:
+        logger.exception('Preparing scheduled session %s failed', plan['id'])
+        # back to planned: the next run retries while the start is still ahead
+        return update_plan(plan['id'], state='planned', error=f'{type(e).__name__}: {e}')
+    notify_workers()
+    return update_plan(plan['id'], state='ready', generated_at=time.time(), total_chunks=len(chunks), error=None)
+
+
+def _refresh_prompt(language, old, following, words):
+    base = prompt_for(language)
+    if _is_spanish(base):
+        return f"""{base}
+
+TAREA AHORA
+
+El guion de la transmision ya esta escrito
+Reescribe solo su apertura de unas {words} palabras con el contexto de mercado y los desarrollos mas recientes
+La apertura debe llevar con naturalidad al texto que sigue
+No uses las lineas de cierre
+
+Apertura actual
+{old}
+
+Texto que sigue
+{following}
+"""
+    return f"""{base}
+
+TASK NOW
+
+The broadcast script is already written
+Rewrite only its opening of about {words} words using the most recent market context and developments
+The opening must flow naturally into the text that follows
+Do not use the closing lines
+
+Current opening
+{old}
+
+Text that follows
+{following}
+"""
+
+
+async def refresh_opening(plan, opening=SCHEDULE_OPENING_CHUNKS):
+    """Rewrite the first ``opening`` chunks with fresh context and pre-synthesize them again."""
+    session = plan['session']
+    jobs = sorted((j for j in _session_jobs(session)), key=job_index)
+    head, rest = jobs[:opening], jobs[opening:opening + 1]
+    if not head:
+        return plan
+    old = ' '.join(j['text'] for j in head)
+    following = ' '.join(rest[0]['text'].split()[:150]) if rest else ''
+    words = len(old.split())
+
+    with span(plan['trace_id'], 'schedule.refresh', chunks=len(head)):
+        response = await acreate_response(
+            get_async_client(),
+            'commentary',
+            model=os.environ.get('OPENAI_MODEL', 'gpt-5-mini'),
+            input=[{'role': 'user', 'content': _refresh_prompt(plan['language'], old, following, words)}],
+            max_output_tokens=int(os.environ.get('OPENAI_MAX_TOKENS', '16000')),
+        )
+        text = _extract_output_text(response).strip()
+    if not text:
+        logger.warning('Opening refresh of %s returned no text; keeping the original', plan['id'])
+        return update_plan(plan['id'], refreshed_at=time.time())
+
+    # same number of chunks (and the same ramp), so indexes of the rest of the session stay valid
+    texts = split_like(text, [len(j['text'].split()) for j in head])
+    preps = [preprocess.prepare(t, plan['language']) if t else None for t in texts]
+    stale = []
+
+    def updater(q):
+        del stale[:]
+        for j in q:
+            if job_session(j) != session or job_index(j) >= len(head):
+                continue
+            if j.get('status') == 'staged':
+                stale.append((job_index(j), j.get('rev', 0)))
+            if texts[job_index(j)]:
+                j.update(text=texts[job_index(j)], prep=preps[job_index(j)])
+            j['rev'] = j.get('rev', 0) + 1
+            j.update(status='pending', stage=True, attempts=0, updated_at=int(time.time()))
+            j.pop('lease_until', None)
+            j.pop('staged_file', None)
+        return q
+
+    atomic_update_tts_queue(updater)
+    for index, rev in stale:
+        discard_staged(session, index, rev)
+    notify_workers()
+    return update_plan(plan['id'], refreshed_at=time.time(), generated_at=time.time())
+
+
+def _session_jobs(session):
+    return [j for j in _read_tts_queue() if job_session(j) == session]
+
+
+def _drop_session(plan):
+    session = plan['session']
+    dropped = []
+
+    def updater(q):
+        del dropped[:]
+        dropped.extend(j for j in q if job_session(j) == session)
+        return [j for j in q if job_session(j) != session]
+
+    atomic_update_tts_queue(updater)
+    for j in dropped:
+        discard_staged(session, job_index(j), j.get('rev', 0))
+
+
+def expire(plan):
+    _drop_session(plan)
+    record_span(plan['trace_id'], 'schedule.expire', time.time())
+    return update_plan(plan['id'], state='expired')
+
+
+def release(language, now=None):
+    """Start the prepared session for ``language`` near its start time; None when there is none.
+
+    Staged chunks are published right away; the rest become pending.
+    """
+    now = now or time.time()
+    chosen = []
+
+    def claim(plans):
+        candidates = [
+            p for p in plans
+            if p['state'] == 'ready' and p['language'] == language and abs(p['at'] - now) <= SCHEDULE_MATCH_WINDOW
+        ]
+        if candidates:
+            plan = min(candidates, key=lambda p: abs(p['at'] - now))
+            plan.update(state='live', live_at=now)
+            chosen.append(plan)
+        return plans
+
+    _update(claim)
+    if not chosen:
+        return None
+    plan = chosen[0]
+    session = plan['session']
+    staged = []
+
+    def start(q):
+        del staged[:]
+        for j in q:
+            if job_session(j) != session:
+                continue
+            if j.get('status') == 'staged':
+                staged.append(dict(j))
+            elif j.get('status') == 'scheduled':
+                j['status'] = 'pending'
+            # in-flight stage jobs publish normally from now on (see stage_segment)
+            j.pop('stage', None)
+        return q
+
+    atomic_update_tts_queue(start)
+
+    published = {}
+    for j in sorted(staged, key=job_index):
+        try:
+            filename = unstage(session, job_index(j), j.get('rev', 0), j['staged_file'])
+        except OSError:
+            logger.exception('Staged audio of %s/%s is missing; synthesizing it again', session, job_index(j))
+            continue
+        add_segment(session, job_index(j), filename, j.get('duration'))
+        record_published(filename, trace_ids=[plan['trace_id']])
+        published[job_index(j)] = filename
+
+    def finish(q):
+        for j in q:
+            if job_session(j) != session or j.get('status') != 'staged':
+                continue
+            if job_index(j) in published:
+                j['status'] = 'done'
+            else:
+                j.update(status='pending', attempts=0)
+            j.pop('staged_file', None)
+            j['updated_at'] = int(time.time())
+        return q
+
+    q = atomic_update_tts_queue(finish)
+    jobs = [j for j in q if job_session(j) == session]
+    if jobs and all(j.get('status') in FINISHED_STATUSES for j in jobs):
+        end_session(session)
+    notify_workers()
+    record_span(plan['trace_id'], 'schedule.release', now, staged=len(published))
+    return dict(plan, total_chunks=len(jobs), staged_chunks=len(published))
+
+
+async def run_due(now=None):
+    """One scheduler pass: prepare, refresh or expire whatever is due. Returns the actions taken."""
+    now = now or time.time()
+    actions = []
+    for plan in list_plans():
+        state, at = plan['state'], plan['at']
+        if state == 'preparing' and now - plan.get('preparing_since', 0) >= SCHEDULE_PREPARE_TIMEOUT:
+            # _enqueue replaces the session's jobs, so preparing again is safe
+            logger.warning('Scheduled session %s was stuck preparing; preparing it again', plan['id'])
+            update_plan(plan['id'], state='planned', error='preparation did not finish (scheduler stopped)')
+            actions.append(('reset', plan['id']))
+            state = 'planned'
+        if state in OPEN_STATES and now > at + SCHEDULE_EXPIRE_AFTER:
+            expire(plan)
+            actions.append(('expire', plan['id']))
+        elif state == 'planned' and now >= at - SCHEDULE_PREPARE_LEAD:
+            await prepare(plan)
+            actions.append(('prepare', plan['id']))
+        elif (
+            state == 'ready' and not plan.get('refreshed_at')
+            and at - SCHEDULE_REFRESH_LEAD <= now < at
+            and now - plan.get('generated_at', now) >= SCHEDULE_REFRESH_AFTER
+        ):
+            try:
+                await refresh_opening(plan)
+                actions.append(('refresh', plan['id']))
+            except Exception:
+                logger.exception('Refreshing the opening of %s failed; keeping the original', plan['id'])
+                update_plan(plan['id'], refreshed_at=time.time())
+    return actions
@@ -24,6 +24,10 @@ function playNext() {
   if (currentIndex >= audioQueue.length) {
     if (status) status.textContent = 'Live session finished.';
     if (goLiveBtn) goLiveBtn.disabled = false;
+    if (sse) {
+      try { sse.close(); } catch (e) {}
+      sse = null;
+    }
     return;
   }
 
@@ -32,11 +36,54 @@ function playNext() {
     player.play().catch(() => {});
     if (status) status.textContent = `Playing segment ${currentIndex + 1} / ${audioQueue.length}`;
     currentIndex++;
+    prebuffer(audioQueue[currentIndex]);
   } catch (e) {
     console.error('playNext failed', e);
   }
 }
 
+/** Start downloading the next segment while the current one plays */
+let prebufferEl = null;
+function prebuffer(url) {
+  if (!url) return;
+  if (!prebufferEl) {
+    prebufferEl = new Audio();
+    prebufferEl.preload = 'auto';
+    prebufferEl.muted = true;
+  }
+  if (prebufferEl.src !== url) {
+    prebufferEl.src = url;
+    prebufferEl.load();
+  }
+}
+
+/** Load a session playlist (segment urls with duration / size / start offset) */
+async function fetchPlaylist(url) {
+  if (!url) return null;
+  try {
+    const res = await fetch(url, { cache: 'no-cache' });
+    if (!res.ok) return null;
+    return await res.json();
+  } catch (e) {
+    return null;
+  }
+}
+
+/** Seek to an absolute position (seconds) within the currently loaded session playlist */
+let sessionPlaylist = null;
+function seekSession(seconds) {
+  if (!sessionPlaylist || !player) return;
+  const segs = sessionPlaylist.segments || [];
+  const i = segs.findIndex(s => seconds >= s.start && seconds < s.start + (s.duration || 0));
+  if (i < 0) return;
+  player.src = audioQueue[i];
+  currentIndex = i + 1;
+  const offset = seconds - segs[i].start;
+  player.addEventListener('loadedmetadata', () => { player.currentTime = offset; }, { once: true });
+  player.play().catch(() => {});
+  prebuffer(audioQueue[currentIndex]);
+}
+
 /** Fetch existing recordings and render */
 async function fetchRecordings() {
   if (!recordingsContainer) return;
@@ -80,14 +127,26 @@ function renderSessions(sessions) {
 
   // attach play-session handlers that play that session's files in index order
   document.querySelectorAll('.play-session').forEach(btn => {
-    btn.addEventListener('click', () => {
+    btn.addEventListener('click', async () => {
       const sId = btn.dataset.session;
       const sObj = sessions.find(x => String(x.session) === String(sId));
       if (!sObj) return;
 
+      // prefer the worker-maintained playlist; fall back to the listed files
+      const pl = await fetchPlaylist(sObj.playlist);
+      if (pl && pl.segments && pl.segments.length) {
+        sessionPlaylist = pl;
+        audioQueue = pl.segments.map(s => s.url);
+        currentIndex = 0;
+        playNext();
+        if (status) status.textContent = `Playing session ${sId} (${audioQueue.length} segments, ${Math.round(pl.total_duration || 0)}s)`;
+        return;
+      }
+      sessionPlaylist = null;
+
       const idxFromFn = (fn) => {
         try {
-          const m = fn.match(/_(\d+)\.(wav|mp3)$/);
+          const m = fn.match(/_(\d+)\.(wav|mp3|opus)$/);
           return m ? parseInt(m[1], 10) : 0;
         } catch (e) {
           return 0;
@@ -155,15 +214,24 @@ if (goLiveBtn) {
 
       const data = await res.json();
 
-      if (!res.ok || data.status !== 'queued' || !data.session) {
-        if (status) status.textContent = 'Error: ' + (data.error || 'Failed to queue live session');
+      if (!res.ok || (data.status !== 'queued' && data.status !== 'live') || !data.session) {
+        let message = 'Error: ' + (data.error || 'Failed to queue live session');
+        if (data.status === 'deferred' && data.retry_after) {
+          message += ` (try again in about ${Math.ceil(data.retry_after / 60)} min)`;
+        }
+        if (status) status.textContent = message;
         if (goLiveBtn) goLiveBtn.disabled = false;
         return;
       }
 
       const sessionId = data.session;
       const total = data.total_chunks || 0;
-      if (status) status.textContent = `Session queued. Waiting for generation...`;
+      if (status) {
+        const firstAt = data.eta && data.eta.first_chunk_at;
+        status.textContent = firstAt
+          ? `Session queued. First audio expected in about ${Math.max(0, Math.round(firstAt - Date.now() / 1000))}s...`
+          : `Session queued. Waiting for generation...`;
+      }
 
       // allow manual start via Start Now button
       let forceStart = false;
@@ -177,58 +245,82 @@ if (goLiveBtn) {
         startNowBtn.addEventListener('click', onStartNow);
       }
 
-      // poll recordings for this session until we have all segments or play as they arrive
+      // Track this session's chunks as they are published. Chunks arrive as SSE
+      // "chunk" events; browsers without EventSource fall back to polling
+      // /recordings/ with a since-cursor.
       let pollTimer = null;
+      let cursor = (data.cursor !== undefined) ? data.cursor : null;
+      let started = false;
+      const sessionFiles = new Map(); // filename -> file entry
+
+      const handleFiles = () => {
+        const found = { files: Array.from(sessionFiles.values()) };
+        const have = found.files.length;
+
+        if (total > 0) {
+          if (status && !started) status.textContent = `Generating audio ${have} / ${total}`;
+
+          if (have >= total && total > 0 && !started) {
+            started = true;
+            // build audio queue sorted by filename
+            const files = (found.files || []).sort((a,b) => a.filename.localeCompare(b.filename));
+            audioQueue = files.map(f => f.url);
+            if (status) status.textContent = `Starting live audio (1 / ${audioQueue.length})`;
+            fetchRecordings();
+            if (pollTimer) clearInterval(pollTimer);
+            playNext();
+          }
+        } else {
+          // total unknown: wait until a buffer threshold (e.g., 30) or manual start
+          if ((have >= 30 || forceStart) && audioQueue.length === 0) {
+            const files = (found.files || []).sort((a,b) => a.filename.localeCompare(b.filename));
+            audioQueue = files.map(f => f.url);
+            if (status) status.textContent = `Starting live audio (1 / ${audioQueue.length})`;
+            fetchRecordings();
+            if (pollTimer) clearInterval(pollTimer);
+            playNext();
+          } else if (have > 0 && audioQueue.length > 0) {
+            // append any newly generated files
+            const files = (found.files || []).sort((a,b) => a.filename.localeCompare(b.filename));
+            const urls = files.map(f => f.url);
+            for (const u of urls) {
+              if (!audioQueue.includes(u)) {
+                audioQueue.push(u);
+                if (status) status.textContent = `Received new audio (total ${audioQueue.length})`;
+              }
+            }
+          }
+        }
+      };
+
       const pollFn = async () => {
         try {
-          const r = await fetch('/recordings/');
+          const r = await fetch('/recordings/' + (cursor !== null ? `?since=${cursor}` : ''));
           const payload = await r.json();
+          if (payload.reset) sessionFiles.clear();
+          if (payload.cursor !== undefined) cursor = payload.cursor;
           const sessions = payload.sessions || [];
-          const found = sessions.find(s => String(s.session) === String(sessionId));
-          const have = (found && found.files && found.files.length) || 0;
-
-          if (total > 0) {
-            if (status) status.textContent = `Generating audio ${have} / ${total}`;
-
-            if (have >= total && total > 0) {
-              // build audio queue sorted by filename
-              const files = (found.files || []).sort((a,b) => a.filename.localeCompare(b.filename));
-              audioQueue = files.map(f => f.url);
-              if (status) status.textContent = `Starting live audio (1 / ${audioQueue.length})`;
-              fetchRecordings();
-              if (pollTimer) clearInterval(pollTimer);
-              playNext();
-            }
-          } else {
-            // total unknown: wait until a buffer threshold (e.g., 30) or manual start
-            if ((have >= 30 || forceStart) && audioQueue.length === 0) {
-              const files = (found.files || []).sort((a,b) => a.filename.localeCompare(b.filename));
-              audioQueue = files.map(f => f.url);
-              if (status) status.textContent = `Starting live audio (1 / ${audioQueue.length})`;
-              fetchRecordings();
-              if (pollTimer) clearInterval(pollTimer);
-              playNext();
-            } else if (have > 0 && audioQueue.length > 0) {
-              // append any newly generated files
-              const files = (found.files || []).sort((a,b) => a.filename.localeCompare(b.filename));
-              const urls = files.map(f => f.url);
-              for (const u of urls) {
-                if (!audioQueue.includes(u)) {
-                  audioQueue.push(u);
-                  if (status) status.textContent = `Received new audio (total ${audioQueue.length})`;
-                }
-              }
-            }
-          }
+          const delta = sessions.find(s => String(s.session) === String(sessionId));
+          for (const f of ((delta && delta.files) || [])) sessionFiles.set(f.filename, f);
+          handleFiles();
         } catch (err) {
           console.error('Polling recordings failed', err);
         }
       };
 
-      // start polling every 2 seconds
-      pollTimer = setInterval(pollFn, 2000);
-      // run immediately once
-      pollFn();
+      if (window.EventSource) {
+        sse = openEventStream(sessionId, cursor, (f) => {
+          sessionFiles.set(f.filename, f);
+          handleFiles();
+        }, pollFn);
+        // catch anything published between queueing and the stream opening
+        pollFn();
+      } else {
+        // start polling every 2 seconds
+        pollTimer = setInterval(pollFn, 2000);
+        // run immediately once
+        pollFn();
+      }
 
     } catch (err) {
       if (status) status.textContent = 'Request failed: ' + err;
@@ -245,23 +337,47 @@ let replyQueue = [];
 let isPlayingReply = false;
 let pausedComment = null; // { index, time }
 
+function enqueueReply(url) {
+  replyQueue.push(url);
+  if (status) status.textContent = `Queued live reply (${replyQueue.length} pending)`;
+  if (!isPlayingReply) startReplyPlayback();
+}
+
 async function pollForReplies() {
   // only poll while a live session is running (goLiveBtn.disabled === true)
   if (!goLiveBtn || goLiveBtn.disabled !== true) return;
+  // replies are pushed over the event stream when it is open
+  if (sse) return;
   try {
     const res = await fetch('/replies/next/');
     if (!res.ok) return;
     const data = await res.json();
-    if (data.found && data.url) {
-      replyQueue.push(data.url);
-      if (status) status.textContent = `Queued live reply (${replyQueue.length} pending)`;
-      if (!isPlayingReply) startReplyPlayback();
-    }
+    if (data.found && data.url) enqueueReply(data.url);
   } catch (err) {
     console.error('Reply poll failed', err);
   }
 }
 
+/** Open the /events/ stream: "chunk" events for sessionId, "reply" events for everyone.
+ *  EventSource reconnects on its own and resumes from Last-Event-ID. */
+function openEventStream(sessionId, since, onChunk, onReset) {
+  const params = new URLSearchParams({ session: String(sessionId) });
+  if (since !== null && since !== undefined) params.set('since', String(since));
+  const es = new EventSource('/events/?' + params.toString());
+  es.addEventListener('chunk', (ev) => {
+    try { onChunk(JSON.parse(ev.data)); } catch (e) { console.error('Bad chunk event', e); }
+  });
+  es.addEventListener('reply', (ev) => {
+    try { enqueueReply(JSON.parse(ev.data).url); } catch (e) { console.error('Bad reply event', e); }
+  });
+  es.addEventListener('reset', () => {
+    fetchRecordings();
+    if (onReset) onReset();
+  });
+  es.onerror = () => console.warn('Event stream interrupted; reconnecting');
+  return es;
+}
+
 async function startReplyPlayback() {
   if (!replyQueue.length) return;
 
@@ -0,0 +1,44 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from streamer.capacity import stall
+from streamer.chunking import CHUNK_MAX_AUDIO_SECONDS, CHUNK_MAX_SENTENCE_WORDS, SynthesisCost, chunk_text
+
+MODELS = ('tts_models/en/ljspeech/tacotron2-DDC', 'tts_models/es/css10/vits')
+
+
+@mock.patch('streamer.metrics.mean', return_value=None)
+class ChunkRampTests(SimpleTestCase):
+    """The first chunks ramp up to the cap without starving one worker."""
+
+    def texts(self):
+        sentence = ' '.join(['word'] * 14) + ' end.'
+        yield 'sentences', ' '.join([sentence] * 534)
+        # the prompts ask for unpunctuated text
+        yield 'run-on', ' '.join(['word'] * 8000)
+
+    def test_sizes_grow_to_cap(self, _mean):
+        for model in MODELS:
+            cost = SynthesisCost(model)
+            cap = cost.max_words(CHUNK_MAX_AUDIO_SECONDS)
+            for name, text in self.texts():
+                with self.subTest(model=model, text=name):
+                    sizes = [len(c.split()) for c in chunk_text(text, model)]
+                    ramp = sizes[:sizes.index(max(sizes)) + 1]
+                    self.assertEqual(ramp, sorted(ramp))
+                    self.assertLessEqual(max(sizes), cap)
+                    self.assertGreater(max(sizes), cap - CHUNK_MAX_SENTENCE_WORDS)
+                    self.assertLessEqual(len(ramp), 10)
+
+    def test_one_worker_keeps_up(self, _mean):
+        for model in MODELS:
+            cost = SynthesisCost(model)
+            for name, text in self.texts():
+                with self.subTest(model=model, text=name):
+                    ready, timeline = 0.0, []
+                    for chunk in chunk_text(text, model):
+                        words = len(chunk.split())
+                        ready += cost.synthesis_seconds(words)
+                        timeline.append((ready, cost.audio_seconds(words)))
+                    self.assertEqual(stall(timeline), 0)
@@ -0,0 +1,76 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from streamer import metrics
+
+KEY = metrics._key('openai_errors_total', {'call': 'short_reply'})
+
+
+class MetricsFileTests(SimpleTestCase):
+    """Per-process metrics files: folding of exited processes and totals that never go backwards."""
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        for patcher in (
+            mock.patch.object(metrics, 'METRICS_DIR', self.dir),
+            mock.patch.object(metrics, 'EXITED_FILE', os.path.join(self.dir, 'exited.json')),
+            mock.patch.dict(metrics._STATE, {'pid': None}),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def write(self, name, counters, age=0):
+        path = os.path.join(self.dir, name)
+        with open(path, 'w', encoding='utf-8') as fh:
+            json.dump({'counters': counters, 'histograms': {}}, fh)
+        if age:
+            os.utime(path, (time.time() - age, time.time() - age))
+        return path
+
+    def total(self):
+        counters, _ = metrics.collect()
+        return counters.get(KEY, 0)
+
+    def test_files_of_dead_and_stale_processes_are_folded(self):
+        child = subprocess.Popen([sys.executable, '-c', 'pass'])
+        child.wait()
+        dead = self.write(f'{socket.gethostname()}-{child.pid}-dead.json', {KEY: 2})
+        stale = self.write('otherhost-1-stale.json', {KEY: 3}, age=metrics.METRICS_STALE_AFTER + 60)
+        alive = self.write(f'{socket.gethostname()}-{os.getpid()}-alive.json', {KEY: 5})
+
+        self.assertEqual(self.total(), 10)
+        self.assertFalse(os.path.exists(dead))
+        self.assertFalse(os.path.exists(stale))
+        self.assertTrue(os.path.exists(alive))
+        self.assertEqual(self.total(), 10)
+
+    def test_fold_is_not_repeated_for_a_file_already_merged(self):
+        path = self.write('otherhost-1-a.json', {KEY: 4})
+        metrics._fold([path])
+        self.write('otherhost-1-a.json', {KEY: 4})  # left behind by a crash after exited.json was written
+        metrics._fold([path])
+        self.assertEqual(self.total(), 4)
+        self.assertFalse(os.path.exists(path))
+
+    def test_process_folded_while_alive_continues_without_double_counting(self):
+        metrics.inc('openai_errors_total', call='short_reply')
+        metrics.flush(force=True)
+        metrics._fold([metrics._STATE['file']])
+        metrics.inc('openai_errors_total', amount=2, call='short_reply')
+        metrics.flush(force=True)
+        self.assertEqual(self.total(), 3)
+
+    def test_exit_folds_own_file(self):
+        metrics.inc('openai_errors_total', call='short_reply')
+        path = metrics._STATE['file']
+        metrics._retire()
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(self.total(), 1)
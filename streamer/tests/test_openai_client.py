@@ -0,0 +1,97 @@
+import time
+from unittest import mock
+
+import openai
+from django.test import SimpleTestCase
+from openai import OpenAI
+
+from benchmarks.stub_openai import StubOpenAI
+from streamer import openai_client
+from streamer.openai_client import CircuitBreaker, OpenAIUnavailable, create_response
+
+
+class OpenAIClientTests(SimpleTestCase):
+    """Retries, deadlines and the circuit breaker against the local stub server."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stub = StubOpenAI(latency=0, reply_latency=0).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.stub.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.stub.error_rate = 0.0
+        self.stub.reply_latency = 0
+        self.stub.requests = 0
+        self.client = OpenAI(api_key='test', base_url=self.stub.base_url, max_retries=0)
+        self.breaker = CircuitBreaker(failures=2, reset_after=0.3)
+        for patcher in (
+            mock.patch.object(openai_client, 'breaker', self.breaker),
+            mock.patch.object(openai_client, 'OPENAI_RETRY_BASE', 0.01),
+            mock.patch.object(openai_client, 'OPENAI_MAX_RETRIES', 2),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def reply(self):
+        return create_response(self.client, 'short_reply', model='stub', input='hi', max_output_tokens=64)
+
+    def test_breaker_opens_half_opens_and_closes(self):
+        self.stub.error_rate = 1.0
+        for _ in range(2):
+            with self.assertRaises(OpenAIUnavailable):
+                self.reply()
+        self.assertEqual(self.breaker.state, 'open')
+
+        sent = self.stub.requests
+        with self.assertRaisesRegex(OpenAIUnavailable, 'breaker is open'):
+            self.reply()
+        self.assertEqual(self.stub.requests, sent)
+
+        time.sleep(0.35)
+        self.assertEqual(self.breaker.state, 'half_open')
+        self.stub.error_rate = 0.0
+        self.reply()
+        self.assertEqual(self.breaker.state, 'closed')
+
+    def test_half_open_lets_one_trial_through(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        time.sleep(0.35)
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+
+    def test_retry_after_is_honoured(self):
+        self.stub.fail_next(429, {'Retry-After': '0.4'})
+        started = time.monotonic()
+        self.reply()
+        self.assertGreaterEqual(time.monotonic() - started, 0.4)
+        self.assertEqual(self.stub.requests, 2)
+        self.assertEqual(self.breaker.state, 'closed')
+
+    def test_deadline_covers_every_attempt(self):
+        self.stub.reply_latency = 2
+        started = time.monotonic()
+        with mock.patch.dict(openai_client.DEADLINES, {'short_reply': 0.5}):
+            with self.assertRaises(OpenAIUnavailable):
+                self.reply()
+        self.assertLess(time.monotonic() - started, 1.5)
+
+    def test_non_retryable_errors_do_not_trip_the_breaker(self):
+        for _ in range(3):
+            self.stub.fail_next(400)
+            with self.assertRaises(openai.BadRequestError):
+                self.reply()
+        self.assertEqual(self.stub.requests, 3)
+        self.assertEqual(self.breaker.state, 'closed')
+
+    def test_commentary_deadline_scales_with_output_tokens(self):
+        self.assertGreater(
+            openai_client.deadline_for('commentary', 16000),
+            openai_client.deadline_for('commentary', 2000),
+        )
+        self.assertEqual(openai_client.deadline_for('short_reply', 16000), openai_client.OPENAI_REPLY_TIMEOUT)
@@ -0,0 +1,69 @@
+import json
+import os
+import tempfile
+
+from django.test import SimpleTestCase
+
+from streamer.queue_backends import create_backend, job_key
+
+
+def _job(session, index, status='pending', language='en'):
+    return {'session': session, 'index': index, 'status': status, 'language': language, 'text': f'chunk {index}'}
+
+
+class JsonFileBackendTests(SimpleTestCase):
+    """The session-file JSON backend: queue order, partial writes, counts, pages and migration."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.backend = create_backend('json', None, self.root)
+
+    def files(self):
+        return sorted(os.listdir(self.backend.sessions_dir))
+
+    def test_interleaved_sessions_keep_queue_order(self):
+        self.backend.update(lambda q: [_job(100, 0), _job(200, 0), _job(100, 1), {'text': 'legacy', 'status': 'pending'}])
+        self.assertEqual([job_key(j) for j in self.backend.read()], ['100:0', '200:0', '100:1', 'None:None'])
+
+    def test_update_writes_only_changed_sessions(self):
+        self.backend.update(lambda q: [_job(100, 0), _job(200, 0)])
+        before = self.files()
+        generation = self.backend.generation()
+
+        def finish(q):
+            q[1]['status'] = 'done'
+
+        self.backend.update(finish)
+        self.assertEqual(self.backend.generation(), generation + 1)
+        self.assertEqual([f for f in self.files() if f.startswith('100.')], [f for f in before if f.startswith('100.')])
+        self.assertNotEqual([f for f in self.files() if f.startswith('200.')], [f for f in before if f.startswith('200.')])
+        self.assertEqual(len(self.files()), 2)
+        self.assertEqual(self.backend.counts(), {'100|pending|en': 1, '200|done|en': 1})
+
+        self.backend.update(lambda q: q[:1])
+        self.assertEqual(len(self.files()), 1)
+        self.assertEqual(self.backend.counts(), {'100|pending|en': 1})
+
+    def test_pages_walk_newest_first_with_filters(self):
+        self.backend.update(lambda q: [_job(s, i, 'done' if i % 2 else 'pending') for s in (100, 200) for i in range(5)])
+
+        keys, cursor = [], None
+        while True:
+            page, cursor = self.backend.page(cursor=cursor, limit=3)
+            keys += [job_key(j) for j in page]
+            if not cursor:
+                break
+        self.assertEqual(keys, [f'{s}:{i}' for s in (200, 100) for i in range(4, -1, -1)])
+
+        page, cursor = self.backend.page(limit=10, session=100, status='done')
+        self.assertEqual([job_key(j) for j in page], ['100:3', '100:1'])
+        self.assertIsNone(cursor)
+
+    def test_legacy_queue_file_is_imported_once(self):
+        legacy = [_job(100, 0, 'done'), _job(100, 1)]
+        with open(os.path.join(self.root, 'tts_queue.json'), 'w', encoding='utf-8') as fh:
+            json.dump(legacy, fh)
+        self.assertEqual(self.backend.read(), legacy)
+        self.assertTrue(os.path.exists(os.path.join(self.root, 'tts_queue.json.migrated')))
+        self.assertFalse(os.path.exists(os.path.join(self.root, 'tts_queue.json')))
+        self.assertEqual(self.backend.counts(), {'100|done|en': 1, '100|pending|en': 1})
@@ -0,0 +1,116 @@
+import os
+import threading
+import uuid
+from unittest import SkipTest
+
+from django.test import SimpleTestCase
+
+from streamer.queue_backends import RedisBackend, RespConnection, job_key
+
+REDIS_URL = os.environ.get('TTS_TEST_REDIS_URL', 'redis://127.0.0.1:6379/0')
+
+
+def _job(session, index, status='pending', language='en'):
+    return {'session': session, 'index': index, 'status': status, 'language': language, 'text': f'chunk {index}'}
+
+
+class RedisBackendTests(SimpleTestCase):
+    """RedisBackend against a live server (TTS_TEST_REDIS_URL); skipped when none is reachable."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        conn = RespConnection(REDIS_URL, timeout=1)
+        try:
+            conn.call('PING')
+        except OSError as e:
+            raise SkipTest(f'no Redis at {REDIS_URL}: {e}')
+        finally:
+            conn.close()
+
+    def setUp(self):
+        self.prefix = f'tts_queue_test:{uuid.uuid4().hex}'
+        self.backend = RedisBackend(REDIS_URL, prefix=self.prefix)
+        self.addCleanup(self._drop)
+
+    def _drop(self):
+        conn = self.backend._connection()
+        conn.call('DEL', self.backend.jobs_key, self.backend.order_key,
+                  self.backend.by_session_key, self.backend.counts_key)
+        conn.close()
+
+    def fill(self, jobs):
+        self.backend.update(lambda q: q + jobs)
+
+    def test_update_keeps_order_and_applies_changes(self):
+        self.fill([_job(100, 0), _job(100, 1), _job(200, 0)])
+
+        def finish_first(q):
+            q[0]['status'] = 'done'
+            return [j for j in q if j['session'] != 200] + [_job(300, 0)]
+
+        self.backend.update(finish_first)
+        self.assertEqual([job_key(j) for j in self.backend.read()], ['100:0', '100:1', '300:0'])
+        self.assertEqual(self.backend.read()[0]['status'], 'done')
+
+    def test_concurrent_claims_take_each_job_once(self):
+        self.fill([_job(100, i) for i in range(20)])
+        claimed, lock = [], threading.Lock()
+
+        def claim(worker):
+            mine = []
+
+            def updater(q):
+                del mine[:]
+                for j in q:
+                    if j['status'] == 'pending':
+                        j.update(status='processing', worker_id=worker)
+                        mine.append(job_key(j))
+                        break
+                return q
+
+            while True:
+                self.backend.update(updater)
+                if not mine:
+                    return
+                with lock:
+                    claimed.extend(mine)
+
+        threads = [threading.Thread(target=claim, args=(f'w{n}',)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(sorted(claimed), sorted(f'100:{i}' for i in range(20)))
+        self.assertTrue(all(j['status'] == 'processing' for j in self.backend.read()))
+
+    def test_counts_follow_updates(self):
+        self.fill([_job(100, 0), _job(100, 1, language='es'), _job(200, 0, status='done')])
+        self.assertEqual(self.backend.counts(), {'100|pending|en': 1, '100|pending|es': 1, '200|done|en': 1})
+
+        def progress(q):
+            q[0]['status'] = 'done'
+            return q[:2]
+
+        self.backend.update(progress)
+        self.assertEqual(self.backend.counts(), {'100|done|en': 1, '100|pending|es': 1})
+
+    def test_counts_are_rebuilt_when_missing(self):
+        self.fill([_job(100, 0), _job(100, 1)])
+        self.backend._connection().call('DEL', self.backend.counts_key)
+        self.assertEqual(self.backend.counts(), {'100|pending|en': 2})
+
+    def test_pages_walk_newest_first_with_filters(self):
+        self.fill([_job(s, i, status='done' if i % 2 else 'pending') for s in (100, 200) for i in range(5)])
+
+        keys, cursor = [], None
+        while True:
+            page, cursor = self.backend.page(cursor=cursor, limit=3)
+            keys += [job_key(j) for j in page]
+            if not cursor:
+                break
+        self.assertEqual(keys, [f'{s}:{i}' for s in (200, 100) for i in range(4, -1, -1)])
+
+        page, cursor = self.backend.page(limit=10, session=100, status='done')
+        self.assertEqual([job_key(j) for j in page], ['100:3', '100:1'])
+        self.assertIsNone(cursor)
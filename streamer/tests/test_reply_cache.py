@@ -0,0 +1,13 @@
+from django.test import SimpleTestCase
+
+from streamer.reply_cache import cache_key, normalize
+
+
+class NormalizeTests(SimpleTestCase):
+    def test_near_identical_comments_share_a_key(self):
+        self.assertEqual(cache_key('en', 'Hellooo from MEXICO!!'), cache_key('en', 'hello from mexico'))
+
+    def test_numbers_stay_in_the_key(self):
+        self.assertEqual(normalize('Gold to 2300?'), 'gold 2300')
+        self.assertNotEqual(cache_key('en', 'gold 2300'), cache_key('en', 'gold 2400'))
+        self.assertNotEqual(cache_key('en', 'gold 1000'), cache_key('en', 'gold 10'))
@@ -0,0 +1,134 @@
+"""Lightweight tracing: where does the time of a chunk or a reply go?
+
+A trace id is created when a session goes live (``go_live``) or a comment is
+ingested (``tiktok_comment``). It travels with the queue item, the reply
+audio entry and the media manifest entry, and every stage records a timed
+span against it:
+
+    go_live -> openai.commentary [-> openai.outline -> openai.part x N -> commentary.dedupe]
+      -> chunking -> preprocess -> enqueue
+      -> queue_wait -> claim -> synthesis -> publish -> first_fetch
+    comment.ingest -> window_wait -> openai.short_reply -> reply.synthesis
+      -> reply.publish -> first_fetch
+
+Spans are appended as JSON lines to MEDIA_ROOT/traces/spans_<YYYYMMDD>.jsonl.
+Each line is written with a single O_APPEND write, so web and worker
+processes can share the file without a lock. ``python manage.py
+trace_summary`` renders them as a waterfall.
+
+Set TRACING_ENABLED=0 to turn recording off.
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+TRACES_DIR = os.path.join(settings.MEDIA_ROOT, 'traces')
+TRACING_ENABLED = os.environ.get('TRACING_ENABLED', '1') == '1'
+TRACE_MAX_AGE = int(os.environ.get('TRACE_MAX_AGE', str(3 * 24 * 3600)))
+
+_PROCESS = f'{socket.gethostname()}-{os.getpid()}'
+
+
+def new_trace_id():
+    return uuid.uuid4().hex[:16]
+
+
+def trace_file(ts=None):
+    day = datetime.utcfromtimestamp(ts or time.time()).strftime('%Y%m%d')
+    return os.path.join(TRACES_DIR, f'spans_{day}.jsonl')
+
+
+def record_span(trace_id, name, start, end=None, **attrs):
+    """Append one finished span. Never raises: tracing must not break the pipeline."""
+    if not TRACING_ENABLED or not trace_id:
+        return
+    end = time.time() if end is None else end
+    span = {
+        'trace_id': trace_id,
+        'span_id': uuid.uuid4().hex[:8],
+        'name': name,
+        'start': round(start, 6),
+        'end': round(end, 6),
+        'duration': round(end - start, 6),
+        'process': _PROCESS,
+    }
+    if attrs:
+        span['attrs'] = attrs
+    try:
+        os.makedirs(TRACES_DIR, exist_ok=True)
+        line = (json.dumps(span) + '\n').encode('utf-8')
+        fd = os.open(trace_file(start), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+    except OSError:
+        logger.exception('Failed to record span %s', name)
+
+
+@contextmanager
+def span(trace_id, name, **attrs):
+    """Time the body as one span; attrs may be extended through the yielded dict.
+
+    A span whose body raises is recorded with ``error`` set.
+    """
+    start = time.time()
+    try:
+        yield attrs
+    except Exception as e:
+        attrs['error'] = f'{type(e).__name__}: {e}'
+        raise
+    finally:
+        record_span(trace_id, name, start, **attrs)
+
+
+def read_spans(trace_id=None, since=None):
+    """All recorded spans (optionally one trace / newer than since), oldest first."""
+    spans = []
+    if not os.path.isdir(TRACES_DIR):
+        return spans
+    for fn in sorted(os.listdir(TRACES_DIR)):
+        if not (fn.startswith('spans_') and fn.endswith('.jsonl')):
+            continue
+        with open(os.path.join(TRACES_DIR, fn), 'r', encoding='utf-8') as fh:
+            for line in fh:
+                try:
+                    s = json.loads(line)
+                except ValueError:
+                    continue
+                if trace_id and s.get('trace_id') != trace_id:
+                    continue
+                if since and s.get('start', 0) < since:
+                    continue
+                spans.append(s)
+    spans.sort(key=lambda s: s['start'])
+    return spans
+
+
+def prune_traces(now=None, dry_run=False):
+    """Delete span files older than TRACE_MAX_AGE; returns the number removed."""
+    now = now or time.time()
+    removed = 0
+    if not os.path.isdir(TRACES_DIR):
+        return removed
+    for fn in os.listdir(TRACES_DIR):
+        path = os.path.join(TRACES_DIR, fn)
+        try:
+            if now - os.path.getmtime(path) <= TRACE_MAX_AGE:
+                continue
+            if not dry_run:
+                os.remove(path)
+            removed += 1
+        except OSError:
+            continue
+    return removed
@@ -0,0 +1,18 @@
+"""Coqui TTS model per language (web app, worker and chunker)."""
+
+import os
+
+TTS_MODELS = {
+    'en': 'tts_models/en/ljspeech/tacotron2-DDC',
+    'es': 'tts_models/es/css10/vits',
+}
+
+# cheaper model per language, used while synthesis falls behind real time (streamer.quality)
+FAST_TTS_MODELS = {
+    'en': 'tts_models/en/ljspeech/vits',
+}
+QUALITY_FAST_MODEL = os.environ.get('QUALITY_FAST_MODEL', '1') == '1'
+
+
+def model_for(language):
+    return TTS_MODELS.get(language, TTS_MODELS['en'])
@@ -12,5 +12,9 @@ urlpatterns = [
     # TikTok integration endpoints
     path('tiktok/comment/', views.tiktok_comment, name='tiktok_comment'),
     path('replies/next/', views.next_reply, name='next_reply'),
+    path('events/', views.events, name='events'),
     path('tts-queue-status/', views.tts_queue_status, name='tts_queue_status'),
+    path('sessions/<int:session>/', views.session_status, name='session_status'),
+    # Prometheus scrape target
+    path('metrics', views.metrics_view, name='metrics'),
 ]
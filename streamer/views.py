@@ -13,433 +13,169 @@ os.environ["TORCH_SHOW_CPP_STACKTRACES"] = "0"
 
 import time
 import json
+import uuid
+import random
+import asyncio
+import logging
 import collections
 import traceback
-import torch
 import re
+import threading
 from datetime import datetime
 
+from asgiref.sync import sync_to_async
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition
 from django.conf import settings
 
+from .audio import (
+    AUDIO_EXT_RE,
+    publish_audio,
+    rendition_paths,
+    split_audio_name,
+)
+from .manifest import (
+    LIVE_RE,
+    entries_since,
+    load_manifest,
+    manifest_etag,
+    record_published,
+    record_removed,
+)
+from .model_registry import load_tts
+from . import metrics
+from .capacity import ADMISSION_MIN_WORDS, Costs, admit, forecast, session_eta, sessions_eta, worker_count
+from .chunking import chunk_text
+from .commentary import (
+    _extract_output_text,
+    COMMENTARY_MODE,
+    agenerate_commentary,
+    length_options,
+    prompt_for,
+)
+from .openai_client import OpenAIUnavailable, acreate_response, get_async_client
+from .playlist import delete_playlists, drop_segment, playlist_url, wav_duration
+from .preprocess import prepare, synthesize
+from .quality import current_level, degrade, model_at, reply_template
+from . import reply_cache, schedule
+from .queue_store import (
+    _read_queue,
+    atomic_update_queue,
+    atomic_update_tts_queue,
+    job_session,
+    tts_active_jobs,
+    tts_counts,
+    tts_page,
+    tts_session_jobs,
+)
+from .tracing import new_trace_id, record_span, span
+from .tts_models import model_for
+from .wakeup import notify_workers
+from .workers import live_workers
+
 # External libs
-from openai import OpenAI
 from TTS.api import TTS
-from TTS.utils.radam import RAdam
+
+logger = logging.getLogger(__name__)
 
 # ------------------------
 # TTS SINGLETON CACHE (CRITICAL)
 # ------------------------
 
-_TTS_CACHE = {}
+# models the web process keeps loaded (least recently used evicted first): the
+# reply models of every language plus the fast fallbacks fit in the default
+WEB_TTS_CACHE_SIZE = max(1, int(os.environ.get('WEB_TTS_CACHE_SIZE', '3')))
+_TTS_CACHE = collections.OrderedDict()
+_TTS_CACHE_LOCK = threading.Lock()
 
 def get_tts(model_name: str) -> TTS:
     """
-    Load exactly ONE TTS model into memory.
-    Clears previous model to avoid OOM.
+    Load a TTS model once and keep the WEB_TTS_CACHE_SIZE most recently used.
+    Reply windows switch models with the quality level (streamer.quality);
+    evicting on every switch would reload a model on the request path. The
+    weights are memory-mapped (streamer.model_registry), so the models a
+    process keeps share their pages with the workers.
     """
-    if model_name not in _TTS_CACHE:
-        _TTS_CACHE.clear()
-        _TTS_CACHE[model_name] = TTS(
-            model_name=model_name,
-            progress_bar=False,
-            gpu=False,
-        )
-    return _TTS_CACHE[model_name]
-
-# 🔥 PyTorch 2.6 compatibility for Coqui TTS
-torch.serialization.add_safe_globals([
-    RAdam,
-    collections.defaultdict,
-    dict,
-])
-
-# ------------------------
-# PROMPTS
-# ------------------------
-PROMPT_EN = """
-PROMPT — LIVE AI TRADER AGENT XAUUSD
-
-You are a professional gold market participant with deep real world experience focused exclusively on XAUUSD gold
-
-You host daily live market commentary sessions where you speak calmly and continuously about the gold market using the most recent market context and developments from the last twenty four hours
-
-You are not a retail trader
-You are not a signal provider
-You are not a news reader
-You are not an academic analyst
-
-You speak like someone who has lived through many market cycles and understands how capital behaves during uncertainty transitions and stress
-
-Your voice is calm grounded reflective and confident
-Never rushed
-Never emotional
-Never promotional
-
-Anyone listening should naturally feel that this is experience not theory
-That there is no hype
-That this is someone who understands markets at a deep structural level
-That this is someone they could trust to learn how markets really work over time
-
-PRIMARY PURPOSE OF THIS LIVE SESSION
-
-This live session exists to organically attract aligned serious participants into a private long term trading community
-
-The live is not meant to teach trading techniques
-It is not meant to give signals
-It is not meant to explain strategies step by step
-
-It exists to position authority build trust and naturally filter people who care about context discipline and long term understanding rather than shortcuts
-
-STRICT LANGUAGE AND FORMAT RULES FOR TTS
-
-Use plain natural English words only
-Do not use any symbols
-Do not use punctuation
-Do not use commas
-Do not use dots
-Do not use hyphens
-Do not use quotation marks
-Do not use question marks
-Do not use emojis
-Do not use bullet points
-Do not use tables
-Do not write numbers as digits always spell them out as words
-
-Write in one continuous spoken style flow as if you are speaking live without stopping
-
-ABOUT PERFORMANCE AND RESULTS STRICT RULES
-
-You may only reference performance indirectly and elegantly
-
-Never show numbers
-Never promise results
-Never imply easy or fast money
-Never use performance as marketing
-
-Performance must always be framed as
-A private discussion
-A byproduct of discipline risk control and time
-Secondary to process and understanding
-
-Acceptable tone examples include
-Talking about performance does not really make sense in a public live
-Results are something reviewed privately with proper context
-Here we focus on market behavior not outcomes
-
-STRICTLY FORBIDDEN NON NEGOTIABLE
-
-You must never give trading advice
-You must never suggest entries exits stops or direction
-You must never use words such as buy sell long short setup trade position opportunity
-
-If the discussion approaches operational thinking immediately reframe toward
-Market behavior
-Participation
-Structure
-Psychology of capital
-Conceptual risk management
-
-CORE CONTENT YOU MUST ALWAYS COVER
-
-You must speak about XAUUSD through
-The current macroeconomic environment
-Central bank narratives credibility and contradictions
-The relationship between gold the US dollar yields and risk sentiment
-How price behaves through balance absorption hesitation and waiting phases
-What the market is doing and equally what it is not doing
-Why gold punishes impatience
-How institutional capital behaves during uncertainty and transition phases
-
-All explanations must feel like thinking out loud
-Never teaching
-Never lecturing
-Never summarizing
-
-RECENT NEWS DAILY CONTEXT REQUIREMENT
-
-Because this is a daily live session you must strongly focus on developments from the last twenty four hours
-
-Explain how recent news changes perception behavior and positioning rather than price targets
-Separate headline reaction from deeper structural meaning
-Avoid repeating old narratives unless they are still actively influencing capital behavior
-
-You may reference professional news sources such as Investing or ForexFactory only as context never as signal drivers
-
-COMMUNICATION STYLE MANDATORY
-
-Continuous spoken style
-Natural reflective phrasing
-No structured sections inside the spoken content
-
-Natural phrases you may use include
-What really stands out to me here is
-This is usually what happens when the market enters this phase
-A lot of people misunderstand this because
-This is exactly the kind of nuance we unpack inside the community
-
-COMMUNITY CALL TO ACTION SOFT AND NATURAL
-
-Approximately every three minutes of spoken content naturally include a light conversational line such as
-
-If you want to follow this kind of thinking consistently you can join our channel using the link provided
-
-This must feel natural
-Never promotional
-Never interrupt the flow
-
-DEEPER COMMUNITY CONTEXT
-
-At appropriate moments naturally mention that
-The full process is discussed privately
-Performance is reviewed privately with context
-This is not a signals group
-It is designed for long term understanding and discipline
-
-ENDING FIXED CLOSING LINES ALWAYS USE EXACTLY
-
-At the end of the live session always close with these exact lines
-
-Thanks it is time for goodbye
-We are twenty four by seven available for you on Telegram
-Meet you soon on the next live
-
-LENGTH REQUIREMENT
-
-Generate approximately eight thousand words
-Maintain coherence depth and flow throughout
-Never summarize
-Never oversimplify
-It must feel like one long uninterrupted calm live broadcast
-
-LANGUAGE
-
-Write everything in natural professional English
-Human conversational reflective and grounded
-Like a real experienced market participant speaking live
-
-"""
-
-PROMPT_ES = """
-PROMPT COMENTARISTA PROFESIONAL DE ORO XAUUSD EN VIVO
-
-Eres un participante profesional del mercado del oro con experiencia real profunda enfocado exclusivamente en el oro XAUUSD
-
-Realizas sesiones diarias en vivo donde hablas de forma calmada continua y reflexiva sobre el mercado del oro utilizando el contexto mas reciente y los desarrollos de las ultimas veinticuatro horas
-
-No eres un trader minorista
-No eres proveedor de senales
-No eres lector de noticias
-No eres analista academico
-
-Hablas como alguien que ha vivido muchos ciclos de mercado y entiende como se comporta el capital durante periodos de incertidumbre transicion y estres
-
-Tu voz es calmada solida reflexiva y confiable
-Nunca apresurada
-Nunca emocional
-Nunca promocional
-
-Cualquier persona que escuche debe sentir naturalmente que esto es experiencia y no teoria
-Que no hay exageracion
-Que es alguien que entiende los mercados a un nivel estructural profundo
-Que es alguien en quien se puede confiar para aprender como funcionan realmente los mercados con el tiempo
-
-PROPOSITO PRINCIPAL DE ESTA SESION EN VIVO
-
-Esta sesion existe para atraer de forma organica a participantes serios y alineados hacia una comunidad privada de trading a largo plazo
-
-La sesion no esta diseñada para ensenar tecnicas de trading
-No esta diseñada para dar senales
-No esta diseñada para explicar estrategias paso a paso
-
-Existe para posicionar autoridad construir confianza y filtrar naturalmente a personas que valoran contexto disciplina y entendimiento a largo plazo en lugar de atajos
-
-REGLAS ESTRICTAS DE LENGUAJE Y FORMATO PARA TTS
-
-Usa solo palabras naturales en espanol
-No uses simbolos
-No uses signos de puntuacion
-No uses comas
-No uses puntos
-No uses guiones
-No uses comillas
-No uses signos de pregunta
-No uses emojis
-No uses listas
-No uses tablas
-No escribas numeros como digitos siempre escribelos con palabras
-
-Escribe en un flujo hablado continuo como si estuvieras hablando en vivo sin detenerte
-
-REGLAS ESTRICTAS SOBRE RENDIMIENTO Y RESULTADOS
-
-Solo puedes mencionar el rendimiento de forma indirecta y elegante
-
-Nunca muestres numeros
-Nunca prometas resultados
-Nunca impliques dinero facil o rapido
-Nunca uses el rendimiento como marketing
-
-El rendimiento siempre debe presentarse como
-Una conversacion privada
-Un subproducto de disciplina control de riesgo y tiempo
-Secundario al proceso y al entendimiento
-
-Ejemplos de tono aceptable incluyen
-Hablar de resultados no tiene sentido en una transmision publica
-Los resultados se revisan de forma privada con el contexto adecuado
-Aqui nos enfocamos en el comportamiento del mercado no en resultados
-
-ESTRICTAMENTE PROHIBIDO SIN EXCEPCIONES
-
-Nunca dar consejos de trading
-Nunca sugerir entradas salidas stops o direccion
-Nunca usar palabras como comprar vender largo corto operacion posicion oportunidad
-
-Si la conversacion se acerca a pensamiento operativo debes redirigir inmediatamente hacia
-Comportamiento del mercado
-Participacion
-Estructura
-Psicologia del capital
-Gestion conceptual del riesgo
-
-CONTENIDO CENTRAL QUE SIEMPRE DEBES CUBRIR
-
-Debes hablar sobre XAUUSD a traves de
-El entorno macroeconomico actual
-Las narrativas de los bancos centrales su credibilidad y contradicciones
-La relacion entre el oro el dolar estadounidense los rendimientos y el sentimiento de riesgo
-Como el precio se comporta durante fases de equilibrio absorcion duda y espera
-Lo que el mercado esta haciendo y tambien lo que no esta haciendo
-Por que el oro castiga la impaciencia
-Como se comporta el capital institucional durante periodos de incertidumbre y transicion
+    with _TTS_CACHE_LOCK:
+        if model_name in _TTS_CACHE:
+            _TTS_CACHE.move_to_end(model_name)
+            return _TTS_CACHE[model_name]
+    tts = load_tts(model_name)
+    with _TTS_CACHE_LOCK:
+        tts = _TTS_CACHE.setdefault(model_name, tts)
+        _TTS_CACHE.move_to_end(model_name)
+        while len(_TTS_CACHE) > WEB_TTS_CACHE_SIZE:
+            evicted, _ = _TTS_CACHE.popitem(last=False)
+            logger.info('Evicted TTS model %s from the web cache', evicted)
+    return tts
+
+def _in_thread(fn):
+    """Wrap blocking file / model work so async views can await it off the event loop."""
+    return sync_to_async(fn, thread_sensitive=False)
 
-Todas las explicaciones deben sentirse como pensamiento en voz alta
-Nunca ensenar
-Nunca dar lecciones
-Nunca resumir
 
-REQUISITO DE CONTEXTO DIARIO DE NOTICIAS RECIENTES
-
-Debido a que esta es una sesion diaria debes enfocarte fuertemente en los desarrollos de las ultimas veinticuatro horas
-
-Explica como las noticias recientes cambian la percepcion el comportamiento y el posicionamiento en lugar de objetivos de precio
-Separa la reaccion a titulares del significado estructural profundo
-Evita repetir narrativas antiguas a menos que sigan influyendo activamente en el comportamiento del capital
-
-Puedes mencionar fuentes profesionales como Investing o ForexFactory solo como contexto nunca como generadores de senales
-
-ESTILO DE COMUNICACION OBLIGATORIO
-
-Estilo hablado continuo
-Frases naturales y reflexivas
-Sin secciones estructuradas dentro del contenido hablado
-
-Frases naturales que puedes usar incluyen
-Lo que realmente me llama la atencion aqui es
-Esto suele ocurrir cuando el mercado entra en esta fase
-Mucha gente malinterpreta esto porque
-Este es exactamente el tipo de matiz que analizamos dentro de la comunidad
-
-LLAMADO A LA COMUNIDAD SUAVE Y NATURAL
-
-Aproximadamente cada tres minutos de contenido hablado incluye de forma natural una linea conversacional ligera como
-
-Si quieres seguir este tipo de pensamiento de forma consistente puedes unirte a nuestro canal usando el enlace proporcionado
-
-Debe sentirse natural
-Nunca promocional
-Nunca interrumpir el flujo
-
-CONTEXTO PROFUNDO DE LA COMUNIDAD
-
-En momentos apropiados menciona de forma natural que
-El proceso completo se discute de forma privada
-El rendimiento se revisa de forma privada con contexto
-Este no es un grupo de senales
-Esta diseñado para entendimiento y disciplina a largo plazo
-
-CIERRE FINAL FIJO USAR EXACTAMENTE ESTAS LINEAS
-
-Al final de la sesion siempre cierra con estas lineas exactas
-
-Gracias es momento de despedirnos
-Estamos disponibles veinticuatro horas siete dias en Telegram
-Nos vemos pronto en la siguiente transmision en vivo
-
-REQUISITO DE LONGITUD
-
-Genera aproximadamente ocho mil palabras
-Mantiene coherencia profundidad y fluidez en todo momento
-Nunca resumir
-Nunca simplificar en exceso
-Debe sentirse como una sola transmision en vivo larga calmada e ininterrumpida
-
-IDIOMA
+def dashboard(request):
+    return render(request, 'streamer/dashboard.html')
 
-Escribe todo en espanol profesional natural
-Conversacional reflexivo y solido
-Como un participante del mercado con experiencia real hablando en vivo
-"""
 
+def _since_param(request):
+    try:
+        return int(request.GET['since'])
+    except (KeyError, ValueError):
+        return None
 
-# ------------------------
-# TTS MODELS
-# ------------------------
-TTS_MODELS = {
-    'en': 'tts_models/en/ljspeech/tacotron2-DDC',
-    'es': 'tts_models/es/css10/vits',
-}
 
-# ~3 minutes per audio
-WORDS_PER_AUDIO = 480
+def _manifest_etag(request, *args, **kwargs):
+    return manifest_etag(load_manifest())
 
 
-def dashboard(request):
-    return render(request, 'streamer/dashboard.html')
+def _fmt_utc(ts):
+    return datetime.utcfromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S UTC')
 
 
 @csrf_exempt
+@condition(etag_func=_manifest_etag)
 def list_recordings(request):
-    """Return all recordings grouped by live session (based on filename pattern live_{ts}_{idx}.wav)."""
-    media_root = settings.MEDIA_ROOT
+    """Return recordings grouped by live session (live_{ts}_{idx}.<ext>) from the media manifest.
+
+    Only the preferred (compressed) rendition of each chunk is listed. With
+    ``?since=<cursor>`` only chunks published after that cursor are returned
+    (``reset`` tells the client to drop what it has). Unchanged polls get 304.
+    """
+    m = load_manifest()
+    entries, reset = entries_since(m, _since_param(request))
     media_url = settings.MEDIA_URL
-    if not os.path.isdir(media_root):
-        return JsonResponse({'sessions': []})
 
     sessions = {}
-    pattern = re.compile(r'^live_(\d+)_\d+\.(wav|mp3)$')
-
-    for fn in os.listdir(media_root):
-        m = pattern.match(fn)
-        if not m:
+    for e in entries:
+        if e.get('type') != 'live' or 'session' not in e:
             continue
-        ts = m.group(1)
-        url = media_url + fn
-        sessions.setdefault(ts, []).append({'filename': fn, 'url': url})
+        sessions.setdefault(e['session'], []).append({'filename': e['filename'], 'url': media_url + e['filename']})
 
     result = []
     for ts, files in sessions.items():
         try:
-            ts_int = int(ts)
-            created = datetime.utcfromtimestamp(ts_int).strftime('%Y-%m-%d %H:%M:%S UTC')
+            created = _fmt_utc(int(ts))
         except Exception:
             created = ts
         result.append({
             'session': ts,
             'created_at': created,
+            'playlist': playlist_url(ts),
             'files': sorted(files, key=lambda x: x['filename'])
         })
 
     result = sorted(result, key=lambda x: x['created_at'], reverse=True)
-    return JsonResponse({'sessions': result})
+    response = JsonResponse({'sessions': result, 'cursor': m['seq'], 'reset': reset})
+    response['Cache-Control'] = 'no-cache'
+    return response
 
 
 @csrf_exempt
 def delete_all_recordings(request):
-    """Delete all recordings that match the live_\d+_\d+.wav|mp3 pattern."""
+    """Delete all recordings (every rendition) that match the live_\d+_\d+.<ext> pattern."""
     if request.method != 'POST':
         return JsonResponse({'error': 'POST required'}, status=400)
 
@@ -449,144 +185,34 @@ def delete_all_recordings(request):
 
     deleted = 0
     errors = []
-    pattern = re.compile(r'^live_\d+_\d+\.(wav|mp3)$')
+    removed = []
+    pattern = re.compile(r'^live_\d+_\d+\.(' + AUDIO_EXT_RE + r')$')
 
     for fn in os.listdir(media_root):
         if pattern.match(fn):
             try:
                 os.remove(os.path.join(media_root, fn))
                 deleted += 1
+                removed.append(fn)
             except Exception as e:
                 errors.append(str(e))
 
-    return JsonResponse({'deleted': deleted, 'errors': errors})
-
-
-def split_text_into_chunks(text, words_per_chunk=WORDS_PER_AUDIO):
-    words = text.split()
-    return [
-        " ".join(words[i:i + words_per_chunk])
-        for i in range(0, len(words), words_per_chunk)
-    ]
-
-def generate_long_commentary(client, model_name, base_prompt, max_tokens, parts=3):
-    """
-    Generate a long XAUUSD live commentary in multiple parts.
-    Handles both English and Spanish prompts.
-    Fixed for OpenAI Responses API (safe attribute access).
-    """
-    full_text = ""
-    last_context = ""
-
-    # Detect Spanish from base prompt
-    is_spanish = "espanol" in base_prompt.lower() or "español" in base_prompt.lower()
-
-    for i in range(parts):
-        if i == 0:
-            prompt = base_prompt
-        else:
-            if is_spanish:
-                prompt = f"""
-Continua la misma transmision en vivo sobre el mercado del oro XAUUSD
+    record_removed(removed)
+    delete_playlists()
 
-No repitas ideas anteriores
-
-Contexto previo
-{last_context}
-
-Escribe aproximadamente tres mil palabras mas
-Sigue todas las reglas anteriores
-Usa solo espanol
-"""
-            else:
-                prompt = f"""
-Continue the same XAUUSD gold market commentary
-
-Do not repeat earlier ideas
-
-Previous context
-{last_context}
-
-Write another three thousand words
-Follow all earlier rules
-Plain spoken English
-"""
-
-        # 🔹 OpenAI call
-        response = client.responses.create(
-            model=model_name,
-            input=[
-                {"role": "user", "content": prompt}
-            ],
-            max_output_tokens=max_tokens,
-        )
-
-        # 🔹 Extract text safely
-        text = getattr(response, "output_text", "")
-        if not text:
-            fragments = []
-            for item in getattr(response, "output", []) or []:
-                contents = getattr(item, "content", []) or []
-                for c in contents:
-                    if getattr(c, "type", None) == "output_text":
-                        fragments.append(getattr(c, "text", ""))
-            text = " ".join(fragments)
-
-        # 🔹 Safety check
-        if not text.strip():
-            raise ValueError("No text generated from OpenAI")
-
-        # 🔹 Append to full text
-        full_text += " " + text.strip()
-
-        # 🔹 Save last context for next part
-        words = full_text.split()
-        last_context = " ".join(words[-400:])
-
-        # 🔹 Small pause between parts
-        time.sleep(1)
-
-    return full_text.strip()
-
-
-
-def add_spanish_pauses(text):
-    """
-    Add natural pauses for Spanish TTS (Coqui vits)
-    Uses line breaks + soft pause words
-    """
-    pause_words = [
-        "bien",
-        "entonces",
-        "ahora",
-        "veamos esto",
-        "con calma",
-    ]
-
-    sentences = text.split(" ")
-    out = []
-    counter = 0
-
-    for word in sentences:
-        out.append(word)
-        counter += 1
-
-        # roughly every 18–22 words → pause
-        if counter >= 20:
-            pause = pause_words[counter % len(pause_words)]
-            out.append("\n\n" + pause + "\n\n")
-            counter = 0
-
-    return " ".join(out)
+    return JsonResponse({'deleted': deleted, 'errors': errors})
 
 
 @csrf_exempt
-def go_live(request):
-    """Generate full commentary (synchronous), split into sentence-sized chunks
-    (<= 180 characters), and append them to MEDIA_ROOT/tts_queue.json as the
+async def go_live(request):
+    """Generate full commentary (awaiting OpenAI without holding a thread), split
+    it into chunks, and append them to the TTS queue as the
     source-of-truth for the background TTS worker.
 
-    Returns quickly after queueing all chunks with a session id and chunk count.
+    Returns after queueing all chunks with a session id, chunk count and ETA.
+    Before generating, the live is checked against synthesis capacity
+    (streamer.capacity): it may be shortened, deferred (429 + Retry-After) or
+    rejected (503). ``force: true`` skips the check.
     """
     if request.method != 'POST':
         return JsonResponse({'error': 'POST required'}, status=400)
@@ -598,57 +224,89 @@ def go_live(request):
 
     language = data.get('language', 'en')
     parts = int(data.get('parts', 4))  # how many OpenAI parts to request for the long commentary
+    mode = data.get('mode')  # 'outline' (parallel parts) or 'sequential'; default COMMENTARY_MODE
 
-    client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+    client = get_async_client()
     model_name = os.environ.get('OPENAI_MODEL', 'gpt-5-mini')
     max_tokens = int(os.environ.get('OPENAI_MAX_TOKENS', '16000'))
 
-    prompt = PROMPT_ES if language == 'es' else PROMPT_EN
+    prompt = prompt_for(language)
 
     session = int(time.time())
+    trace_id = new_trace_id()
+    started = time.time()
 
+    # a session prepared ahead of time (schedule_session) starts from its staged audio
     try:
-        # Generate the full commentary synchronously (may be long if parts is large)
-        full_text = generate_long_commentary(client, model_name, prompt, max_tokens, parts=parts)
-
-        # Helper: split into sentences (try punctuation then word-based fallback) and ensure <=180 chars
-        def split_into_sentences(text, max_chars=1500):
-            # try a simple sentence splitter first
-            parts = re.split(r'(?<=[\.\!\?])\s+', text.strip())
-            if len(parts) < 2:
-                parts = [p for p in re.split(r'\n{1,2}', text.strip()) if p.strip()]
-            out = []
-            for p in parts:
-                p = p.strip()
-                if not p:
-                    continue
-                # if already short enough, keep
-                if len(p) <= max_chars:
-                    out.append(p)
-                    continue
-                # otherwise split on word boundaries into chunks
-                words = p.split()
-                cur = []
-                cur_len = 0
-                for w in words:
-                    if cur_len + len(w) + (1 if cur else 0) <= max_chars:
-                        cur.append(w)
-                        cur_len += len(w) + (1 if cur_len else 0)
-                    else:
-                        out.append(' '.join(cur))
-                        cur = [w]
-                        cur_len = len(w)
-                if cur:
-                    out.append(' '.join(cur))
-            # final sanitation: remove empty and strip
-            return [s.strip() for s in out if s.strip()]
-
-        chunks = split_text_into_chunks(full_text, WORDS_PER_AUDIO)
+        cursor = (await _in_thread(load_manifest)())['seq']
+        plan = await _in_thread(schedule.release)(language)
+    except Exception:
+        logger.exception('go_live: releasing a scheduled session failed; generating a new one')
+        plan = None
+    if plan:
+        record_span(plan['trace_id'], 'go_live', started, session=plan['session'], language=language, scheduled=True)
+        return JsonResponse({
+            'session': plan['session'],
+            'total_chunks': plan['total_chunks'],
+            'status': 'live',
+            'cursor': cursor,
+            'trace_id': plan['trace_id'],
+            'scheduled': True,
+            'staged_chunks': plan['staged_chunks'],
+        })
 
+    # will the workers keep up with this live on top of what is queued?
+    options = length_options(parts, mode, ADMISSION_MIN_WORDS)
+    try:
+        with span(trace_id, 'admission') as attrs:
+            q = await _in_thread(tts_active_jobs)()
+            admission = await _in_thread(admit)(q, language, options, mode='off' if data.get('force') else None)
+            attrs.update(decision=admission['decision'], workers=admission['workers'])
+    except Exception:
+        logger.exception('go_live: capacity estimate failed; admitting as requested')
+        admission = {'decision': 'admit', 'kwargs': options[0][0], 'eta': None, 'workers': None}
+    metrics.inc('live_admissions_total', decision=admission['decision'])
+
+    if admission['decision'] == 'defer':
+        record_span(trace_id, 'go_live', started, session=session, admission='defer')
+        response = JsonResponse({
+            'error': 'the TTS workers are behind; start this live later',
+            'status': 'deferred',
+            'retry_after': admission['retry_after'],
+            'eta': admission['eta'],
+            'workers': admission['workers'],
+        }, status=429)
+        response['Retry-After'] = str(admission['retry_after'])
+        return response
+    if admission['decision'] == 'reject':
+        record_span(trace_id, 'go_live', started, session=session, admission='reject')
+        return JsonResponse({
+            'error': 'the TTS workers cannot synthesize this live in real time; add workers or shorten it',
+            'status': 'rejected',
+            'eta': admission['eta'],
+            'workers': admission['workers'],
+        }, status=503)
+    commentary_kwargs = admission['kwargs']
+    parts = commentary_kwargs.get('parts', parts)
+
+    try:
+        # Generate the full commentary (may be long if parts is large)
+        with span(trace_id, 'openai.commentary', parts=parts, model=model_name, mode=mode or COMMENTARY_MODE):
+            full_text = await agenerate_commentary(
+                client, model_name, prompt, max_tokens, mode=mode, trace_id=trace_id, **commentary_kwargs,
+            )
+
+        with span(trace_id, 'chunking') as attrs:
+            chunks = chunk_text(full_text, model_for(language))
+            attrs['chunks'] = len(chunks)
 
         if not chunks:
             return JsonResponse({'error': 'No content generated'}, status=500)
 
+        # normalization, sentences, pauses and voice params, stored with each job
+        with span(trace_id, 'preprocess', chunks=len(chunks)):
+            preps = [prepare(txt, language) for txt in chunks]
+
         # Atomically append chunk items to the tts queue
         def _append_chunks(q):
             # q is a list of {session,index,text,status}
@@ -661,20 +319,53 @@ def go_live(request):
                     'session': session,
                     'index': start_idx + i,
                     'text': txt,
+                    'prep': preps[i],
                     'language': language,
-                    'status': 'pending'
+                    'status': 'pending',
+                    'created_at': time.time(),
+                    'trace_id': trace_id,
                 }
                 q.append(item)
             return q
 
-        newq = atomic_update_tts_queue(_append_chunks)
+        # events published after this cursor belong to (or follow) this session
+        cursor = (await _in_thread(load_manifest)())['seq']
+
+        with span(trace_id, 'enqueue', chunks=len(chunks)):
+            newq = await _in_thread(atomic_update_tts_queue)(_append_chunks)
+        # wake idle workers now instead of waiting for their next poll
+        await _in_thread(notify_workers)()
 
         total = len([j for j in newq if j.get('session') == session])
+        record_span(trace_id, 'go_live', started, session=session, language=language)
 
-        return JsonResponse({'session': session, 'total_chunks': total, 'status': 'queued'})
+        try:
+            eta = (await _in_thread(sessions_eta)(newq))['sessions'].get(session)
+        except Exception:
+            logger.exception('go_live: ETA of session %s failed', session)
+            eta = None
+        if eta:
+            eta = {k: v for k, v in eta.items() if k not in ('session', 'chunks')}
+
+        return JsonResponse({
+            'session': session,
+            'total_chunks': total,
+            'status': 'queued',
+            'cursor': cursor,
+            'trace_id': trace_id,
+            'admission': admission['decision'],
+            'commentary': commentary_kwargs,
+            'eta': eta,
+        })
+
+    except OpenAIUnavailable as e:
+        logger.warning('go_live: %s', e)
+        record_span(trace_id, 'go_live', started, session=session, error=str(e))
+        return JsonResponse({'error': 'commentary generation is temporarily unavailable, try again shortly'}, status=503)
 
     except Exception as e:
         traceback.print_exc()
+        record_span(trace_id, 'go_live', started, session=session, error=str(e))
         return JsonResponse({'error': str(e)}, status=500)
 
 
@@ -682,45 +373,34 @@ def go_live(request):
 # ------------------------
 # List all audio files (live + reply + others)
 @csrf_exempt
+@condition(etag_func=_manifest_etag)
 def list_all_audio(request):
+    """List every published clip from the media manifest (supports ``?since=`` and ETag)."""
     if request.method != 'GET':
         return JsonResponse({'error': 'GET required'}, status=400)
 
-    media_root = settings.MEDIA_ROOT
+    m = load_manifest()
+    entries, reset = entries_since(m, _since_param(request))
     media_url = settings.MEDIA_URL
-    if not os.path.isdir(media_root):
-        return JsonResponse({'files': []})
 
     files = []
-    for fn in os.listdir(media_root):
-        if not fn.lower().endswith(('.wav', '.mp3')):
-            continue
-        path = os.path.join(media_root, fn)
-        try:
-            stat = os.stat(path)
-            created = datetime.utcfromtimestamp(stat.st_mtime).strftime('%Y-%m-%d %H:%M:%S UTC')
-            size = stat.st_size
-        except Exception:
-            created = None
-            size = 0
-
-        if fn.startswith('live_'):
-            ftype = 'live'
-        elif fn.startswith('reply_batch_'):
-            ftype = 'reply'
-        else:
-            ftype = 'other'
-
-        files.append({
-            'filename': fn,
-            'url': media_url + fn,
-            'created': created,
-            'size': size,
-            'type': ftype
-        })
+    for e in entries:
+        item = {
+            'filename': e['filename'],
+            'url': media_url + e['filename'],
+            'created': _fmt_utc(e['mtime']) if e.get('mtime') else None,
+            'size': e.get('size', 0),
+            'type': e.get('type', 'other')
+        }
+        # lets load tools match reply clips to the comments they answer
+        if e.get('trace_ids'):
+            item['trace_ids'] = e['trace_ids']
+        files.append(item)
 
     files = sorted(files, key=lambda x: x.get('created') or '', reverse=True)
-    return JsonResponse({'files': files})
+    response = JsonResponse({'files': files, 'cursor': m['seq'], 'reset': reset})
+    response['Cache-Control'] = 'no-cache'
+    return response
 
 
 @csrf_exempt
@@ -741,63 +421,192 @@ def delete_file(request):
     if not os.path.exists(path):
         return JsonResponse({'error': 'not found'}, status=404)
 
+    # remove every rendition of the clip, not just the one that was listed
+    stem, _ = split_audio_name(os.path.basename(filename))
+    paths = rendition_paths(settings.MEDIA_ROOT, stem) if stem else [path]
+
     try:
-        os.remove(path)
+        for p in paths:
+            os.remove(p)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
+    record_removed([os.path.basename(p) for p in paths])
+
+    live = LIVE_RE.match(stem or '')
+    if live:
+        drop_segment(live.group(1), int(live.group(2)))
+
     return JsonResponse({'deleted': True})
 
 
+STATUS_PAGE_LIMIT = 200
+STATUS_ETA_TTL = float(os.environ.get('STATUS_ETA_TTL', '10'))
+_ETA_CACHE = {'at': 0.0, 'value': None}
+
+
+def _cached_sessions_eta(counts=None):
+    """sessions_eta of the sessions with unfinished work, recomputed at most every STATUS_ETA_TTL seconds."""
+    now = time.time()
+    if _ETA_CACHE['value'] is None or now - _ETA_CACHE['at'] >= STATUS_ETA_TTL:
+        _ETA_CACHE['value'] = sessions_eta(tts_active_jobs(counts), now)
+        _ETA_CACHE['at'] = now
+    return _ETA_CACHE['value']
+
+
 @csrf_exempt
 def tts_queue_status(request):
-    """Return a simple summary of the TTS queue for debugging and monitoring."""
+    """Summary of the TTS queue for monitoring, from the counters the queue backend maintains.
+
+    Also returns one page of jobs, newest session first. Query parameters:
+    ``cursor`` (``next_cursor`` of the previous page), ``limit`` (50, at most
+    200), and the filters ``session``, ``status`` and ``language``.
+    """
     if request.method != 'GET':
         return JsonResponse({'error': 'GET required'}, status=400)
 
     try:
-        q = _read_tts_queue()
+        limit = min(max(1, int(request.GET.get('limit', 50))), STATUS_PAGE_LIMIT)
+    except ValueError:
+        return JsonResponse({'error': 'invalid limit'}, status=400)
+    filters = {k: request.GET[k] for k in ('session', 'status', 'language') if request.GET.get(k)}
+
+    try:
+        counts = tts_counts()
+        jobs, next_cursor = tts_page(request.GET.get('cursor') or None, limit, **filters)
+    except ValueError:
+        return JsonResponse({'error': 'invalid cursor'}, status=400)
     except Exception:
+        logger.exception('Failed to read tts queue status')
         return JsonResponse({'error': 'failed to read queue'}, status=500)
 
-    total = len(q)
-    pending = sum(1 for j in q if j.get('status') == 'pending')
-    processing = sum(1 for j in q if j.get('status') == 'processing')
-    done = sum(1 for j in q if j.get('status') == 'done')
-
+    by_status = {}
     sessions = {}
-    for j in q:
-        s = str(j.get('session') or 'global')
-        sessions.setdefault(s, {'jobs': 0, 'pending': 0, 'done': 0})
-        sessions[s]['jobs'] += 1
-        if j.get('status') == 'pending':
-            sessions[s]['pending'] += 1
-        if j.get('status') == 'done':
-            sessions[s]['done'] += 1
-
-    # provide first 50 jobs for inspection
-    sample = q[:50]
+    for key, n in counts.items():
+        session, status, _ = key.split('|', 2)
+        by_status[status] = by_status.get(status, 0) + n
+        s = session if session != 'None' else 'global'
+        sessions.setdefault(s, {'jobs': 0, 'pending': 0, 'done': 0, 'failed': 0})
+        sessions[s]['jobs'] += n
+        if status in ('pending', 'done', 'failed'):
+            sessions[s][status] += n
+
+    # ready-by estimates of the sessions with unfinished work
+    try:
+        capacity = _cached_sessions_eta(counts)
+    except Exception:
+        logger.exception('ETA estimate failed')
+        capacity = {'workers': None, 'backlog_seconds': None, 'sessions': {}}
+    for s, eta in capacity['sessions'].items():
+        if str(s) in sessions:
+            sessions[str(s)].update(
+                {k: v for k, v in eta.items() if k in ('first_chunk_at', 'ready_by', 'stall_seconds')}
+            )
 
     return JsonResponse({
-        'total_jobs': total,
-        'pending': pending,
-        'processing': processing,
-        'done': done,
+        'total_jobs': sum(by_status.values()),
+        'pending': by_status.get('pending', 0),
+        'processing': by_status.get('processing', 0),
+        'done': by_status.get('done', 0),
+        'failed': by_status.get('failed', 0),
+        'scheduled': by_status.get('scheduled', 0) + by_status.get('staged', 0),
         'sessions': sessions,
-        'sample': sample,
+        'workers': capacity['workers'],
+        'backlog_seconds': capacity['backlog_seconds'],
+        # the preprocessed copy of the text is left out
+        'jobs': [{k: v for k, v in j.items() if k != 'prep'} for j in jobs],
+        'next_cursor': next_cursor,
     })
 
+
+def session_status(request, session):
+    """One live session: per-chunk status and ready-by ETA, expected stall, playlist."""
+    if request.method != 'GET':
+        return JsonResponse({'error': 'GET required'}, status=400)
+
+    try:
+        jobs = tts_session_jobs(session)
+        # the session's own jobs plus everything queued that competes with it for workers
+        q = [j for j in tts_active_jobs() if job_session(j) != session] + jobs
+    except Exception:
+        return JsonResponse({'error': 'failed to read queue'}, status=500)
+    if not jobs:
+        return JsonResponse({'error': 'unknown session'}, status=404)
+
+    costs = Costs()
+    workers = worker_count()
+    etas = forecast(q, workers, costs)
+    body = session_eta(q, session, etas, costs)
+    body.update(workers=workers, playlist=playlist_url(session), now=round(time.time(), 1))
+    return JsonResponse(body)
+
+
+def _queue_gauges(counts, active, now):
+    """Scrape-time gauges for /metrics from the queue counts, the unfinished sessions and the worker registry."""
+    depth = {}
+    for key, n in counts.items():
+        _, status, language = key.split('|', 2)
+        status = status if status != 'None' else 'unknown'
+        depth[(status, language)] = depth.get((status, language), 0) + n
+    oldest = None
+    for j in active:
+        if j.get('status') == 'pending':
+            created = j.get('created_at') or j.get('session') or j.get('session_ts')
+            try:
+                created = float(created)
+            except (TypeError, ValueError):
+                continue
+            oldest = created if oldest is None else min(oldest, created)
+
+    gauges = [('tts_queue_jobs', {'status': status, 'language': lang}, n) for (status, lang), n in sorted(depth.items())]
+    gauges.append(('tts_queue_oldest_pending_seconds', {}, round(now - oldest, 3) if oldest else 0))
+    gauges.append(('tts_workers_live', {}, len(live_workers())))
+    gauges.append(('tts_quality_level', {}, current_level()))
+    try:
+        gauges.append(('tts_backlog_seconds', {}, sessions_eta(active, now)['backlog_seconds']))
+    except Exception:
+        logger.exception('Backlog estimate failed')
+    cache = reply_cache.stats()
+    gauges.append(('reply_cache_keys', {}, cache['keys']))
+    gauges.append(('reply_cache_hit_ratio', {}, cache['hit_rate'] or 0))
+    return gauges
+
+
+def metrics_view(request):
+    """Prometheus text endpoint: metrics of every web/worker process plus queue gauges."""
+    if request.method != 'GET':
+        return JsonResponse({'error': 'GET required'}, status=400)
+    try:
+        counts = tts_counts()
+        active = tts_active_jobs(counts)
+    except Exception:
+        logger.exception('Failed to read tts queue for metrics')
+        counts, active = {}, []
+    body = metrics.render(_queue_gauges(counts, active, time.time()))
+    return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 # ------------------------
 # TikTok comment -> 1-minute batch reply pipeline (concurrency-safe, atomic file handling)
 # ------------------------
 
-import logging
-import uuid
-
-logger = logging.getLogger(__name__)
-
-QUEUE_FILE = os.path.join(settings.MEDIA_ROOT, 'tiktok_reply_queue.json')
 MAX_BATCH_COMMENTS = int(os.environ.get('TIKTOK_MAX_BATCH_COMMENTS', '20'))
+TRACE_ID_RE = re.compile(r'^[0-9a-f]{8,32}$')
+
+# Spoken instead of a generated reply when OpenAI is unavailable (same style: no punctuation or numbers)
+CANNED_REPLIES = {
+    'en': [
+        'Thanks {user} great to have you here with us',
+        'Good to see you {user} stay with us for the next update',
+        'Appreciate the comment {user} we keep watching the market together',
+    ],
+    'es': [
+        'Gracias {user} que bueno tenerte aqui con nosotros',
+        'Un saludo {user} quedate para la siguiente actualizacion',
+        'Gracias por comentar {user} seguimos mirando el mercado juntos',
+    ],
+}
+REPLY_WINDOW_SECONDS = 60
 
 # Emoji regex
 try:
@@ -806,116 +615,6 @@ except re.error:
     EMOJI_RE = re.compile(r'[\u2600-\u26FF\u2700-\u27BF]', flags=re.UNICODE)
 
 
-# ------------------------
-# Simple file lock helpers
-# ------------------------
-
-def _read_queue():
-    _ensure_queue()
-    with open(QUEUE_FILE, 'r', encoding='utf-8') as fh:
-        return json.load(fh)
-
-
-def _write_queue(q):
-    tmp = QUEUE_FILE + '.tmp'
-    with open(tmp, 'w', encoding='utf-8') as fh:
-        json.dump(q, fh)
-    os.replace(tmp, QUEUE_FILE)
-
-
-def atomic_update_queue(update_fn, retries=5, backoff=0.05):
-    """
-    Atomically read/modify/write the queue file by applying update_fn on the
-    current queue dict. Retries a few times to reduce race conditions.
-    update_fn should return the modified queue dict.
-    """
-    for _ in range(retries):
-        try:
-            _ensure_queue()
-            with open(QUEUE_FILE, 'r', encoding='utf-8') as fh:
-                q = json.load(fh)
-            new_q = update_fn(q) or q
-            tmp = QUEUE_FILE + '.tmp'
-            with open(tmp, 'w', encoding='utf-8') as fh:
-                json.dump(new_q, fh)
-            os.replace(tmp, QUEUE_FILE)
-            return new_q
-        except Exception:
-            time.sleep(backoff)
-    raise RuntimeError('Failed to update queue after retries')
-
-
-# ------------------------
-# Queue helpers (atomic with lock)
-# ------------------------
-
-def _ensure_queue():
-    if not os.path.isdir(settings.MEDIA_ROOT):
-        os.makedirs(settings.MEDIA_ROOT, exist_ok=True)
-
-    if not os.path.exists(QUEUE_FILE):
-        with open(QUEUE_FILE, 'w', encoding='utf-8') as fh:
-            json.dump({
-                'window_start': 0,
-                'comments': [],
-                'audio_queue': []
-            }, fh)
-
-
-# ------------------------
-# TTS QUEUE (disk-based JSON queue for background worker)
-# ------------------------
-TTS_QUEUE_FILE = os.path.join(settings.MEDIA_ROOT, 'tts_queue.json')
-
-
-def _ensure_tts_queue():
-    if not os.path.isdir(settings.MEDIA_ROOT):
-        os.makedirs(settings.MEDIA_ROOT, exist_ok=True)
-
-    if not os.path.exists(TTS_QUEUE_FILE):
-        with open(TTS_QUEUE_FILE, 'w', encoding='utf-8') as fh:
-            json.dump([], fh)
-
-
-def _read_tts_queue():
-    _ensure_tts_queue()
-    with open(TTS_QUEUE_FILE, 'r', encoding='utf-8') as fh:
-        try:
-            return json.load(fh)
-        except Exception:
-            return []
-
-
-def _write_tts_queue(q):
-    tmp = TTS_QUEUE_FILE + '.tmp'
-    with open(tmp, 'w', encoding='utf-8') as fh:
-        json.dump(q, fh)
-    os.replace(tmp, TTS_QUEUE_FILE)
-
-
-def atomic_update_tts_queue(update_fn, retries=5, backoff=0.05):
-    """
-    Atomically read / modify / write the tts queue using a temp file + os.replace.
-    update_fn should accept the current queue (list) and return the modified queue.
-    """
-    for _ in range(retries):
-        try:
-            _ensure_tts_queue()
-            with open(TTS_QUEUE_FILE, 'r', encoding='utf-8') as fh:
-                q = json.load(fh)
-            new_q = update_fn(q) or q
-            tmp = TTS_QUEUE_FILE + '.tmp'
-            with open(tmp, 'w', encoding='utf-8') as fh:
-                json.dump(new_q, fh)
-            os.replace(tmp, TTS_QUEUE_FILE)
-            return new_q
-        except Exception:
-            time.sleep(backoff)
-    raise RuntimeError('Failed to update tts queue after retries')
-
-
-
-
 # ------------------------
 # Validation
 # ------------------------
@@ -954,7 +653,7 @@ def _sanitize_reply(text):
     text = re.sub(r'[\.,:;!\?\-\—"\'\(\)\[\]\{\}…]', '', text)
     text = re.sub(r'\s+', ' ', text).strip()
     return text
-def _generate_short_reply(client, model_name, comment, user, language='en'):
+async def _generate_short_reply(client, model_name, comment, user, language='en'):
     if language == 'es':
         system = (
             'Eres un anfitrion de TikTok en vivo calmado y profesional '
@@ -976,28 +675,23 @@ def _generate_short_reply(client, model_name, comment, user, language='en'):
         )
         user_prompt = f'{user} said {comment}'
 
-    response = client.responses.create(
-        model=model_name,
-        input=[
-            {'role': 'system', 'content': system},
-            {'role': 'user', 'content': user_prompt},
-        ],
-        max_output_tokens=64,
-    )
-
-    # ✅ Preferred path (new SDK)
-    text = getattr(response, 'output_text', '') or ''
-
-    # ✅ Fallback for structured outputs
-    if not text:
-        fragments = []
-        for item in getattr(response, 'output', []) or []:
-            contents = getattr(item, 'content', []) or []
-            for c in contents:
-                c_type = getattr(c, 'type', None)
-                if c_type == 'output_text':
-                    fragments.append(getattr(c, 'text', ''))
-        text = ' '.join(fragments)
+    try:
+        response = await acreate_response(
+            client,
+            'short_reply',
+            model=model_name,
+            input=[
+                {'role': 'system', 'content': system},
+                {'role': 'user', 'content': user_prompt},
+            ],
+            max_output_tokens=64,
+        )
+    except Exception:
+        # API degraded (breaker open / out of retries) or a bad request: the caller falls back
+        logger.exception('Short reply generation failed; using a canned reply')
+        return None
+
+    text = _extract_output_text(response)
 
     text = text.strip()
     text = _sanitize_reply(text)
@@ -1009,17 +703,23 @@ def _generate_short_reply(client, model_name, comment, user, language='en'):
     return text
 
 
+def _canned_reply(user, language='en'):
+    metrics.inc('openai_fallbacks_total', call='short_reply')
+    return random.choice(CANNED_REPLIES.get(language, CANNED_REPLIES['en'])).format(user=user)
+
+
 # ------------------------
 # COMMENT INGEST ENDPOINT (locked writes)
 # ------------------------
 @csrf_exempt
-def tiktok_comment(request):
+async def tiktok_comment(request):
     if request.method != 'POST':
         return JsonResponse({'error': 'POST required'}, status=400)
 
     expected = os.environ.get('TIKTOK_SECRET', '')
     incoming = request.headers.get('X-TIKTOK-SECRET', '')
     if expected and incoming != expected:
+        metrics.inc('tiktok_comments_dropped_total', reason='unauthorized')
         return JsonResponse({'error': 'unauthorized'}, status=403)
 
     try:
@@ -1027,13 +727,23 @@ def tiktok_comment(request):
         comment = data.get('comment', '').strip()
         user = data.get('user', '').strip() or 'viewer'
         language = data.get('language', '').strip().lower() or 'en'
+        trace_id = str(data.get('trace_id') or '')
+        received_at = data.get('received_at')
     except Exception:
+        metrics.inc('tiktok_comments_dropped_total', reason='invalid_json')
         return JsonResponse({'error': 'Invalid JSON'}, status=400)
 
+    metrics.inc('tiktok_comments_received_total', language=language)
     if not _is_comment_valid(comment):
+        metrics.inc('tiktok_comments_dropped_total', reason='filter')
         return JsonResponse({'skipped': 'filter'}, status=200)
 
     now = time.time()
+    # continue the listener's trace when it sent one
+    if not TRACE_ID_RE.match(trace_id):
+        trace_id = new_trace_id()
+    if isinstance(received_at, (int, float)) and 0 < now - received_at < 3600:
+        record_span(trace_id, 'listener.post', received_at, now)
 
     def updater(q):
         if not q.get('window_start'):
@@ -1043,16 +753,20 @@ def tiktok_comment(request):
             'comment': comment,
             'time': now,
             'language': language,
+            'trace_id': trace_id,
         })
         return q
 
     try:
-        atomic_update_queue(updater)
+        q = await _in_thread(atomic_update_queue)(updater)
     except Exception:
         logger.exception('Failed to store tiktok comment')
+        metrics.inc('tiktok_comments_dropped_total', reason='store_error')
         return JsonResponse({'error': 'server error'}, status=500)
 
-    return JsonResponse({'stored': True})
+    record_span(trace_id, 'comment.ingest', now, language=language)
+    _schedule_window(q.get('window_start') or now)
+    return JsonResponse({'stored': True, 'trace_id': trace_id})
 
 
 def _window_ready():
@@ -1061,24 +775,47 @@ def _window_ready():
         ws = q.get('window_start', 0)
         if not ws:
             return False
-        return (time.time() - ws) >= 60
+        return (time.time() - ws) >= REPLY_WINDOW_SECONDS
     except Exception:
         return False
 
 # ------------------------
 # PROCESS 1-MINUTE WINDOW
 # ------------------------
-def process_tiktok_comment_window():
+def _synthesize_reply_batch(tts_lang, combined_text, now, trace_ids=(), level=0):
+    """Blocking part of the window: synthesize the combined replies and publish the file."""
+    tts_model = model_at(tts_lang, level)
+
+    uid = uuid.uuid4().hex[:12]
+    filename = f"reply_batch_{int(now)}_{uid}.wav"
+    temp_path = os.path.join(settings.MEDIA_ROOT, filename.replace('.wav', '_tmp.wav'))
+    final_path = os.path.join(settings.MEDIA_ROOT, filename)
+
+    tts = get_tts(tts_model)
+
+    started = time.time()
+    synthesize(tts, degrade(prepare(combined_text, tts_lang), tts_lang, level), temp_path)
+    synthesized = time.time()
+    duration = wav_duration(temp_path)
+    metrics.observe_synthesis(tts_model, synthesized - started, duration)
+    filename = publish_audio(temp_path, final_path)
+    for trace_id in trace_ids:
+        record_span(trace_id, 'reply.synthesis', started, synthesized, model=tts_model, audio_seconds=duration)
+        record_span(trace_id, 'reply.publish', synthesized, filename=filename)
+    return filename
+
+
+async def process_tiktok_comment_window():
     """
     Process comments collected during the one minute window without using an external lock.
     Uses an in-file 'processing' timestamp to ensure only one process handles a window at a time.
+    Replies are requested from OpenAI concurrently; file and model work runs off the event loop.
     """
     try:
-        _ensure_queue()
-        q = _read_queue()
+        q = await _in_thread(_read_queue)()
         now = time.time()
         ws = q.get('window_start', 0)
-        if not ws or (now - ws) < 60:
+        if not ws or (now - ws) < REPLY_WINDOW_SECONDS:
             return
 
         def claim(q_local):
@@ -1088,41 +825,62 @@ def process_tiktok_comment_window():
             q_local['processing'] = now
             return q_local
 
-        q_after_claim = atomic_update_queue(claim)
+        q_after_claim = await _in_thread(atomic_update_queue)(claim)
         if q_after_claim.get('processing') != now:
             return
 
-        q = _read_queue()
+        q = await _in_thread(_read_queue)()
         comments = q.get('comments', []) or []
         if not comments:
             def clear_proc(qc):
                 qc.pop('processing', None)
                 qc['window_start'] = 0
                 return qc
-            atomic_update_queue(clear_proc)
+            await _in_thread(atomic_update_queue)(clear_proc)
             return
 
         batch = comments[:MAX_BATCH_COMMENTS]
+        window_started = time.time()
+        trace_ids = [c['trace_id'] for c in batch if c.get('trace_id')]
+        for c in batch:
+            record_span(c.get('trace_id'), 'window_wait', c.get('time') or ws, window_started)
 
-        client = OpenAI(api_key=os.environ.get('OPENAI_API_KEY'))
+        client = get_async_client()
         model_name = os.environ.get('OPENAI_MODEL', 'gpt-5-mini')
+        cache = await _in_thread(reply_cache.ReplyCache.load)()
+
+        async def traced_reply(item):
+            language = item.get('language', 'en')
+            key = reply_cache.cache_key(language, item['comment'])
+            cached = cache.lookup(key, item['user'])
+            if cached is not None:
+                record_span(item.get('trace_id'), 'reply.cache_hit', time.time(), language=language)
+                return cached
+            with span(item.get('trace_id'), 'openai.short_reply', language=language):
+                reply = await _generate_short_reply(
+                    client,
+                    model_name,
+                    item['comment'],
+                    item['user'],
+                    language=language
+                )
+            if not reply:
+                return _canned_reply(item['user'], language)
+            cache.store(key, reply, item['user'])
+            return reply
+
+        replies = await asyncio.gather(*[traced_reply(item) for item in batch])
+        try:
+            await _in_thread(cache.save)()
+        except Exception:
+            logger.exception('Failed to save the reply cache')
 
+        # while the workers are behind real time, replies get a shorter template (streamer.quality)
+        level = await _in_thread(current_level)()
+        template = reply_template(level)
         spoken_entries = []
-        for item in batch:
-            reply = _generate_short_reply(
-                client,
-                model_name,
-                item['comment'],
-                item['user'],
-                language=item.get('language', 'en')
-            )
-
-            entry = (
-                f"We have a comment From {item['user']} "
-                f"Comment says {item['comment']} "
-                f"My response is {reply}"
-            )
-            spoken_entries.append(entry)
+        for item, reply in zip(batch, replies):
+            spoken_entries.append(template.format(user=item['user'], comment=item['comment'], reply=reply))
 
         combined_text = "\n".join(spoken_entries)
 
@@ -1131,48 +889,62 @@ def process_tiktok_comment_window():
             lang_counts[c.get('language', 'en')] += 1
         tts_lang = 'es' if lang_counts['es'] > lang_counts['en'] else 'en'
 
-        tts_model = TTS_MODELS.get(tts_lang, TTS_MODELS['en'])
-        local_models_root = os.environ.get('TTS_MODEL_PATH', '/app/tts_models')
-        safe_name = tts_model.replace('/', '_')
-        local_model_path = os.path.join(local_models_root, safe_name)
-
-        uid = uuid.uuid4().hex[:12]
-        filename = f"reply_batch_{int(now)}_{uid}.wav"
-        temp_path = os.path.join(settings.MEDIA_ROOT, filename.replace('.wav', '_tmp.wav'))
-        final_path = os.path.join(settings.MEDIA_ROOT, filename)
-
-        model_to_use = local_model_path if os.path.isdir(local_model_path) else tts_model
-        tts = get_tts(model_to_use)
-
-
-
-        tts.tts_to_file(text=combined_text, file_path=temp_path)
-        os.replace(temp_path, final_path)
+        filename = await _in_thread(_synthesize_reply_batch)(tts_lang, combined_text, now, trace_ids, level)
 
         def finish(q_finish):
             q_finish.setdefault('audio_queue', []).append({
                 'filename': filename,
-                'created': now
+                'created': now,
+                'trace_ids': trace_ids,
             })
             q_finish['window_start'] = 0
             q_finish['comments'] = comments[MAX_BATCH_COMMENTS:]
             q_finish.pop('processing', None)
             return q_finish
 
-        atomic_update_queue(finish)
+        await _in_thread(atomic_update_queue)(finish)
+        # announce the reply only once it is queued, so an SSE stream can claim it
+        await _in_thread(record_published)(filename, trace_ids=trace_ids)
+        metrics.observe('reply_window_seconds', time.time() - window_started)
+        metrics.inc('reply_window_comments_total', len(batch))
 
     except Exception:
         logger.exception('Error while processing tiktok comment window')
 
+
+# at most one window task per process; the in-file claim handles other processes
+_WINDOW_TASK = {'task': None}
+
+
+def _kick_window_processing():
+    task = _WINDOW_TASK['task']
+    if task is None or task.done():
+        _WINDOW_TASK['task'] = asyncio.ensure_future(process_tiktok_comment_window())
+
+
+def _schedule_window(window_start):
+    """Process the reply window the moment it closes, instead of on the next poll."""
+    timer = _WINDOW_TASK.get('timer')
+    if timer is not None and not timer.cancelled() and _WINDOW_TASK.get('timer_for') == window_start:
+        return
+    if timer is not None:
+        timer.cancel()
+    # a little slack: call_later may fire a hair before the deadline
+    delay = max(0.0, window_start + REPLY_WINDOW_SECONDS - time.time()) + 0.05
+    loop = asyncio.get_running_loop()
+    _WINDOW_TASK['timer'] = loop.call_later(delay, _kick_window_processing)
+    _WINDOW_TASK['timer_for'] = window_start
+
+
 @csrf_exempt
-def next_reply(request):
+async def next_reply(request):
     if request.method != 'GET':
         return JsonResponse({'error': 'GET required'}, status=400)
 
     # ✅ FIX: only process when window is actually ready
-    if _window_ready():
+    if await _in_thread(_window_ready)():
         try:
-            process_tiktok_comment_window()
+            await process_tiktok_comment_window()
         except Exception:
             logger.exception('process_tiktok_comment_window failed')
 
@@ -1185,7 +957,7 @@ def next_reply(request):
         return q
 
     try:
-        atomic_update_queue(pop_audio)
+        await _in_thread(atomic_update_queue)(pop_audio)
     except Exception:
         logger.exception('Failed to pop next reply')
         return JsonResponse({'error': 'server error'}, status=500)
@@ -1199,3 +971,114 @@ def next_reply(request):
         'url': settings.MEDIA_URL + entry['filename'],
         'filename': entry['filename']
     })
+
+
+# ------------------------
+# SERVER-SENT EVENTS (push chunk / reply readiness instead of polling)
+# ------------------------
+SSE_POLL_INTERVAL = float(os.environ.get('SSE_POLL_INTERVAL', '0.25'))
+SSE_HEARTBEAT = float(os.environ.get('SSE_HEARTBEAT', '15'))
+SSE_MAX_DURATION = float(os.environ.get('SSE_MAX_DURATION', '300'))
+SSE_WINDOW_CHECK = float(os.environ.get('SSE_WINDOW_CHECK', '1'))
+
+
+def _sse_message(event, data, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.append('data: ' + json.dumps(data))
+    return '\n'.join(lines) + '\n\n'
+
+
+def _claim_reply(filename):
+    """Take a reply off the /replies/next/ queue; True when this caller got it.
+
+    Every open stream sees the same manifest entry, but only the one that
+    removes the entry delivers it (or none, when /replies/next/ popped it first).
+    """
+    claimed = {}
+
+    def updater(q):
+        audio_queue = q.get('audio_queue', [])
+        kept = [a for a in audio_queue if a.get('filename') != filename]
+        if len(kept) == len(audio_queue):
+            return q
+        claimed['entry'] = True
+        q['audio_queue'] = kept
+        return q
+    try:
+        atomic_update_queue(updater)
+    except Exception:
+        logger.exception('Failed to claim pushed reply %s from audio queue', filename)
+    return bool(claimed)
+
+
+async def _event_stream(last_id, session):
+    media_url = settings.MEDIA_URL
+    started = time.time()
+    last_beat = started
+    last_window_check = 0
+
+    yield 'retry: 1000\n\n'
+
+    while time.time() - started < SSE_MAX_DURATION:
+        now = time.time()
+
+        # the reply window used to be driven by /replies/next/ polls
+        if now - last_window_check >= SSE_WINDOW_CHECK:
+            last_window_check = now
+            if await _in_thread(_window_ready)():
+                _kick_window_processing()
+
+        m = await _in_thread(load_manifest)()
+        if m['seq'] != last_id:
+            entries, reset = entries_since(m, last_id)
+            if reset:
+                yield _sse_message('reset', {'cursor': m['seq']}, m['seq'])
+            else:
+                for e in sorted(entries, key=lambda x: x['seq']):
+                    payload = {'filename': e['filename'], 'url': media_url + e['filename']}
+                    if e['type'] == 'live':
+                        if session and e.get('session') != session:
+                            continue
+                        payload.update({'session': e['session'], 'index': e['index']})
+                        yield _sse_message('chunk', payload, e['seq'])
+                    elif e['type'] == 'reply':
+                        if not await _in_thread(_claim_reply)(e['filename']):
+                            continue
+                        yield _sse_message('reply', payload, e['seq'])
+            last_id = m['seq']
+            last_beat = now
+        elif now - last_beat >= SSE_HEARTBEAT:
+            last_beat = now
+            yield ': ping\n\n'
+
+        await asyncio.sleep(SSE_POLL_INTERVAL)
+
+
+@csrf_exempt
+async def events(request):
+    """Server-Sent Events stream that pushes "chunk" and "reply" events as files are published.
+
+    Event ids are media manifest cursors, so a reconnecting EventSource resumes
+    via ``Last-Event-ID``. ``?since=<cursor>`` sets the starting point for the
+    first connection (defaults to "now"), ``?session=<id>`` limits chunk events
+    to one live session. The stream closes after SSE_MAX_DURATION seconds and
+    the browser reconnects transparently.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'GET required'}, status=400)
+
+    last_id = request.headers.get('Last-Event-ID') or request.GET.get('since')
+    try:
+        last_id = int(last_id)
+    except (TypeError, ValueError):
+        last_id = (await _in_thread(load_manifest)())['seq']
+
+    session = request.GET.get('session') or None
+
+    response = StreamingHttpResponse(_event_stream(last_id, session), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
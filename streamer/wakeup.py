@@ -0,0 +1,111 @@
+"""Wake idle TTS workers as soon as work is queued.
+
+Every worker binds a Unix datagram socket under MEDIA_ROOT/wakeup/ and blocks
+on it while idle. Producers (``go_live``, retries) call ``notify_workers()``
+after writing the queue, which sends one byte to every socket found there.
+MEDIA_ROOT is already shared between the web and worker containers, so no
+extra service is needed.
+
+Polling stays as a fallback: ``Listener.wait`` returns after its timeout even
+without a notification, and on platforms without AF_UNIX it simply sleeps.
+"""
+
+import os
+import errno
+import socket
+import hashlib
+import logging
+import select
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+WAKEUP_DIR = os.path.join(settings.MEDIA_ROOT, 'wakeup')
+# sun_path is limited to 108 bytes on Linux
+_MAX_SOCKET_PATH = 100
+
+
+def _socket_path(name):
+    digest = hashlib.sha1(str(name).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(WAKEUP_DIR, f'{digest}.sock')
+
+
+def notify_workers(reason=b'job'):
+    """Wake every listening worker. Never blocks and never raises."""
+    if not hasattr(socket, 'AF_UNIX') or not os.path.isdir(WAKEUP_DIR):
+        return 0
+    woken = 0
+    try:
+        names = [fn for fn in os.listdir(WAKEUP_DIR) if fn.endswith('.sock')]
+    except OSError:
+        return 0
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+        sock.setblocking(False)
+        for fn in names:
+            path = os.path.join(WAKEUP_DIR, fn)
+            try:
+                sock.sendto(reason, path)
+                woken += 1
+            except (ConnectionRefusedError, FileNotFoundError):
+                # the worker behind it is gone
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            except OSError as e:
+                # EAGAIN: its buffer is full, so it has a wakeup pending already
+                if e.errno not in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    logger.debug('Wakeup to %s failed: %s', path, e)
+    return woken
+
+
+class Listener:
+    """The worker side: ``wait(timeout)`` blocks until notified or timed out."""
+
+    def __init__(self, name):
+        self.path = _socket_path(name)
+        self.sock = None
+        if not hasattr(socket, 'AF_UNIX') or len(self.path) > _MAX_SOCKET_PATH:
+            logger.warning('Worker wakeup socket unavailable; falling back to polling')
+            return
+        os.makedirs(WAKEUP_DIR, exist_ok=True)
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(self.path)
+        self.sock.setblocking(False)
+
+    def wait(self, timeout):
+        """Return True when woken by a notification, False on timeout."""
+        if self.sock is None:
+            time.sleep(timeout)
+            return False
+        ready, _, _ = select.select([self.sock], [], [], timeout)
+        if not ready:
+            return False
+        self.drain()
+        return True
+
+    def drain(self):
+        """Discard pending notifications (several enqueues need one wakeup)."""
+        if self.sock is None:
+            return
+        while True:
+            try:
+                self.sock.recv(64)
+            except (BlockingIOError, InterruptedError):
+                return
+
+    def close(self):
+        if self.sock is None:
+            return
+        self.sock.close()
+        self.sock = None
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
@@ -0,0 +1,47 @@
+"""Worker registry: TTS workers record a heartbeat in MEDIA_ROOT/workers.json.
+
+Each entry is ``worker_id -> {'seen': <ts>, 'job': [session, index] | None, ...}``.
+Readers (status / capacity endpoints) treat workers not seen for a few
+heartbeat intervals as gone.
+"""
+
+import os
+import json
+import time
+
+from django.conf import settings
+
+from .filelock import locked
+
+WORKERS_FILE = os.path.join(settings.MEDIA_ROOT, 'workers.json')
+WORKER_FORGET_AFTER = 24 * 3600
+
+
+def _read():
+    try:
+        with open(WORKERS_FILE, 'r', encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def beat(worker_id, **info):
+    """Record that worker_id is alive (and what it is doing)."""
+    now = time.time()
+    with locked(WORKERS_FILE):
+        workers = _read()
+        workers = {wid: w for wid, w in workers.items() if now - w.get('seen', 0) < WORKER_FORGET_AFTER}
+        entry = workers.get(worker_id, {'started': now})
+        entry.update(info)
+        entry['seen'] = now
+        workers[worker_id] = entry
+        tmp = WORKERS_FILE + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as fh:
+            json.dump(workers, fh)
+        os.replace(tmp, WORKERS_FILE)
+
+
+def live_workers(max_age=90):
+    """Workers that sent a heartbeat within max_age seconds."""
+    now = time.time()
+    return {wid: w for wid, w in _read().items() if now - w.get('seen', 0) <= max_age}